@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CadastroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cadastro'
+
+    def ready(self):
+        # Registra os receivers de sinais do app
+        from . import signals  # noqa: F401
@@ -0,0 +1,152 @@
+"""
+Auditoria das criações, alterações e exclusões de Cliente.
+
+Gravar o histórico na própria requisição somaria um INSERT a cada
+editar_cliente/excluir_cliente. Em vez disso, cada processo acumula as
+entradas em memória e as grava com um único bulk_create:
+
+- ao final da requisição (sinal request_finished, enviado depois que a
+  resposta já foi entregue ao cliente);
+- quando o buffer atinge CADASTRO_AUDITORIA_LOTE entradas ou a entrada mais
+  antiga passa de CADASTRO_AUDITORIA_INTERVALO segundos (comandos e workers,
+  que não têm requisição);
+- na saída do processo (atexit).
+
+As entradas só vão para o buffer depois do commit da transação que fez a
+alteração: uma transação desfeita não deixa histórico. O usuário vem da
+requisição atual, disponibilizada pela AuditoriaMiddleware.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.utils import timezone
+
+from . import metricas
+from .models import CAMPOS_AUDITADOS, AuditoriaCliente, Cliente
+
+logger = logging.getLogger(__name__)
+
+_requisicao_atual = contextvars.ContextVar('cadastro_auditoria_requisicao', default=None)
+
+
+def definir_requisicao(request):
+    return _requisicao_atual.set(request)
+
+
+def limpar_requisicao(token):
+    _requisicao_atual.reset(token)
+
+
+def _usuario_atual():
+    usuario = getattr(_requisicao_atual.get(), 'user', None)
+    if usuario is None or not usuario.is_authenticated:
+        return None, ''
+    return usuario.pk, usuario.email
+
+
+# =============================================
+# VALORES E DIFERENÇAS
+# =============================================
+
+def valores(cliente, campos=CAMPOS_AUDITADOS):
+    """Valores atuais dos campos auditados, normalizados pelo próprio campo."""
+    return {
+        campo: Cliente._meta.get_field(campo).to_python(cliente.__dict__[campo])
+        for campo in campos if campo in cliente.__dict__
+    }
+
+
+def diferencas(antes, depois):
+    """{campo: [antes, depois]} dos campos que mudaram; None no lado ausente."""
+    return {
+        campo: [antes.get(campo), depois.get(campo)]
+        for campo in CAMPOS_AUDITADOS
+        if (campo in antes or campo in depois) and antes.get(campo) != depois.get(campo)
+    }
+
+
+def nova_entrada(acao, cliente_id, codigo_cliente, unidade, alteracoes):
+    usuario_id, usuario_email = _usuario_atual()
+    return AuditoriaCliente(
+        cliente_id=cliente_id,
+        codigo_cliente=codigo_cliente,
+        unidade=unidade,
+        acao=acao,
+        alteracoes=alteracoes,
+        usuario_id=usuario_id,
+        usuario_email=usuario_email,
+        registrado_em=timezone.now(),
+    )
+
+
+def registrar(*entradas):
+    """Enfileira as entradas para gravação após o commit da transação atual."""
+    if entradas:
+        transaction.on_commit(lambda: _buffer.adicionar(entradas))
+
+
+# =============================================
+# BUFFER POR PROCESSO
+# =============================================
+
+class _Buffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reiniciar()
+        atexit.register(self.descarregar)
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._entradas = []
+        self._primeira = 0.0
+
+    def adicionar(self, entradas):
+        lote = getattr(settings, 'CADASTRO_AUDITORIA_LOTE', 500)
+        intervalo = getattr(settings, 'CADASTRO_AUDITORIA_INTERVALO', 5.0)
+        with self._lock:
+            # Após um fork (gunicorn --preload) o filho não regrava o buffer do pai
+            if os.getpid() != self._pid:
+                self._reiniciar()
+            if not self._entradas:
+                self._primeira = time.monotonic()
+            self._entradas.extend(entradas)
+            cheio = (len(self._entradas) >= lote
+                     or time.monotonic() - self._primeira >= intervalo)
+        if cheio:
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava as entradas pendentes deste processo; devolve quantas gravou."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reiniciar()
+            entradas, self._entradas = self._entradas, []
+        if not entradas:
+            return 0
+        try:
+            AuditoriaCliente.objects.bulk_create(
+                entradas, batch_size=getattr(settings, 'CADASTRO_AUDITORIA_LOTE', 500))
+        except Exception:
+            # A auditoria nunca derruba a operação auditada
+            logger.exception('Falha ao gravar %d entrada(s) de auditoria.', len(entradas))
+            return 0
+        metricas.observar('cadastro_bulk_insert_lote', len(entradas), modelo='AuditoriaCliente')
+        return len(entradas)
+
+
+_buffer = _Buffer()
+descarregar = _buffer.descarregar
+
+
+def _requisicao_finalizada(sender, **kwargs):
+    _buffer.descarregar()
+
+
+request_finished.connect(_requisicao_finalizada, dispatch_uid='cadastro_auditoria_descarregar')
@@ -0,0 +1,153 @@
+"""
+Utilitários de medição usados pelos comandos de benchmark do app cadastro.
+
+Cada cenário é executado algumas vezes para medir a latência e, em uma
+execução extra, o número de consultas ao banco e o pico de memória Python
+(tracemalloc), para não distorcer os tempos.
+"""
+import math
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .models import ESCALA_COORDENADA, UNIDADE_CHOICES, Cliente
+
+# Código da filial no ERP para cada unidade (ver processar_clientes_csv)
+FILIAIS_ERP = ['0001', '0002', '0003', '0004']
+
+# Coordenada de uma cidade de cada unidade, dentro das regiões de cadastro/regioes
+COORDENADAS_UNIDADES = {
+    'Maringá': ('-23.4200000', '-51.9300000'),
+    'Guarapuava': ('-25.3900000', '-51.4600000'),
+    'Ponta Grossa': ('-25.0900000', '-50.1600000'),
+    'Norte Pioneiro': ('-23.1600000', '-49.9700000'),
+}
+
+
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo."""
+    ordenados = sorted(valores)
+    posto = max(math.ceil(p / 100 * len(ordenados)), 1)
+    return ordenados[posto - 1]
+
+
+def medir(funcao, repeticoes=5, aquecimento=1):
+    """
+    Executa `funcao` e devolve latências (ms), consultas e pico de memória.
+    Se a função devolver bytes/str, o tamanho também é informado.
+    """
+    for _ in range(aquecimento):
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    medida = {
+        'repeticoes': repeticoes,
+        'p50_ms': round(percentil(tempos, 50), 3),
+        'p90_ms': round(percentil(tempos, 90), 3),
+        'p99_ms': round(percentil(tempos, 99), 3),
+        'max_ms': round(max(tempos), 3),
+        'media_ms': round(sum(tempos) / len(tempos), 3),
+        'consultas': len(consultas),
+        'pico_memoria_kb': round(pico / 1024, 1),
+    }
+    if isinstance(resultado, (bytes, str)):
+        medida['bytes'] = len(resultado)
+    return medida
+
+
+class ClienteHTTPS(Client):
+    """
+    Client de teste que envia toda requisição como HTTPS. Os métodos get/post
+    do Client repassam secure=False, que voltaria o esquema para http e, com
+    DEBUG=False (SECURE_SSL_REDIRECT), transformaria toda medição em um 301.
+    Um redirecionamento interrompe o benchmark em vez de ser medido.
+    """
+
+    def request(self, **request):
+        request.update({'wsgi.url_scheme': 'https', 'SERVER_PORT': '443'})
+        response = super().request(**request)
+        if 300 <= response.status_code < 400:
+            raise CommandError(
+                f"{request.get('PATH_INFO')} respondeu {response.status_code} "
+                f"(redirecionamento para {response.get('Location')})"
+            )
+        return response
+
+
+def conteudo(response):
+    """Consome a resposta (inclusive streaming) e devolve o corpo em bytes."""
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def semear_clientes(quantidade, dias=365, lote=5000, semente=42):
+    """Cria `quantidade` clientes sintéticos distribuídos entre unidades e datas."""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    unidades = [valor for valor, _ in UNIDADE_CHOICES]
+    clientes = [
+        Cliente(
+            unidade=unidades[i % len(unidades)],
+            data_cadastro=hoje - timedelta(days=aleatorio.randrange(dias)),
+            codigo_cliente=str(100000 + i),
+            latitude=aleatorio.randint(-265 * 10 ** 6, -225 * 10 ** 6) / ESCALA_COORDENADA,
+            longitude=aleatorio.randint(-545 * 10 ** 6, -480 * 10 ** 6) / ESCALA_COORDENADA,
+        )
+        for i in range(quantidade)
+    ]
+    for cliente in clientes:
+        cliente.calcular_chave_espacial()
+    Cliente.objects.bulk_create(clientes, batch_size=lote)
+    return quantidade
+
+
+def gerar_csv_erp(linhas, filial='0001', semente=42):
+    """
+    Gera um arquivo no formato exportado pelo ERP (separador ';', latin1),
+    com coordenadas no padrão "-023,4567890,-051,9876543".
+    """
+    aleatorio = random.Random(semente)
+    data = date.today().strftime('%d/%m/%Y')
+    saida = ['Filial;Cliente;Coordenadas;Data Inclusão']
+    for i in range(linhas):
+        lat = aleatorio.randint(225 * 10 ** 6, 265 * 10 ** 6)
+        lon = aleatorio.randint(480 * 10 ** 6, 545 * 10 ** 6)
+        coordenadas = (
+            f"-{lat // ESCALA_COORDENADA:03d},{lat % ESCALA_COORDENADA:07d},"
+            f"-{lon // ESCALA_COORDENADA:03d},{lon % ESCALA_COORDENADA:07d}"
+        )
+        saida.append(f"{filial};{200000 + i};{coordenadas};{data}")
+    return ('\r\n'.join(saida) + '\r\n').encode('latin1')
+
+
+def versao_codigo():
+    """Commit atual do repositório, para comparar execuções entre versões."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
@@ -0,0 +1,206 @@
+"""
+Cache em disco dos arquivos gerados por exportar_dados.
+
+Cada entrada é identificada pelos filtros da exportação (unidade, data_inicio,
+data_fim, formato) mais a versão dos dados das unidades envolvidas. Qualquer
+inclusão, edição ou exclusão de Cliente incrementa a versão da unidade afetada,
+de modo que as entradas antigas deixam de ser encontradas e são removidas.
+
+O tamanho total do cache é limitado por EXPORT_CACHE_MAX_BYTES; ao ultrapassar
+o limite, as entradas usadas há mais tempo são descartadas (LRU).
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse
+from django.utils.text import slugify
+
+from .models import UNIDADE_CHOICES
+
+try:
+    import fcntl
+except ImportError:  # fora do Unix (desenvolvimento, um processo só) não há trava
+    fcntl = None
+
+ESCOPO_TODAS = 'todas'
+
+
+# =============================================
+# CONFIGURAÇÃO
+# =============================================
+
+def cache_habilitado(formato):
+    if not getattr(settings, 'EXPORT_CACHE_ENABLED', True):
+        return False
+    return formato in getattr(settings, 'EXPORT_CACHE_FORMATOS', ('excel', 'pdf'))
+
+
+def _diretorio():
+    diretorio = Path(getattr(settings, 'EXPORT_CACHE_DIR',
+                             Path(tempfile.gettempdir()) / 'cadastro-export-cache'))
+    (diretorio / 'versoes').mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _limite_bytes():
+    return getattr(settings, 'EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+# =============================================
+# VERSÃO DOS DADOS POR UNIDADE
+# =============================================
+
+def _escopo(unidade):
+    return slugify(unidade) if unidade else ESCOPO_TODAS
+
+
+def _caminho_versao(escopo):
+    return _diretorio() / 'versoes' / escopo
+
+
+def _ler_versao(escopo):
+    try:
+        return int(_caminho_versao(escopo).read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _gravar_atomico(caminho, dados):
+    """Grava em arquivo temporário no mesmo diretório e renomeia (atômico)."""
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+
+
+def _versoes(unidade):
+    """Versões que compõem o carimbo de dados de um filtro de unidade."""
+    if unidade:
+        return [_ler_versao(_escopo(unidade))]
+    return [_ler_versao(_escopo(valor)) for valor, _ in UNIDADE_CHOICES]
+
+
+def invalidar(*unidades):
+    """
+    Incrementa a versão das unidades informadas e remove as entradas delas e
+    as de "todas as unidades". A operação ocorre após o commit da transação.
+    """
+    escopos = {_escopo(unidade) for unidade in unidades if unidade}
+
+    def _executar():
+        # Leitura e gravação sob a mesma trava: dois workers que invalidam ao
+        # mesmo tempo não podem gravar ambos N+1 e perder um incremento
+        with open(_diretorio() / 'versoes' / '.trava', 'w') as trava:
+            if fcntl:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            for escopo in escopos:
+                _gravar_atomico(_caminho_versao(escopo),
+                                str(_ler_versao(escopo) + 1).encode())
+        for dados in _entradas():
+            if dados.name.split('__', 1)[0] in escopos | {ESCOPO_TODAS}:
+                _remover_entrada(dados)
+
+    if escopos:
+        transaction.on_commit(_executar)
+
+
+# =============================================
+# ENTRADAS DO CACHE
+# =============================================
+
+def chave(unidade, data_inicio, data_fim, formato, ordem=''):
+    """
+    Nome da entrada para um filtro. Deve ser calculada ANTES de consultar os
+    clientes, para que uma alteração concorrente nunca seja gravada com a
+    versão nova.
+    """
+    identificador = json.dumps(
+        [unidade, data_inicio, data_fim, formato, ordem, _versoes(unidade)],
+        ensure_ascii=False,
+    )
+    resumo = hashlib.sha256(identificador.encode()).hexdigest()[:32]
+    return f"{_escopo(unidade)}__{resumo}"
+
+
+def _entradas():
+    return [
+        p for p in _diretorio().glob('*__*')
+        if not p.name.startswith('.') and not p.name.endswith('.json')
+    ]
+
+
+def _metadados(dados):
+    return dados.with_name(dados.name + '.json')
+
+
+def _remover_entrada(dados):
+    for caminho in (dados, _metadados(dados)):
+        try:
+            caminho.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def obter(nome, nome_arquivo):
+    """
+    Retorna um FileResponse para a entrada, ou None se não estiver em cache.
+    O cache guarda só o conteúdo: o nome do arquivo (com a data) vem de quem
+    pede, para não repetir o dia em que a entrada foi gerada.
+    """
+    dados = _diretorio() / nome
+    try:
+        meta = json.loads(_metadados(dados).read_text())
+        arquivo = open(dados, 'rb')
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # Atualiza o mtime para que a entrada conte como usada recentemente (LRU)
+    try:
+        os.utime(dados)
+    except FileNotFoundError:
+        pass
+
+    response = FileResponse(arquivo, content_type=meta['content_type'])
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
+def armazenar(nome, response):
+    """Guarda o conteúdo de uma resposta de exportação bem-sucedida."""
+    if response.status_code != 200 or response.streaming:
+        return
+
+    dados = _diretorio() / nome
+    meta = {'content_type': response['Content-Type']}
+    _gravar_atomico(dados, response.content)
+    _gravar_atomico(_metadados(dados), json.dumps(meta).encode())
+    _aplicar_limite()
+
+
+def _aplicar_limite():
+    """Remove as entradas menos usadas até o cache caber no limite de bytes."""
+    entradas = []
+    for dados in _entradas():
+        try:
+            info = dados.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, dados))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    limite = _limite_bytes()
+    for _, tamanho, dados in sorted(entradas, key=lambda e: e[0]):
+        if total <= limite:
+            break
+        _remover_entrada(dados)
+        total -= tamanho
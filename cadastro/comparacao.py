@@ -0,0 +1,208 @@
+"""
+Comparação (dry-run) dos arquivos do ERP com os clientes já cadastrados,
+usada por novos_clientes antes da importação.
+
+Os registros válidos do arquivo viram um DataFrame e os clientes das unidades
+presentes nele são lidos em lotes de values_list (keyset no id). A
+classificação em novo/alterado/inalterado sai de um merge do pandas, sem
+consulta nem laço Python por linha.
+
+Fica fora de views.py para que o pandas só seja carregado na primeira
+comparação, e não na inicialização de cada worker.
+"""
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+
+from .geografia import OK, classificar
+from .importacao import abrir_tarefa, converter_registros, ler_linhas, novas_estatisticas, tarefas_importacao
+from .models import CASAS_COORDENADA, ESCALA_COORDENADA, Cliente
+
+# Clientes lidos do banco por consulta
+TAMANHO_LOTE_COMPARACAO = 50000
+
+CHAVE = ['codigo_cliente', 'unidade']
+SITUACOES = ('alterado', 'novo', 'inalterado')
+COLUNAS_BANCO = ['cliente_id', 'codigo_cliente', 'unidade', 'latitude_e7', 'longitude_e7']
+
+
+# =============================================
+# LEITURA DO ARQUIVO E DO BANCO
+# =============================================
+
+def _coordenadas_inteiras(textos):
+    """
+    Texto decimal -> inteiro em 1e-7 graus, como o CoordenadaField grava. Com
+    até 7 casas, como o ERP exporta, o arredondamento em float é exato.
+    """
+    valores = pd.to_numeric(textos, errors='coerce')
+    return np.rint(valores * ESCALA_COORDENADA).astype('Int64')
+
+
+def _normalizar_codigos(codigos):
+    """Versão vetorizada de importacao._normalizar_codigo (zeros à esquerda)."""
+    codigos = codigos.str.strip()
+    sem_zeros = codigos.str.lstrip('0').replace('', '0')
+    return codigos.where(~codigos.str.isdigit(), sem_zeros)
+
+
+def registros_dos_arquivos(uploads, estatisticas):
+    """
+    DataFrame (codigo_cliente, unidade, latitude_e7, longitude_e7) com os
+    registros válidos dos uploads (CSV/XLSX soltos ou em ZIP).
+    """
+    colunas = {'codigo_cliente': [], 'unidade': [], 'latitude': [], 'longitude': []}
+    for nome, origem, membro in tarefas_importacao(uploads):
+        with contextlib.ExitStack() as pilha:
+            arquivo = abrir_tarefa(pilha, nome, origem, membro)
+            for registro in converter_registros(ler_linhas(arquivo, nome), estatisticas):
+                colunas['codigo_cliente'].append(registro['cliente'])
+                colunas['unidade'].append(registro['filial'])
+                colunas['latitude'].append(registro['latitude'])
+                colunas['longitude'].append(registro['longitude'])
+
+    arquivo = pd.DataFrame({
+        'codigo_cliente': pd.Series(colunas['codigo_cliente'], dtype=object),
+        # FILIAIS usa 'Ponta_Grossa'; no banco a unidade é 'Ponta Grossa'
+        'unidade': pd.Series(colunas['unidade'], dtype=object).str.replace('_', ' ', regex=False),
+        'latitude_e7': _coordenadas_inteiras(pd.Series(colunas['latitude'], dtype=object)),
+        'longitude_e7': _coordenadas_inteiras(pd.Series(colunas['longitude'], dtype=object)),
+    })
+    invalidas = arquivo['latitude_e7'].isna() | arquivo['longitude_e7'].isna()
+    estatisticas['erros'] += int(invalidas.sum())
+    return arquivo[~invalidas]
+
+
+def clientes_existentes(unidades, tamanho=TAMANHO_LOTE_COMPARACAO):
+    """
+    DataFrame (cliente_id, codigo_cliente, unidade, latitude_e7, longitude_e7)
+    dos clientes das `unidades`, lido em lotes de `tamanho` ids. Um código
+    repetido na mesma unidade vale pelo cadastro mais recente.
+    """
+    clientes = Cliente.objects.filter(unidade__in=unidades).com_coordenadas_inteiras()
+    partes = []
+    ultimo_id = 0
+    while True:
+        lote = list(
+            clientes.filter(id__gt=ultimo_id).order_by('id')
+            .values_list('id', 'codigo_cliente', 'unidade', 'latitude_e7', 'longitude_e7')[:tamanho]
+        )
+        if not lote:
+            break
+        partes.append(pd.DataFrame(lote, columns=COLUNAS_BANCO))
+        ultimo_id = lote[-1][0]
+
+    if not partes:
+        return pd.DataFrame({
+            coluna: pd.Series(dtype=object if coluna in CHAVE else 'Int64') for coluna in COLUNAS_BANCO
+        })
+    banco = pd.concat(partes, ignore_index=True)
+    banco['codigo_cliente'] = _normalizar_codigos(banco['codigo_cliente'])
+    # Lidos em ordem de id: o último de cada chave é o mais recente
+    return banco.drop_duplicates(CHAVE, keep='last')
+
+
+# =============================================
+# DIFERENÇA E DETALHAMENTO
+# =============================================
+
+def _formatar_coordenadas(valores):
+    """Versão vetorizada de formatar_coordenada; vazio onde não há valor."""
+    presentes = valores.dropna().astype('int64')
+    absolutos = presentes.abs()
+    texto = pd.Series('', index=valores.index, dtype=object)
+    texto[presentes.index] = (
+        pd.Series(np.where(presentes < 0, '-', ''), index=presentes.index)
+        + (absolutos // ESCALA_COORDENADA).astype(str)
+        + '.'
+        + (absolutos % ESCALA_COORDENADA).astype(str).str.zfill(CASAS_COORDENADA)
+    )
+    return texto
+
+
+def comparar(arquivo, banco):
+    """
+    Junta o arquivo aos clientes existentes por (codigo_cliente, unidade) e
+    classifica cada registro: 'novo' (sem cadastro), 'alterado' (coordenada
+    diferente) ou 'inalterado'.
+    """
+    detalhe = arquivo.merge(
+        banco, on=CHAVE, how='left', suffixes=('_arquivo', '_banco'), indicator=True,
+    )
+    novo = (detalhe['_merge'] == 'left_only').to_numpy()
+    igual = (
+        (detalhe['latitude_e7_arquivo'] == detalhe['latitude_e7_banco'])
+        & (detalhe['longitude_e7_arquivo'] == detalhe['longitude_e7_banco'])
+    ).fillna(False).to_numpy(dtype=bool)
+    detalhe['situacao'] = pd.Categorical(
+        np.select([novo, igual], ['novo', 'inalterado'], 'alterado'), categories=SITUACOES,
+    )
+    return detalhe.drop(columns='_merge')
+
+
+def detalhe_csv(detalhe):
+    """CSV do detalhamento, com os alterados primeiro."""
+    detalhe = detalhe.sort_values(['situacao', 'unidade', 'codigo_cliente'])
+    saida = pd.DataFrame({
+        'Situação': detalhe['situacao'],
+        'Unidade': detalhe['unidade'],
+        'Código Cliente': detalhe['codigo_cliente'],
+        'Latitude Arquivo': _formatar_coordenadas(detalhe['latitude_e7_arquivo']),
+        'Longitude Arquivo': _formatar_coordenadas(detalhe['longitude_e7_arquivo']),
+        'Latitude Cadastro': _formatar_coordenadas(detalhe['latitude_e7_banco']),
+        'Longitude Cadastro': _formatar_coordenadas(detalhe['longitude_e7_banco']),
+        'ID Cliente': detalhe['cliente_id'].astype('Int64'),
+        'Região': detalhe['regiao'],
+    })
+    texto = io.StringIO()
+    saida.to_csv(texto, index=False, lineterminator='\n')
+    return texto.getvalue().encode('utf-8')
+
+
+def comparar_arquivos(uploads):
+    """
+    Compara os uploads com o banco sem gravar nada. Retorna {'resumo',
+    'detalhe' (bytes do CSV)} ou None se os arquivos não tiverem nenhum
+    registro válido.
+    """
+    estatisticas = novas_estatisticas()
+    arquivo = registros_dos_arquivos(uploads, estatisticas)
+    if arquivo.empty:
+        return None
+
+    # O mesmo cliente repetido no arquivo vale pela última linha em que aparece
+    repetidos = int(arquivo.duplicated(CHAVE, keep='last').sum())
+    arquivo = arquivo.drop_duplicates(CHAVE, keep='last')
+    unidades = sorted(arquivo['unidade'].unique())
+    # Pontos fora da região da unidade (ver geografia.py), marcados no detalhamento
+    arquivo['regiao'] = classificar(
+        arquivo['unidade'].to_numpy(),
+        arquivo['latitude_e7'].to_numpy(dtype=float) / ESCALA_COORDENADA,
+        arquivo['longitude_e7'].to_numpy(dtype=float) / ESCALA_COORDENADA,
+    )
+
+    detalhe = comparar(arquivo, clientes_existentes(unidades))
+    contagens = detalhe['situacao'].value_counts()
+    por_unidade = (
+        detalhe.groupby(['unidade', 'situacao'], observed=False).size()
+        .unstack(fill_value=0).reindex(columns=SITUACOES, fill_value=0)
+    )
+
+    return {
+        'resumo': {
+            **{situacao: int(contagens[situacao]) for situacao in SITUACOES},
+            'total': len(detalhe),
+            'fora_da_regiao': int((detalhe['regiao'] != OK).sum()),
+            'repetidos': repetidos,
+            'lidas': estatisticas['lidas'],
+            'ignoradas': estatisticas['ignoradas'],
+            'erros': estatisticas['erros'],
+            'por_unidade': [
+                {'unidade': unidade, **{situacao: int(linha[situacao]) for situacao in SITUACOES}}
+                for unidade, linha in por_unidade.iterrows()
+            ],
+        },
+        'detalhe': detalhe_csv(detalhe),
+    }
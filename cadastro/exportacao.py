@@ -0,0 +1,401 @@
+"""
+Motor de exportação usado por exportar_dados (Excel, CSV, PDF, TXT, Parquet
+e Arrow).
+
+Fica fora de views.py para que openpyxl, ReportLab, NumPy e pyarrow só sejam
+carregados na primeira exportação, e não na inicialização de cada worker.
+"""
+import csv
+from io import BytesIO
+from itertools import islice
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+
+from . import metricas
+from .models import CASAS_COORDENADA, formatar_coordenada
+
+# Importa módulos necessários para PDF (se reportlab estiver instalado)
+try:
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+except ImportError:
+    # Se ReportLab não estiver instalado, essas variáveis não existirão.
+    # As funções de exportação tratarão a exceção.
+    pass
+
+# Parquet/Arrow dependem do pyarrow (opcional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# =============================================
+# FUNÇÕES DE EXPORTAÇÃO
+# =============================================
+
+EXTENSOES = {'excel': 'xlsx', 'csv': 'csv', 'pdf': 'pdf', 'txt': 'txt', 'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def nome_arquivo(unidade_filtro, formato):
+    """
+    Nome do arquivo baixado, com a data do download. Calculado a cada
+    requisição, também quando o conteúdo vem do cache de exportação.
+    """
+    escopo = unidade_filtro.lower() if unidade_filtro else 'todas-unidades'
+    prefixo = '' if formato == 'csv' else 'geolocalizacao-'
+    return f"{prefixo}{escopo}-{timezone.now().strftime('%d-%m-%Y')}.{EXTENSOES[formato]}"
+
+
+def gerar_exportacao(clientes, unidade_filtro, formato):
+    """Despacha para a função de exportação do formato solicitado."""
+    if formato == 'excel':
+        return exportar_excel(clientes, unidade_filtro)
+    elif formato == 'csv':
+        return exportar_csv(clientes, unidade_filtro)
+    elif formato == 'pdf':
+        return exportar_pdf(clientes, unidade_filtro)
+    elif formato == 'txt':
+        return exportar_txt(clientes, unidade_filtro)
+    elif formato in ('parquet', 'arrow'):
+        return exportar_colunar(clientes, unidade_filtro, formato)
+    else:
+        return HttpResponseBadRequest(f"Formato de exportação '{formato}' não suportado.")
+
+def exportar_excel(clientes, unidade_filtro):
+    filename = nome_arquivo(unidade_filtro, 'excel')
+    
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Clientes Geolocalização"
+    
+    headers = ['ID', 'Unidade', 'Código Cliente', 'Latitude', 'Longitude', 'Data Cadastro']
+    
+    for col_num, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col_num, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
+    
+    for row_num, cliente in enumerate(clientes, 2):
+        ws.cell(row=row_num, column=1, value=cliente.id)
+        ws.cell(row=row_num, column=2, value=cliente.unidade)
+        ws.cell(row=row_num, column=3, value=cliente.codigo_cliente)
+        ws.cell(row=row_num, column=4, value=str(cliente.latitude))
+        ws.cell(row=row_num, column=5, value=str(cliente.longitude))
+        ws.cell(row=row_num, column=6, value=cliente.data_cadastro.strftime('%d/%m/%Y'))
+    
+    column_widths = {
+        'A': 8,
+        'B': 15,
+        'C': 18,
+        'D': 20,
+        'E': 20,
+        'F': 12
+    }
+    
+    for col, width in column_widths.items():
+        ws.column_dimensions[col].width = width
+    
+    ws.freeze_panes = 'A2'
+    metricas.incrementar('cadastro_exportacao_linhas_total', len(clientes), formato='excel')
+    
+    if len(clientes) > 0:
+        ws.auto_filter.ref = f"A1:F{len(clientes) + 1}"
+    
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    
+    wb.save(response)
+    
+    return response
+
+def exportar_csv(clientes, unidade_filtro):
+    filename = nome_arquivo(unidade_filtro, 'csv')
+    
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    
+    response.write('ID,Unidade,Código Cliente,Latitude,Longitude,Data Cadastro\n')
+    
+    linhas = clientes.com_coordenadas_inteiras().values_list(
+        'id', 'unidade', 'codigo_cliente', 'latitude_e7', 'longitude_e7', 'data_cadastro'
+    )
+    total = 0
+    for id_cliente, unidade, codigo_cliente, latitude, longitude, data_cadastro in linhas:
+        linha = f"{id_cliente},{unidade},{codigo_cliente},{formatar_coordenada(latitude)},{formatar_coordenada(longitude)},{data_cadastro.strftime('%d/%m/%Y')}\n"
+        response.write(linha)
+        total += 1
+    metricas.incrementar('cadastro_exportacao_linhas_total', total, formato='csv')
+    
+    return response
+
+def exportar_pdf(clientes, unidade_filtro):
+    try:
+        filename = nome_arquivo(unidade_filtro, 'pdf')
+        
+        buffer = BytesIO()
+        
+        doc = SimpleDocTemplate(
+            buffer, 
+            pagesize=A4, 
+            topMargin=0.5*inch,
+            bottomMargin=0.5*inch,
+            leftMargin=0.5*inch,
+            rightMargin=0.5*inch
+        )
+        
+        elements = []
+        styles = getSampleStyleSheet()
+        
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            spaceAfter=20,
+            alignment=1,
+            textColor=colors.HexColor('#366092')
+        )
+        
+        if unidade_filtro:
+            title_text = f"Relatório de Geolocalização - {unidade_filtro}"
+        else:
+            title_text = "Relatório de Geolocalização - Todas as Unidades"
+            
+        title = Paragraph(title_text, title_style)
+        elements.append(title)
+        
+        date_style = ParagraphStyle(
+            'CustomDate',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=20,
+            alignment=1,
+        )
+        date_text = f"Emitido em: {timezone.now().strftime('%d/%m/%Y às %H:%M')}"
+        date_para = Paragraph(date_text, date_style)
+        elements.append(date_para)
+        
+        elements.append(Spacer(1, 0.2*inch))
+        
+        data = [['Código Cliente', 'Latitude', 'Longitude', 'Unidade', 'Data Cadastro']]
+        
+        for cliente in clientes:
+            data.append([
+                str(cliente.codigo_cliente),
+                f"{cliente.latitude:.10f}" if cliente.latitude else "N/A",
+                f"{cliente.longitude:.10f}" if cliente.longitude else "N/A",
+                cliente.unidade,
+                cliente.data_cadastro.strftime('%d/%m/%Y')
+            ])
+        
+        # O problema estava aqui, a lista de estilos estava incompleta
+        table = Table(data, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
+            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
+            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.black),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), # Adicionado para completar o estilo
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F5F5F5'), colors.white]) # Estilo zebrado
+        ]))
+        
+        # Adicionar a tabela aos elementos e construir o PDF
+        elements.append(table)
+        metricas.incrementar('cadastro_exportacao_linhas_total', len(data) - 1, formato='pdf')
+        
+        def footer(canvas, doc):
+            canvas.saveState()
+            canvas.setFont('Helvetica', 9)
+            canvas.drawString(inch, 0.5 * inch, "Página %d" % doc.page)
+            canvas.restoreState()
+
+        doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+        
+        # Resposta HTTP
+        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        
+        buffer.close()
+        return response
+        
+    except ImportError:
+        # Se ReportLab não estiver instalado
+        return HttpResponseBadRequest("Biblioteca ReportLab não instalada. Instale com 'pip install reportlab' para exportar em PDF.")
+    except Exception as e:
+        # Erro genérico
+        return HttpResponseBadRequest(f"Erro ao gerar PDF: {str(e)}")
+
+
+def exportar_txt(clientes, unidade_filtro):
+    """
+    Exporta dados de clientes no formato TXT (delimitado por ';').
+    Inclui APENAS Código Cliente, Latitude e Longitude, SEM cabeçalho.
+    """
+    import csv # Garante que o módulo csv está disponível
+    from django.utils import timezone # Garante que timezone está disponível
+    from django.http import HttpResponse # Garante que HttpResponse está disponível
+
+    # Define o nome do arquivo de forma consistente
+    filename = nome_arquivo(unidade_filtro, 'txt')
+    
+    # 1. Cria a resposta HTTP com o Content-Type correto para texto
+    response = HttpResponse(content_type='text/plain')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    
+    # 2. Cria um objeto escritor CSV, usando ';' como delimitador e '\n' como quebra de linha
+    writer = csv.writer(response, delimiter=';', lineterminator='\n')
+    
+    # 3. Itera sobre o QuerySet e escreve APENAS os 3 campos necessários
+    # Não há cabeçalho, conforme solicitado.
+    linhas = clientes.com_coordenadas_inteiras().values_list('codigo_cliente', 'latitude_e7', 'longitude_e7')
+    total = 0
+    for codigo_cliente, latitude, longitude in linhas:
+        writer.writerow([
+            codigo_cliente, 
+            # Garante que Latitude e Longitude sejam strings para evitar erros de formatação
+            formatar_coordenada(latitude), 
+            formatar_coordenada(longitude)
+        ])
+        total += 1
+    metricas.incrementar('cadastro_exportacao_linhas_total', total, formato='txt')
+    
+    return response
+
+
+# =============================================
+# EXPORTAÇÃO COLUNAR (PARQUET / ARROW)
+# =============================================
+
+TAMANHO_LOTE_COLUNAR = 10000
+
+TIPOS_COLUNARES = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+}
+
+
+class _SaidaEmMemoria:
+    """
+    Destino de escrita do pyarrow que apenas acumula os bytes gerados,
+    permitindo enviá-los ao cliente a cada lote (streaming).
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _esquema_colunar():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('unidade', pa.string()),
+        ('codigo_cliente', pa.string()),
+        ('latitude', pa.decimal128(10, CASAS_COORDENADA)),
+        ('longitude', pa.decimal128(10, CASAS_COORDENADA)),
+        ('data_cadastro', pa.date32()),
+    ])
+
+
+def _decimal_de_inteiros(valores, tipo):
+    """
+    Monta um array decimal128 a partir das coordenadas inteiras (1e-7 graus),
+    que já são o valor não escalado do decimal: basta escrevê-las como
+    inteiros de 128 bits little-endian, sem passar por Decimal.
+    """
+    baixo = np.fromiter(valores, dtype=np.int64)
+    alto = baixo >> 63  # extensão de sinal
+    dados = np.column_stack([baixo, alto]).ravel()
+    return pa.Array.from_buffers(tipo, len(baixo), [None, pa.py_buffer(dados)])
+
+
+def _lotes_colunares(clientes, esquema):
+    """Monta RecordBatches direto das tuplas de values_list, sem instanciar modelos."""
+    linhas = clientes.com_coordenadas_inteiras().values_list(
+        'id', 'unidade', 'codigo_cliente', 'latitude_e7', 'longitude_e7', 'data_cadastro'
+    ).iterator(chunk_size=TAMANHO_LOTE_COLUNAR)
+    while True:
+        lote = list(islice(linhas, TAMANHO_LOTE_COLUNAR))
+        if not lote:
+            break
+        colunas = []
+        for valores, campo in zip(zip(*lote), esquema):
+            if pa.types.is_decimal(campo.type):
+                colunas.append(_decimal_de_inteiros(valores, campo.type))
+            else:
+                colunas.append(pa.array(valores, type=campo.type))
+        yield pa.RecordBatch.from_arrays(colunas, schema=esquema)
+
+
+def _gerar_colunar(clientes, formato):
+    esquema = _esquema_colunar()
+    saida = _SaidaEmMemoria()
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(saida, esquema, compression='snappy')
+    else:
+        escritor = pa.ipc.new_file(saida, esquema)
+
+    try:
+        for lote in _lotes_colunares(clientes, esquema):
+            escritor.write_batch(lote)
+            metricas.incrementar('cadastro_exportacao_linhas_total', lote.num_rows, formato=formato)
+            dados = saida.drenar()
+            if dados:
+                yield dados
+    finally:
+        escritor.close()
+    yield saida.drenar()
+
+
+def exportar_colunar(clientes, unidade_filtro, formato):
+    """
+    Exporta em Parquet ou Arrow IPC para consumo analítico. Coordenadas vão
+    como decimal128(10, 7), exatamente como estão gravadas, e datas como date32.
+    """
+    if pa is None:
+        return HttpResponseBadRequest("Biblioteca pyarrow não instalada. Instale com 'pip install pyarrow' para exportar em Parquet/Arrow.")
+
+    content_type, _ = TIPOS_COLUNARES[formato]
+    filename = nome_arquivo(unidade_filtro, formato)
+
+    response = StreamingHttpResponse(_gerar_colunar(clientes, formato), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
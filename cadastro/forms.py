@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from .models import Cliente, CustomUser
 
@@ -9,12 +10,18 @@ class ClienteForm(forms.ModelForm):
         fields = ['unidade', 'data_cadastro', 'codigo_cliente', 'latitude', 'longitude']
         widgets = {
             'data_cadastro': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
-            'latitude': forms.NumberInput(attrs={'step': '0.000000001', 'class': 'form-control'}),
-            'longitude': forms.NumberInput(attrs={'step': '0.000000001', 'class': 'form-control'}),
+            'latitude': forms.NumberInput(attrs={'step': '0.0000001', 'class': 'form-control'}),
+            'longitude': forms.NumberInput(attrs={'step': '0.0000001', 'class': 'form-control'}),
             'unidade': forms.Select(attrs={'class': 'form-select'}),
             'codigo_cliente': forms.TextInput(attrs={'class': 'form-control'}),
         }
     
+    def __init__(self, *args, validar_regiao=True, **kwargs):
+        # validar_regiao=False: quem valida um lote inteiro de uma vez
+        # (sincronizar_clientes) faz a verificação por região depois
+        super().__init__(*args, **kwargs)
+        self.validar_regiao = validar_regiao
+    
     def clean_codigo_cliente(self):
         codigo_cliente = self.cleaned_data.get('codigo_cliente')
         if not codigo_cliente.isdigit():
@@ -32,6 +39,28 @@ class ClienteForm(forms.ModelForm):
         if longitude and (longitude < -180 or longitude > 180):
             raise forms.ValidationError("A longitude deve estar entre -180 e 180 graus.")
         return longitude
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        unidade = cleaned_data.get('unidade')
+        latitude = cleaned_data.get('latitude')
+        longitude = cleaned_data.get('longitude')
+        if not self.validar_regiao or not unidade or latitude is None or longitude is None:
+            return cleaned_data
+        # Os polígonos de cadastro/regioes são aproximados: a recusa só vale
+        # com CADASTRO_REGIOES_VALIDAR ligado (a comparação dry-run só aponta)
+        if not getattr(settings, 'CADASTRO_REGIOES_VALIDAR', False):
+            return cleaned_data
+        # Em edições, só revalida se a posição ou a unidade mudou
+        if not self.instance._state.adding and not {'unidade', 'latitude', 'longitude'} & set(self.changed_data):
+            return cleaned_data
+        
+        # Carregado sob demanda: a validação por região depende do NumPy
+        from .geografia import verificar_ponto
+        erro = verificar_ponto(unidade, latitude, longitude)
+        if erro:
+            self.add_error('latitude', erro)
+        return cleaned_data
 
 # Seu CustomUserCreationForm (Mantido)
 class CustomUserCreationForm(UserCreationForm):
@@ -115,16 +144,7 @@ class CustomUserCreationForm(UserCreationForm):
 
     def save(self, commit=True):
         user = super().save(commit=False)
-        # Gera um username automaticamente baseado no email
-        if not user.username:
-            user.username = user.email.split('@')[0]
-            # Garante que o username seja único
-            base_username = user.username
-            counter = 1
-            while CustomUser.objects.filter(username=user.username).exists():
-                user.username = f"{base_username}{counter}"
-                counter += 1
-                
+        # O username é gerado a partir do email em CustomUser.save (alocar_usernames)
         if commit:
             user.save()
         return user
@@ -330,14 +350,7 @@ class QuickUserCreationForm(forms.ModelForm):
     def save(self, commit=True):
         user = super().save(commit=False)
         user.set_password(self.cleaned_data["password"])
-        # Gera username automaticamente
-        if not user.username:
-            user.username = user.email.split('@')[0]
-            base_username = user.username
-            counter = 1
-            while CustomUser.objects.filter(username=user.username).exists():
-                user.username = f"{base_username}{counter}"
-                counter += 1
+        # O username é gerado a partir do email em CustomUser.save (alocar_usernames)
         if commit:
             user.save()
         return user
\ No newline at end of file
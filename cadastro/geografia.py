@@ -0,0 +1,190 @@
+"""
+Validação das coordenadas pela região de cada unidade.
+
+Cada unidade de UNIDADE_CHOICES tem sua região em um arquivo GeoJSON
+(Polygon ou MultiPolygon) em CADASTRO_REGIOES_DIR, com o nome do slug da
+unidade: maringa.geojson, ponta-grossa.geojson... Um ponto é aceito dentro
+da região ou a até CADASTRO_REGIOES_MARGEM_KM da borda; unidades sem arquivo
+não são validadas. Pontos recusados são classificados pela causa provável:
+latitude e longitude trocadas, sinal invertido ou simplesmente fora da região.
+
+Os polígonos em cadastro/regioes são aproximações. Por isso o cadastro,
+sincronizar_clientes e editar_clientes_lote só recusam pontos com
+CADASTRO_REGIOES_VALIDAR ligado, e essa opção deve ser ligada somente com
+os limites reais. A comparação dry-run e o comando verificar_regioes sempre
+apontam os pontos suspeitos.
+
+O teste ponto-em-polígono (paridade dos cruzamentos de um raio) percorre as
+arestas e compara cada uma com todos os pontos de uma vez, em arrays NumPy:
+o mesmo código valida um cadastro, um lote da sincronização e a varredura
+da tabela inteira (comando verificar_regioes).
+
+Fica fora de forms.py para que o NumPy só seja carregado na primeira
+validação, e não na inicialização de cada worker.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.text import slugify
+
+from .models import UNIDADE_CHOICES
+
+OK = 'ok'
+FORA_DA_REGIAO = 'fora_da_regiao'
+INVERTIDAS = 'coordenadas_invertidas'
+SINAL_INVERTIDO = 'sinal_invertido'
+
+MENSAGENS = {
+    FORA_DA_REGIAO: 'A coordenada está fora da região atendida pela unidade {unidade}.',
+    INVERTIDAS: 'Latitude e longitude parecem trocadas: com os valores invertidos, a coordenada cai na região de {unidade}.',
+    SINAL_INVERTIDO: 'O sinal da latitude ou da longitude parece invertido: a região de {unidade} fica no hemisfério sul e a oeste de Greenwich.',
+}
+
+# Comprimento de um grau de latitude (e de longitude no equador)
+KM_POR_GRAU = 111.32
+
+
+# =============================================
+# REGIÃO (POLÍGONOS DE UMA UNIDADE)
+# =============================================
+
+class Regiao:
+    """Polígonos de uma unidade; cada polígono é uma lista de anéis (lon, lat)."""
+
+    def __init__(self, poligonos):
+        self.poligonos = [[np.asarray(anel, dtype=float) for anel in aneis] for aneis in poligonos]
+        vertices = np.concatenate([anel for aneis in self.poligonos for anel in aneis])
+        self.minimo = vertices.min(axis=0)
+        self.maximo = vertices.max(axis=0)
+
+    def contem(self, latitudes, longitudes):
+        """Máscara dos pontos dentro da região (furos dos polígonos excluídos)."""
+        dentro = np.zeros(len(latitudes), dtype=bool)
+        # Só os pontos dentro do retângulo envolvente passam pelo teste das arestas
+        caixa = np.flatnonzero(
+            (longitudes >= self.minimo[0]) & (longitudes <= self.maximo[0])
+            & (latitudes >= self.minimo[1]) & (latitudes <= self.maximo[1])
+        )
+        x, y = longitudes[caixa], latitudes[caixa]
+        em_algum = np.zeros(len(caixa), dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for aneis in self.poligonos:
+                paridade = np.zeros(len(caixa), dtype=bool)
+                for anel in aneis:
+                    for (x1, y1), (x2, y2) in zip(anel[:-1], anel[1:]):
+                        # Arestas horizontais nunca satisfazem a primeira condição
+                        paridade ^= ((y1 > y) != (y2 > y)) & (x < (x2 - x1) * (y - y1) / (y2 - y1) + x1)
+                em_algum |= paridade
+        dentro[caixa] = em_algum
+        return dentro
+
+    def distancia_km(self, latitudes, longitudes):
+        """
+        Distância aproximada de cada ponto até a borda mais próxima, projetando
+        as arestas no plano local do ponto (equiretangular).
+        """
+        escala_x = np.cos(np.radians(latitudes))
+        menor = np.full(len(latitudes), np.inf)
+        for aneis in self.poligonos:
+            for anel in aneis:
+                for (x1, y1), (x2, y2) in zip(anel[:-1], anel[1:]):
+                    ax, ay = (x1 - longitudes) * escala_x, y1 - latitudes
+                    dx, dy = (x2 - x1) * escala_x, y2 - y1
+                    comprimento = dx * dx + dy * dy
+                    t = np.clip(-(ax * dx + ay * dy) / np.where(comprimento > 0, comprimento, 1), 0, 1)
+                    menor = np.minimum(menor, np.hypot(ax + t * dx, ay + t * dy))
+        return menor * KM_POR_GRAU
+
+    def aceita(self, latitudes, longitudes, margem_km):
+        aceitos = self.contem(latitudes, longitudes)
+        if margem_km > 0:
+            fora = np.flatnonzero(~aceitos)
+            aceitos[fora] = self.distancia_km(latitudes[fora], longitudes[fora]) <= margem_km
+        return aceitos
+
+
+def _poligonos_geojson(dados):
+    """Anéis de todos os Polygon/MultiPolygon de um GeoJSON (Feature, FeatureCollection ou geometria)."""
+    tipo = dados.get('type')
+    if tipo == 'FeatureCollection':
+        return [p for feature in dados['features'] for p in _poligonos_geojson(feature)]
+    if tipo == 'Feature':
+        return _poligonos_geojson(dados['geometry'])
+    if tipo == 'Polygon':
+        return [dados['coordinates']]
+    if tipo == 'MultiPolygon':
+        return list(dados['coordinates'])
+    raise ValueError(f'geometria {tipo!r} não suportada (use Polygon ou MultiPolygon)')
+
+
+@lru_cache(maxsize=None)
+def _carregar(diretorio):
+    regioes = {}
+    for unidade, _ in UNIDADE_CHOICES:
+        caminho = Path(diretorio) / f'{slugify(unidade)}.geojson'
+        if not caminho.exists():
+            continue
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                regioes[unidade] = Regiao(_poligonos_geojson(json.load(arquivo)))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ImproperlyConfigured(f'Região inválida em {caminho}: {e}')
+    return regioes
+
+
+def regioes():
+    """{unidade: Regiao} das unidades com arquivo em CADASTRO_REGIOES_DIR."""
+    padrao = Path(__file__).resolve().parent / 'regioes'
+    return _carregar(str(getattr(settings, 'CADASTRO_REGIOES_DIR', padrao)))
+
+
+# =============================================
+# CLASSIFICAÇÃO DOS PONTOS
+# =============================================
+
+def classificar(unidades, latitudes, longitudes):
+    """
+    Código (OK, FORA_DA_REGIAO, INVERTIDAS ou SINAL_INVERTIDO) de cada ponto,
+    com latitudes/longitudes em graus. Processa uma unidade por vez, todos os
+    pontos dela de uma vez.
+    """
+    unidades = np.asarray(unidades, dtype=object)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    margem_km = getattr(settings, 'CADASTRO_REGIOES_MARGEM_KM', 10.0)
+
+    codigos = np.full(len(unidades), OK, dtype=object)
+    for unidade, regiao in regioes().items():
+        indices = np.flatnonzero(unidades == unidade)
+        if not len(indices):
+            continue
+        recusados = ~regiao.aceita(latitudes[indices], longitudes[indices], margem_km)
+        indices = indices[recusados]
+        if not len(indices):
+            continue
+        latitude, longitude = latitudes[indices], longitudes[indices]
+        causa = np.full(len(indices), FORA_DA_REGIAO, dtype=object)
+        causa[regiao.aceita(-np.abs(latitude), -np.abs(longitude), margem_km)] = SINAL_INVERTIDO
+        causa[regiao.aceita(-np.abs(longitude), -np.abs(latitude), margem_km)] = INVERTIDAS
+        codigos[indices] = causa
+    return codigos
+
+
+def mensagem(codigo, unidade):
+    return MENSAGENS[codigo].format(unidade=unidade) if codigo != OK else None
+
+
+def verificar(unidades, latitudes, longitudes):
+    """Mensagem de erro (ou None) para cada ponto, na ordem recebida."""
+    return [
+        mensagem(codigo, unidade)
+        for codigo, unidade in zip(classificar(unidades, latitudes, longitudes), unidades)
+    ]
+
+
+def verificar_ponto(unidade, latitude, longitude):
+    return verificar([unidade], [float(latitude)], [float(longitude)])[0]
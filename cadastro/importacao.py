@@ -0,0 +1,489 @@
+"""
+Motor de importação dos arquivos do ERP (Promax) usado por novos_clientes.
+
+Fica fora de views.py para que chardet só seja carregado na primeira
+importação de arquivo, e não na inicialização de cada worker.
+"""
+import codecs
+import contextlib
+import csv
+import io
+import os
+import re
+import tempfile
+import time
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import chain
+
+import chardet
+import openpyxl
+from django.conf import settings
+
+from . import metricas
+
+# Bytes lidos do upload por vez e linhas do TXT acumuladas por envio
+TAMANHO_BLOCO = 64 * 1024
+LINHAS_POR_BLOCO = 1000
+
+FILIAIS = {
+    '0001': 'Maringá',
+    '0002': 'Guarapuava', 
+    '0003': 'Ponta_Grossa',
+    '0004': 'Norte_Pioneiro',
+    '1': 'Maringá',
+    '2': 'Guarapuava',
+    '3': 'Ponta_Grossa',
+    '4': 'Norte_Pioneiro'
+}
+
+# =============================================
+# LEITURA INCREMENTAL DO UPLOAD
+# =============================================
+
+def blocos_arquivo(arquivo):
+    """
+    Lê o upload em blocos de TAMANHO_BLOCO bytes. Não usa arquivo.chunks():
+    para uploads em memória ele devolve o arquivo inteiro de uma vez.
+    """
+    if arquivo.seekable():
+        arquivo.seek(0)
+    return iter(lambda: arquivo.read(TAMANHO_BLOCO), b'')
+
+
+def _detectar_encoding(amostra):
+    encoding = chardet.detect(amostra[:TAMANHO_BLOCO])['encoding'] or 'latin1'
+    # Uma amostra só com ASCII não diz nada sobre o resto do arquivo:
+    # UTF-8 é superconjunto de ASCII
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8'
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = 'latin1'
+    return encoding
+
+
+def linhas_texto(blocos):
+    """
+    Decodifica os blocos de bytes do upload de forma incremental e gera uma
+    linha de texto por vez. O encoding é detectado no primeiro bloco.
+    """
+    blocos = iter(blocos)
+    primeiro = next(blocos, b'')
+    encoding = _detectar_encoding(primeiro)
+    print(f"Encoding detectado: {encoding}")
+    
+    # Bytes inválidos viram U+FFFD: as colunas usadas (códigos e coordenadas)
+    # são ASCII, então um acento corrompido em outra coluna não perde o registro
+    decodificador = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pendente = ''
+    for bloco in chain([primeiro], blocos):
+        linhas = (pendente + decodificador.decode(bloco)).splitlines(keepends=True)
+        pendente = linhas.pop() if linhas and not linhas[-1].endswith(('\n', '\r')) else ''
+        yield from linhas
+    pendente += decodificador.decode(b'', final=True)
+    if pendente:
+        yield pendente
+
+
+def ler_linhas_csv(blocos):
+    """Lê o CSV do ERP (separador ';') e gera um dict por linha, indexado pelo cabeçalho."""
+    leitor = csv.reader(linhas_texto(blocos), delimiter=';')
+    cabecalho = [coluna.strip() for coluna in next(leitor, [])]
+    print(f"Colunas encontradas: {cabecalho}")
+    for valores in leitor:
+        if any(valores):
+            yield dict(zip(cabecalho, valores))
+
+
+def _valor_celula(valor):
+    """Converte o valor tipado de uma célula no texto que o CSV do ERP traria."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        # Códigos gravados como número no Excel chegam como 1.0, 12345.0...
+        return str(int(valor))
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor)
+
+
+def ler_linhas_xlsx(arquivo):
+    """
+    Lê a primeira planilha de um XLSX do ERP em modo somente leitura
+    (streaming do XML da planilha) e gera um dict por linha, como ler_linhas_csv.
+    """
+    pasta = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = pasta.active.iter_rows(values_only=True)
+        cabecalho = [_valor_celula(coluna).strip() for coluna in next(linhas, ())]
+        print(f"Colunas encontradas: {cabecalho}")
+        for valores in linhas:
+            if any(valor not in (None, '') for valor in valores):
+                yield dict(zip(cabecalho, map(_valor_celula, valores)))
+    finally:
+        pasta.close()
+
+
+def ler_linhas(arquivo, nome):
+    """Escolhe o leitor pela extensão do arquivo (XLSX ou CSV separado por ';')."""
+    if nome.lower().endswith('.xlsx'):
+        return ler_linhas_xlsx(arquivo)
+    return ler_linhas_csv(blocos_arquivo(arquivo))
+
+# =============================================
+# CONVERSÃO DAS LINHAS DO ERP
+# =============================================
+
+def _normalizar_codigo(valor):
+    """Remove zeros à esquerda de códigos numéricos, como a leitura via pandas fazia."""
+    valor = str(valor).strip()
+    if valor.isdigit():
+        return valor.lstrip('0') or '0'
+    return valor
+
+
+def novas_estatisticas():
+    return {'lidas': 0, 'processadas': 0, 'ignoradas': 0, 'erros': 0}
+
+
+def converter_registros(linhas, estatisticas=None):
+    """
+    Converte as linhas do ERP (dicts com Filial, Cliente, Coordenadas e a
+    coluna de data de inclusão) em registros com latitude/longitude decimais.
+    Linhas sem coordenada válida são ignoradas; as contagens vão para
+    `estatisticas`, atualizadas conforme o gerador avança.
+    """
+    if estatisticas is None:
+        estatisticas = novas_estatisticas()
+    
+    data_col = None
+    for index, row in enumerate(linhas):
+        estatisticas['lidas'] += 1
+        try:
+            if data_col is None:
+                data_col = next(
+                    (col for col in row if 'data' in col.lower() or 'inclus' in col.lower()),
+                    '',
+                )
+            
+            coordenadas = str(row.get('Coordenadas') or '').strip()
+            filial = str(row.get('Filial') or '').strip()
+            filial_nome = FILIAIS.get(filial) or FILIAIS.get(_normalizar_codigo(filial))
+            cliente_codigo = _normalizar_codigo(row.get('Cliente') or '')
+            data_inclusao = row.get(data_col) if data_col else 'Data não encontrada'
+            
+            if (not coordenadas or coordenadas == 'nan' or 
+                '000,000000' in coordenadas or coordenadas == '0' or
+                not filial_nome or not cliente_codigo):
+                estatisticas['ignoradas'] += 1
+                continue
+            
+            partes = coordenadas.replace(' ', '').split(',')
+            
+            if len(partes) < 4:
+                estatisticas['ignoradas'] += 1
+                continue
+            
+            latitude = re.sub(r'^(-)0+', r'\1', partes[0]) + '.' + partes[1]
+            longitude = re.sub(r'^(-)0+', r'\1', partes[2]) + '.' + partes[3]
+            
+            estatisticas['processadas'] += 1
+            yield {
+                'cliente': cliente_codigo,
+                'latitude': latitude,
+                'longitude': longitude,
+                'filial': filial_nome,
+                'data_inclusao': data_inclusao
+            }
+                
+        except Exception as e:
+            print(f"Erro na linha {index}: {e}")
+            estatisticas['erros'] += 1
+            continue
+
+
+def nome_arquivo_txt(registro):
+    """Nome do TXT gerado: <filial>-<data de inclusão>.txt"""
+    data_inclusao = registro['data_inclusao']
+    try:
+        data_obj = datetime.strptime(str(data_inclusao).strip(), '%d/%m/%Y')
+        data_formatada = data_obj.strftime('%d-%m-%Y')
+    except Exception as e:
+        print(f"Erro ao converter data '{data_inclusao}': {e}")
+        data_formatada = datetime.now().strftime('%d-%m-%Y')
+    return f"{registro['filial']}-{data_formatada}.txt"
+
+
+def gerar_txt(registros):
+    """Gera o TXT (codigo;latitude;longitude) em blocos de bytes."""
+    linhas = []
+    for registro in registros:
+        linhas.append(f"{registro['cliente']};{registro['latitude']};{registro['longitude']}\n")
+        if len(linhas) >= LINHAS_POR_BLOCO:
+            yield ''.join(linhas).encode('utf-8')
+            linhas = []
+    if linhas:
+        yield ''.join(linhas).encode('utf-8')
+
+# =============================================
+# PROCESSAMENTO DO ARQUIVO DO ERP
+# =============================================
+
+def _com_metricas(conteudo, estatisticas, inicio):
+    try:
+        yield from conteudo
+    finally:
+        print(f"Total de registros processados: {estatisticas['processadas']}")
+        metricas.incrementar('cadastro_csv_linhas_total', estatisticas['processadas'], resultado='processadas')
+        metricas.incrementar('cadastro_csv_linhas_total', estatisticas['ignoradas'], resultado='ignoradas')
+        metricas.incrementar('cadastro_csv_linhas_total', estatisticas['erros'], resultado='erros')
+        metricas.observar('cadastro_csv_segundos', time.perf_counter() - inicio)
+
+
+def processar_clientes_csv(arquivo_csv):
+    """
+    Converte o CSV do ERP no TXT de geolocalização como um pipeline de
+    geradores: blocos do upload -> texto -> linhas -> registros -> bytes.
+    Nada é gravado em disco e a memória fica limitada ao tamanho do bloco.
+    Arquivos .xlsx seguem o mesmo caminho a partir das linhas da planilha.
+
+    Retorna {'nome_arquivo', 'conteudo' (gerador de bytes), 'estatisticas'},
+    ou None se o arquivo não tiver nenhum registro válido. O nome do arquivo
+    depende do primeiro registro, que por isso é lido antes de retornar.
+    """
+    inicio = time.perf_counter()
+    estatisticas = novas_estatisticas()
+    try:
+        registros = converter_registros(ler_linhas(arquivo_csv, arquivo_csv.name), estatisticas)
+        primeiro = next(registros, None)
+    except Exception as e:
+        print(f"Erro geral no processamento: {e}")
+        traceback.print_exc()
+        return None
+    
+    if primeiro is None:
+        print("Nenhum registro válido encontrado")
+        return None
+    
+    return {
+        'nome_arquivo': nome_arquivo_txt(primeiro),
+        'conteudo': _com_metricas(gerar_txt(chain([primeiro], registros)), estatisticas, inicio),
+        'estatisticas': estatisticas,
+    }
+
+
+# =============================================
+# VÁRIOS ARQUIVOS OU ZIP (UM TXT POR FILIAL)
+# =============================================
+
+EXTENSOES_IMPORTACAO = ('.csv', '.xlsx')
+
+
+def _eh_zip(arquivo):
+    return arquivo.name.lower().endswith('.zip')
+
+
+def tarefas_importacao(uploads):
+    """
+    Monta a lista (nome, origem, membro) enviada aos processos. A origem é o
+    caminho do upload já gravado em disco pelo Django ou, para uploads
+    pequenos mantidos em memória, os próprios bytes; `membro` é o arquivo
+    dentro do ZIP, quando houver.
+    """
+    limite = getattr(settings, 'CADASTRO_IMPORTACAO_MAX_BYTES', 512 * 1024 * 1024)
+    total = 0
+    tarefas = []
+    for upload in uploads:
+        if hasattr(upload, 'temporary_file_path'):
+            origem = upload.temporary_file_path()
+        else:
+            upload.seek(0)
+            origem = upload.read()
+        
+        if not _eh_zip(upload):
+            tarefas.append((upload.name, origem, None))
+            continue
+        
+        with zipfile.ZipFile(upload) as zip_upload:
+            for info in zip_upload.infolist():
+                nome = os.path.basename(info.filename)
+                if info.is_dir() or nome.startswith('.') or not nome.lower().endswith(EXTENSOES_IMPORTACAO):
+                    continue
+                # Tamanho descompactado declarado no ZIP: barra arquivos-bomba
+                total += info.file_size
+                if total > limite:
+                    raise ValueError('O conteúdo descompactado do ZIP excede o limite permitido.')
+                tarefas.append((nome, origem, info.filename))
+    return tarefas
+
+
+def abrir_tarefa(pilha, nome, origem, membro=None):
+    """Abre o arquivo binário de uma tarefa de tarefas_importacao na `pilha`."""
+    if isinstance(origem, str):
+        arquivo = pilha.enter_context(open(origem, 'rb'))
+    else:
+        arquivo = io.BytesIO(origem)
+    if membro is not None:
+        arquivo = pilha.enter_context(zipfile.ZipFile(arquivo).open(membro))
+        if nome.lower().endswith('.xlsx'):
+            # O XLSX também é um ZIP e o openpyxl precisa de seek
+            # aleatório, caro demais sobre um membro comprimido
+            arquivo = io.BytesIO(arquivo.read())
+    return arquivo
+
+
+def converter_arquivo(nome, origem, membro=None):
+    """
+    Converte um arquivo do ERP por inteiro e devolve
+    (nome_arquivo_txt, conteudo_txt, estatisticas, segundos). Executado nos
+    processos do ProcessPoolExecutor, por isso é uma função de módulo e não
+    registra métricas: quem agrega é o processo da requisição.
+    """
+    inicio = time.perf_counter()
+    estatisticas = novas_estatisticas()
+    try:
+        with contextlib.ExitStack() as pilha:
+            arquivo = abrir_tarefa(pilha, nome, origem, membro)
+            registros = converter_registros(ler_linhas(arquivo, nome), estatisticas)
+            primeiro = next(registros, None)
+            if primeiro is None:
+                print(f"Nenhum registro válido encontrado em {nome}")
+                return None, b'', estatisticas, time.perf_counter() - inicio
+            conteudo = b''.join(gerar_txt(chain([primeiro], registros)))
+            return nome_arquivo_txt(primeiro), conteudo, estatisticas, time.perf_counter() - inicio
+    except Exception as e:
+        print(f"Erro ao processar {nome}: {e}")
+        estatisticas['erros'] += 1
+        return None, b'', estatisticas, time.perf_counter() - inicio
+
+
+def processar_varios_arquivos(uploads):
+    """
+    Converte vários arquivos do ERP (CSV/XLSX, soltos ou em um ZIP) em paralelo, um
+    arquivo por processo, e devolve um ZIP com um TXT por filial; arquivos
+    da mesma filial e data são concatenados. O tempo total fica próximo ao
+    do maior arquivo, e não à soma de todos.
+
+    Retorna {'nome_arquivo', 'conteudo' (bytes do ZIP), 'estatisticas',
+    'arquivos'} ou None se nenhum arquivo tiver registros válidos.
+    """
+    tarefas = tarefas_importacao(uploads)
+    if not tarefas:
+        return None
+    
+    processos = getattr(settings, 'CADASTRO_IMPORTACAO_PROCESSOS', None) or os.cpu_count() or 1
+    processos = min(processos, len(tarefas))
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(converter_arquivo, *zip(*tarefas)))
+    else:
+        resultados = [converter_arquivo(*tarefa) for tarefa in tarefas]
+    
+    estatisticas = novas_estatisticas()
+    por_filial = {}
+    for nome_txt, conteudo, parcial, segundos in resultados:
+        for chave, valor in parcial.items():
+            estatisticas[chave] += valor
+        for chave in ('processadas', 'ignoradas', 'erros'):
+            metricas.incrementar('cadastro_csv_linhas_total', parcial[chave], resultado=chave)
+        metricas.observar('cadastro_csv_segundos', segundos)
+        if nome_txt:
+            por_filial.setdefault(nome_txt, []).append(conteudo)
+    
+    if not por_filial:
+        return None
+    
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as zip_saida:
+        for nome_txt, partes in sorted(por_filial.items()):
+            zip_saida.writestr(nome_txt, b''.join(partes))
+    
+    print(f"Total de registros processados: {estatisticas['processadas']} em {len(tarefas)} arquivo(s)")
+    return {
+        'nome_arquivo': f"geolocalizacao-{datetime.now().strftime('%d-%m-%Y')}.zip",
+        'conteudo': saida.getvalue(),
+        'estatisticas': estatisticas,
+        'arquivos': sorted(por_filial),
+    }
+
+
+# =============================================
+# PROCESSAMENTO EM SEGUNDO PLANO (COMANDO processar_importacoes)
+# =============================================
+
+# A cada quantas linhas lidas o progresso é gravado no banco
+LINHAS_POR_ATUALIZACAO = 5000
+
+
+def inicializar_worker():
+    """Initializer dos processos do worker (iniciados via spawn): configura o Django."""
+    import django
+    django.setup()
+
+
+def executar_processamento(processamento_id):
+    """
+    Converte o arquivo de um ProcessamentoArquivo pendente, gravando as
+    contagens a cada LINHAS_POR_ATUALIZACAO linhas, e salva o TXT no storage.
+    Executado nos processos do worker; devolve (estatisticas, segundos) para
+    que as métricas sejam registradas no processo principal.
+    """
+    from django.core.files import File
+    from django.utils import timezone
+    from .models import ProcessamentoArquivo
+    
+    inicio = time.perf_counter()
+    estatisticas = novas_estatisticas()
+    processamento = ProcessamentoArquivo.objects.get(pk=processamento_id)
+    planilha = processamento.nome_original.lower().endswith('.xlsx')
+    
+    def gravar_progresso(arquivo):
+        ProcessamentoArquivo.objects.filter(pk=processamento_id).update(
+            linhas_lidas=estatisticas['lidas'],
+            linhas_processadas=estatisticas['processadas'],
+            linhas_ignoradas=estatisticas['ignoradas'],
+            linhas_erros=estatisticas['erros'],
+            # No XLSX a posição no arquivo não acompanha as linhas lidas
+            bytes_lidos=0 if planilha else arquivo.tell(),
+            atualizado_em=timezone.now(),
+        )
+    
+    try:
+        with processamento.arquivo.open('rb') as arquivo, tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as saida:
+            registros = converter_registros(ler_linhas(arquivo, processamento.nome_original), estatisticas)
+            primeiro = next(registros, None)
+            if primeiro is None:
+                raise ValueError('Nenhum registro válido encontrado no arquivo.')
+            
+            ultima_atualizacao = 0
+            for bloco in gerar_txt(chain([primeiro], registros)):
+                saida.write(bloco)
+                if estatisticas['lidas'] - ultima_atualizacao >= LINHAS_POR_ATUALIZACAO:
+                    gravar_progresso(arquivo)
+                    ultima_atualizacao = estatisticas['lidas']
+            
+            saida.seek(0)
+            processamento.nome_resultado = nome_arquivo_txt(primeiro)
+            processamento.resultado.save(processamento.nome_resultado, File(saida), save=False)
+        
+        processamento.status = 'concluido'
+        # O arquivo enviado não é mais necessário depois de convertido
+        processamento.arquivo.delete(save=False)
+    except Exception as e:
+        print(f"Erro no processamento {processamento_id}: {e}")
+        traceback.print_exc()
+        processamento.status = 'erro'
+        processamento.mensagem = str(e)
+    
+    processamento.linhas_lidas = estatisticas['lidas']
+    processamento.linhas_processadas = estatisticas['processadas']
+    processamento.linhas_ignoradas = estatisticas['ignoradas']
+    processamento.linhas_erros = estatisticas['erros']
+    processamento.bytes_lidos = processamento.tamanho
+    processamento.concluido_em = processamento.atualizado_em = timezone.now()
+    processamento.save()
+    return estatisticas, time.perf_counter() - inicio
@@ -0,0 +1,175 @@
+"""
+Importação de usuários em lote a partir de CSV (view importar_usuarios e
+comando `importar_usuarios`).
+
+O arquivo tem cabeçalho com as colunas email, nome_completo, unidade,
+tipo_acesso e, opcionalmente, cargo e senha, separadas por ';' ou ','. Os
+e-mails são conferidos contra a base em uma única consulta, os usernames
+são alocados de uma vez e as senhas (PBKDF2, a parte cara) são calculadas
+em paralelo em um pool de processos antes do bulk_create.
+"""
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from . import metricas
+from .importacao import blocos_arquivo, inicializar_worker, linhas_texto
+from .models import TENTATIVAS_USERNAME, UNIDADE_CHOICES, CustomUser, alocar_usernames, base_username
+
+TIPOS_ACESSO = dict(CustomUser.TIPO_ACESSO_CHOICES)
+
+# Aceita tanto o valor ('Ponta Grossa') quanto variações de caixa/underscore
+_UNIDADES = {valor.lower().replace('_', ' '): valor for valor, _ in UNIDADE_CHOICES}
+
+TAMANHO_LOTE_USUARIOS = 500
+
+# =============================================
+# LEITURA E VALIDAÇÃO
+# =============================================
+
+def ler_usuarios_csv(arquivo):
+    """Lê o CSV de usuários e gera (número da linha, dict com colunas normalizadas)."""
+    linhas = linhas_texto(blocos_arquivo(arquivo))
+    cabecalho = next(linhas, '')
+    separador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+    colunas = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=separador))]
+    for numero, valores in enumerate(csv.reader(linhas, delimiter=separador), start=2):
+        if any(v.strip() for v in valores):
+            yield numero, dict(zip(colunas, (v.strip() for v in valores)))
+
+
+def validar_usuarios(linhas, tipos_permitidos=None):
+    """
+    Valida as linhas e monta os usuários a criar (ainda sem username e senha).
+    Devolve (usuarios, senhas, erros); `erros` é uma lista de
+    {'linha', 'email', 'erro'}. Os e-mails já cadastrados são buscados em uma
+    única consulta ao final.
+    """
+    tipos_permitidos = tipos_permitidos or list(TIPOS_ACESSO)
+    candidatos, erros, vistos = [], [], set()
+    
+    for numero, linha in linhas:
+        email = CustomUser.objects.normalize_email(linha.get('email', ''))
+        unidade = _UNIDADES.get(linha.get('unidade', '').lower().replace('_', ' '))
+        tipo_acesso = (linha.get('tipo_acesso') or 'operador').lower()
+        nome_completo = linha.get('nome_completo') or linha.get('nome') or ''
+        senha = linha.get('senha', '')
+        
+        try:
+            validate_email(email)
+            if email in vistos:
+                raise ValidationError('E-mail repetido no arquivo.')
+            if not nome_completo:
+                raise ValidationError('Nome completo é obrigatório.')
+            if not unidade:
+                raise ValidationError(f"Unidade inválida: {linha.get('unidade', '')!r}.")
+            if tipo_acesso not in tipos_permitidos:
+                raise ValidationError(f'Tipo de acesso não permitido: {tipo_acesso!r}.')
+            usuario = CustomUser(
+                email=email,
+                nome_completo=nome_completo[:100],
+                unidade=unidade,
+                cargo=linha.get('cargo', '')[:100],
+                tipo_acesso=tipo_acesso,
+            )
+            if senha:
+                validate_password(senha, usuario)
+        except ValidationError as e:
+            erros.append({'linha': numero, 'email': email, 'erro': ' '.join(e.messages)})
+            continue
+        
+        vistos.add(email)
+        candidatos.append((numero, usuario, senha))
+    
+    existentes = set(
+        CustomUser.objects.filter(email__in=vistos).values_list('email', flat=True)
+    )
+    usuarios, senhas = [], []
+    for numero, usuario, senha in candidatos:
+        if usuario.email in existentes:
+            erros.append({'linha': numero, 'email': usuario.email, 'erro': 'Este e-mail já está cadastrado.'})
+            continue
+        usuarios.append(usuario)
+        senhas.append(senha)
+    
+    erros.sort(key=lambda erro: erro['linha'])
+    return usuarios, senhas, erros
+
+# =============================================
+# SENHAS E GRAVAÇÃO
+# =============================================
+
+def _hash_senhas(senhas, processos=None):
+    """
+    Calcula os hashes em paralelo. Senhas vazias viram senha inutilizável
+    (o usuário recebe uma senha depois, por redefinir_senha).
+    """
+    preenchidas = [senha for senha in senhas if senha]
+    processos = processos or getattr(settings, 'CADASTRO_IMPORTACAO_PROCESSOS', None) or os.cpu_count() or 1
+    processos = min(processos, len(preenchidas))
+    
+    if processos > 1:
+        # spawn: o pool também é criado dentro de workers web com threads
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=inicializar_worker) as executor:
+            hashes = iter(executor.map(make_password, preenchidas,
+                                       chunksize=max(1, len(preenchidas) // (processos * 4))))
+    else:
+        hashes = iter([make_password(senha) for senha in preenchidas])
+    
+    return [next(hashes) if senha else make_password(None) for senha in senhas]
+
+
+def importar_usuarios(arquivo, criado_por=None, tipos_permitidos=None, processos=None, dry_run=False):
+    """
+    Importa os usuários válidos do arquivo e devolve
+    {'criados', 'erros', 'segundos'}. Linhas inválidas não impedem a
+    criação das demais; com dry_run apenas valida.
+    """
+    inicio = time.perf_counter()
+    usuarios, senhas, erros = validar_usuarios(ler_usuarios_csv(arquivo), tipos_permitidos)
+    
+    if dry_run or not usuarios:
+        return {'criados': 0, 'validos': len(usuarios),
+                'erros': erros, 'segundos': time.perf_counter() - inicio}
+    
+    for usuario, senha_hash in zip(usuarios, _hash_senhas(senhas, processos)):
+        usuario.password = senha_hash
+        usuario.criado_por = criado_por
+    
+    # Como em CustomUser.save: se um cadastro simultâneo levar algum dos
+    # usernames alocados, a transação é desfeita e a alocação refeita. Depois
+    # do rollback nenhum deles é nosso: se algum existe, houve a colisão
+    for tentativa in range(TENTATIVAS_USERNAME):
+        usernames = []
+        try:
+            with transaction.atomic():
+                usernames = alocar_usernames([base_username(u.email) for u in usuarios])
+                for usuario, username in zip(usuarios, usernames):
+                    usuario.username = username
+                for inicio_lote in range(0, len(usuarios), TAMANHO_LOTE_USUARIOS):
+                    CustomUser.objects.bulk_create(usuarios[inicio_lote:inicio_lote + TAMANHO_LOTE_USUARIOS])
+            break
+        except IntegrityError:
+            colisao = CustomUser.objects.filter(username__in=usernames).exists()
+            if not colisao or tentativa == TENTATIVAS_USERNAME - 1:
+                raise
+            # Lotes já inseridos receberam ids que o rollback descartou
+            for usuario in usuarios:
+                usuario.pk = None
+                usuario._state.adding = True
+    for inicio_lote in range(0, len(usuarios), TAMANHO_LOTE_USUARIOS):
+        metricas.observar('cadastro_bulk_insert_lote',
+                          min(TAMANHO_LOTE_USUARIOS, len(usuarios) - inicio_lote), modelo='CustomUser')
+    
+    return {'criados': len(usuarios), 'validos': len(usuarios),
+            'erros': erros, 'segundos': time.perf_counter() - inicio}
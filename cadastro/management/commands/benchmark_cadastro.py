@@ -0,0 +1,142 @@
+import contextlib
+import io
+import json
+import platform
+from datetime import datetime
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cadastro import benchmarks
+from cadastro.models import UNIDADE_CHOICES, CustomUser
+from cadastro.importacao import processar_clientes_csv, processar_varios_arquivos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede os caminhos críticos do app cadastro (listagem, exportações, "
+        "processamento de CSV e cadastro em lote) sobre N clientes sintéticos e "
+        "imprime latências, consultas e pico de memória em JSON. Por padrão, "
+        "todos os dados criados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10000,
+                            help='Clientes sintéticos criados antes das medições.')
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--linhas-csv', type=int, default=5000,
+                            help='Linhas do arquivo do ERP usado em processar_clientes_csv.')
+        parser.add_argument('--lote-cadastro', type=int, default=50,
+                            help='Clientes enviados por lote ao cadastrar_cliente.')
+        parser.add_argument('--saida', help='Grava o JSON neste arquivo além de imprimir.')
+        parser.add_argument('--manter-dados', action='store_true',
+                            help='Não desfaz os clientes criados ao final.')
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+
+        with transaction.atomic():
+            benchmarks.semear_clientes(options['linhas'])
+            usuario = CustomUser.objects.create_user(
+                email='benchmark@cadastro.local', password=None,
+                nome_completo='Benchmark', tipo_acesso='admin',
+            )
+            cliente = benchmarks.ClienteHTTPS(HTTP_HOST='localhost')
+            cliente.force_login(usuario)
+
+            # Mede sempre a geração do arquivo, sem o cache de exportação
+            with override_settings(EXPORT_CACHE_ENABLED=False):
+                cenarios = self._medir_cenarios(cliente, options, repeticoes)
+
+            if not options['manter_dados']:
+                transaction.set_rollback(True)
+
+        resultado = {
+            'meta': {
+                'commit': benchmarks.versao_codigo(),
+                'executado_em': datetime.now().isoformat(timespec='seconds'),
+                'banco': connection.vendor,
+                'python': platform.python_version(),
+                'linhas': options['linhas'],
+                'repeticoes': repeticoes,
+            },
+            'cenarios': cenarios,
+        }
+        saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                f.write(saida)
+        self.stdout.write(saida)
+
+    def _medir_cenarios(self, cliente, options, repeticoes):
+        cenarios = {}
+        unidade = UNIDADE_CHOICES[0][0]
+
+        url_lista = reverse('cadastro:lista_clientes')
+        cenarios['lista_clientes'] = benchmarks.medir(
+            lambda: benchmarks.conteudo(cliente.get(url_lista)), repeticoes)
+        cenarios['lista_clientes[unidade]'] = benchmarks.medir(
+            lambda: benchmarks.conteudo(cliente.get(url_lista, {'unidade': unidade})), repeticoes)
+        # Códigos sintéticos começam em 100000: '1001' casa com ~0,1% da base
+        cenarios['lista_clientes[q]'] = benchmarks.medir(
+            lambda: benchmarks.conteudo(cliente.get(url_lista, {'q': '1001'})), repeticoes)
+        cenarios['lista_clientes[autocompletar]'] = benchmarks.medir(
+            lambda: benchmarks.conteudo(cliente.get(url_lista, {'q': '1', 'autocompletar': 1})), repeticoes)
+
+        url_exportar = reverse('cadastro:exportar_dados')
+        for formato in ('csv', 'txt', 'excel', 'pdf', 'parquet', 'arrow'):
+            cenarios[f'exportar_dados[{formato}]'] = benchmarks.medir(
+                lambda formato=formato: benchmarks.conteudo(
+                    cliente.get(url_exportar, {'formato': formato})),
+                repeticoes,
+            )
+
+        arquivo_erp = benchmarks.gerar_csv_erp(options['linhas_csv'])
+        cenarios['processar_clientes_csv'] = benchmarks.medir(
+            lambda: self._processar_csv(arquivo_erp), repeticoes)
+        arquivos_erp = [
+            benchmarks.gerar_csv_erp(options['linhas_csv'], filial=filial)
+            for filial in benchmarks.FILIAIS_ERP
+        ]
+        cenarios['processar_varios_arquivos[4]'] = benchmarks.medir(
+            lambda: self._processar_varios(arquivos_erp), repeticoes)
+
+        lote = options['lote_cadastro']
+        cenarios['cadastrar_cliente[lote]'] = benchmarks.medir(
+            lambda: self._cadastrar_lote(cliente, lote), repeticoes)
+        cenarios['cadastrar_cliente[lote]']['clientes_por_lote'] = lote
+        return cenarios
+
+    def _processar_csv(self, dados):
+        arquivo = SimpleUploadedFile('geo.csv', dados, content_type='text/csv')
+        # processar_clientes_csv registra o andamento com print
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = processar_clientes_csv(arquivo)
+            return b''.join(resultado['conteudo'])
+
+    def _processar_varios(self, arquivos):
+        uploads = [
+            SimpleUploadedFile(f'geo-{i}.csv', dados, content_type='text/csv')
+            for i, dados in enumerate(arquivos)
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            return processar_varios_arquivos(uploads)['conteudo']
+
+    def _cadastrar_lote(self, cliente, lote):
+        """Envia um lote como o botão "Salvar todos": um POST AJAX por registro."""
+        url = reverse('cadastro:cadastrar_cliente')
+        for i in range(lote):
+            unidade = UNIDADE_CHOICES[i % len(UNIDADE_CHOICES)][0]
+            latitude, longitude = benchmarks.COORDENADAS_UNIDADES[unidade]
+            resposta = cliente.post(url, {
+                'unidade': unidade,
+                'data_cadastro': datetime.now().strftime('%Y-%m-%d'),
+                'codigo_cliente': str(900000 + i),
+                'latitude': latitude,
+                'longitude': longitude,
+            }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            if resposta.status_code != 200:
+                raise RuntimeError(f'cadastrar_cliente respondeu {resposta.status_code}')
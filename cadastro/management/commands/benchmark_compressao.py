@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cadastro import benchmarks
+from cadastro.middleware import codificacoes_disponiveis, comprimir_blocos
+from cadastro.models import CustomUser
+
+# Blocos em que o corpo é entregue ao compressor na medição de CPU, como em
+# uma resposta streaming
+TAMANHO_BLOCO = 64 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a CompressaoMiddleware nas respostas de texto (lista_clientes, "
+        "exportações CSV/TXT e a conversão streaming de novos_clientes): bytes "
+        "sem compressão e com cada codificação disponível e o tempo de CPU da "
+        "compressão, também normalizado por 100 mil linhas. Imprime JSON; os "
+        "dados criados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=100000)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        linhas, repeticoes = options['linhas'], options['repeticoes']
+
+        with transaction.atomic():
+            benchmarks.semear_clientes(linhas)
+            usuario = CustomUser.objects.create_user(
+                email='benchmark@cadastro.local', password=None,
+                nome_completo='Benchmark', tipo_acesso='admin',
+            )
+            cliente = benchmarks.ClienteHTTPS(HTTP_HOST='localhost')
+            cliente.force_login(usuario)
+            arquivo_erp = benchmarks.gerar_csv_erp(linhas)
+
+            url_exportar = reverse('cadastro:exportar_dados')
+            requisicoes = {
+                'lista_clientes': lambda **h: cliente.get(reverse('cadastro:lista_clientes'), **h),
+                'exportar_dados[csv]': lambda **h: cliente.get(url_exportar, {'formato': 'csv'}, **h),
+                'exportar_dados[txt]': lambda **h: cliente.get(url_exportar, {'formato': 'txt'}, **h),
+                'novos_clientes[streaming]': lambda **h: cliente.post(
+                    reverse('cadastro:novos_clientes'),
+                    {'arquivo_csv': SimpleUploadedFile('geo.csv', arquivo_erp, content_type='text/csv')},
+                    **h,
+                ),
+            }
+            # processar_clientes_csv registra o andamento com print
+            with override_settings(EXPORT_CACHE_ENABLED=False), contextlib.redirect_stdout(io.StringIO()):
+                cenarios = {
+                    nome: self._medir(requisicao, linhas, repeticoes)
+                    for nome, requisicao in requisicoes.items()
+                }
+            transaction.set_rollback(True)
+
+        resultado = {
+            'meta': {
+                'commit': benchmarks.versao_codigo(),
+                'banco': connection.vendor,
+                'linhas': linhas,
+                'codificacoes': list(codificacoes_disponiveis()),
+            },
+            'cenarios': cenarios,
+        }
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    def _medir(self, requisicao, linhas, repeticoes):
+        resposta = requisicao(HTTP_ACCEPT_ENCODING='identity')
+        corpo = benchmarks.conteudo(resposta)
+        blocos = [corpo[i:i + TAMANHO_BLOCO] for i in range(0, len(corpo), TAMANHO_BLOCO)]
+        medida = {
+            'content_type': resposta['Content-Type'],
+            'streaming': resposta.streaming,
+            'bytes': len(corpo),
+        }
+
+        for codificacao in codificacoes_disponiveis():
+            resposta = requisicao(HTTP_ACCEPT_ENCODING=codificacao)
+            if resposta.get('Content-Encoding') != codificacao:
+                raise CommandError(
+                    f'Resposta sem Content-Encoding {codificacao} '
+                    f'(status {resposta.status_code}, {resposta["Content-Type"]}).'
+                )
+            comprimido = len(benchmarks.conteudo(resposta))
+
+            # Só o custo da compressão, sem a geração da resposta
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.process_time()
+                for _ in comprimir_blocos(blocos, codificacao):
+                    pass
+                tempos.append((time.process_time() - inicio) * 1000)
+            cpu_ms = min(tempos)
+
+            medida[codificacao] = {
+                'bytes': comprimido,
+                'economia_pct': round(100 * (1 - comprimido / len(corpo)), 1) if corpo else 0,
+                'cpu_ms': round(cpu_ms, 1),
+                'cpu_ms_por_100k_linhas': round(cpu_ms * 100000 / linhas, 1),
+            }
+        return medida
@@ -0,0 +1,101 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models.expressions import Col
+
+from cadastro.models import ESCALA_COORDENADA, CoordenadaField
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o armazenamento das coordenadas em decimal(18,15) (formato antigo) "
+        "e em inteiros de 1e-7 graus: bytes por linha e vazão de leitura. "
+        "Usa tabelas temporárias e imprime o resultado em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=100000)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        linhas, repeticoes = options['linhas'], options['repeticoes']
+
+        random.seed(42)
+        # Pontos espalhados pelo Paraná, com a precisão que o ERP envia
+        pontos = [
+            (round(random.uniform(-26.5, -22.5), 15), round(random.uniform(-54.5, -48.0), 15))
+            for _ in range(linhas)
+        ]
+
+        campo_decimal = models.DecimalField(max_digits=18, decimal_places=15)
+        campo_inteiro = CoordenadaField()
+        variantes = [
+            ('decimal', 'numeric(18, 15)', campo_decimal,
+             [(Decimal(f'{lat:.15f}'), Decimal(f'{lon:.15f}')) for lat, lon in pontos]),
+            ('inteiro', 'integer', campo_inteiro,
+             [(round(lat * ESCALA_COORDENADA), round(lon * ESCALA_COORDENADA)) for lat, lon in pontos]),
+        ]
+
+        resultado = {'banco': connection.vendor, 'linhas': linhas, 'variantes': {}}
+        with transaction.atomic(), connection.cursor() as cursor:
+            for nome, tipo_sql, campo, valores in variantes:
+                campo.set_attributes_from_name('latitude')
+                tabela = f'bench_coordenadas_{nome}'
+                cursor.execute(
+                    f'CREATE TEMP TABLE {tabela} '
+                    f'(id integer PRIMARY KEY, latitude {tipo_sql} NOT NULL, longitude {tipo_sql} NOT NULL)'
+                )
+                cursor.executemany(
+                    f'INSERT INTO {tabela} (id, latitude, longitude) VALUES (%s, %s, %s)',
+                    [(i, lat, lon) for i, (lat, lon) in enumerate(valores, 1)],
+                )
+
+                medidas = {
+                    'bytes_por_linha': self._bytes_por_linha(cursor, tabela, linhas),
+                    # Leitura como o ORM faz: valor do banco + conversores do campo (Decimal)
+                    'leitura_orm_linhas_por_s': self._vazao(cursor, tabela, campo, repeticoes, linhas),
+                }
+                if nome == 'inteiro':
+                    # Laços de exportação que usam com_coordenadas_inteiras()
+                    medidas['leitura_bruta_linhas_por_s'] = self._vazao(cursor, tabela, None, repeticoes, linhas)
+                resultado['variantes'][nome] = medidas
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def _bytes_por_linha(self, cursor, tabela, linhas):
+        try:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s)', [tabela])
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s AND schema = 'temp'", [tabela]
+                )
+            else:
+                return None
+            total = cursor.fetchone()[0]
+        except DatabaseError:
+            # dbstat não disponível nesta build do SQLite
+            return None
+        return round(total / linhas, 2) if total else None
+
+    def _vazao(self, cursor, tabela, campo, repeticoes, linhas):
+        conversores = []
+        if campo is not None:
+            expressao = Col(tabela, campo)
+            conversores = connection.ops.get_db_converters(expressao) + campo.get_db_converters(connection)
+
+        melhor = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            cursor.execute(f'SELECT latitude, longitude FROM {tabela}')
+            for latitude, longitude in cursor.fetchall():
+                for conversor in conversores:
+                    latitude = conversor(latitude, expressao, connection)
+                    longitude = conversor(longitude, expressao, connection)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        return round(linhas / melhor)
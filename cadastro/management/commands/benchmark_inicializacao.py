@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Bibliotecas pesadas que só devem ser carregadas na primeira importação/exportação
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl', 'reportlab', 'chardet', 'pyarrow')
+
+SCRIPT = 'import django; django.setup(); import cadastro.views'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede, com `python -X importtime`, o custo de importar cadastro.views após "
+        "django.setup() e falha se passar do orçamento ou se alguma biblioteca "
+        "pesada (pandas, openpyxl, ReportLab...) for carregada na inicialização."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orcamento-ms', type=float, default=150.0,
+                            help='Tempo máximo (cumulativo) para importar cadastro.views.')
+        parser.add_argument('--repeticoes', type=int, default=3,
+                            help='Execuções em processos novos; vale a mais rápida.')
+
+    def handle(self, *args, **options):
+        medicoes = [self._medir() for _ in range(options['repeticoes'])]
+        melhor = min(medicoes, key=lambda m: m['cadastro_views_ms'])
+        resultado = {
+            'orcamento_ms': options['orcamento_ms'],
+            'cadastro_views_ms': melhor['cadastro_views_ms'],
+            'modulos_pesados': melhor['modulos_pesados'],
+            'maiores_importacoes': melhor['maiores_importacoes'],
+        }
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+        if melhor['modulos_pesados']:
+            raise CommandError(
+                'cadastro.views carrega bibliotecas pesadas na inicialização: '
+                + ', '.join(melhor['modulos_pesados'])
+            )
+        if melhor['cadastro_views_ms'] > options['orcamento_ms']:
+            raise CommandError(
+                f"Importar cadastro.views levou {melhor['cadastro_views_ms']:.1f} ms "
+                f"(orçamento: {options['orcamento_ms']:.1f} ms)."
+            )
+        self.stdout.write(self.style.SUCCESS('Inicialização dentro do orçamento.'))
+
+    def _medir(self):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'meu_projeto.settings')}
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if processo.returncode != 0:
+            raise CommandError(f'Falha ao importar cadastro.views:\n{processo.stderr[-2000:]}')
+
+        # Linhas no formato "import time: self [us] | cumulative | imported package",
+        # em pós-ordem (dependências antes de quem as importa) e indentadas por nível
+        importacoes = []
+        for linha in processo.stderr.splitlines():
+            if not linha.startswith('import time:') or 'cumulative' in linha:
+                continue
+            _, cumulativo, modulo = linha[len('import time:'):].split('|')
+            nivel = (len(modulo) - len(modulo.lstrip())) // 2
+            importacoes.append((modulo.strip(), nivel, int(cumulativo) / 1000))
+
+        nomes = [modulo for modulo, _, _ in importacoes]
+        if 'cadastro.views' not in nomes:
+            raise CommandError('cadastro.views não aparece na saída de -X importtime.')
+        posicao = nomes.index('cadastro.views')
+        _, nivel_views, tempo_views = importacoes[posicao]
+
+        # Dependências diretas de cadastro.views, para saber o que pesa
+        diretas = []
+        for modulo, nivel, tempo in reversed(importacoes[:posicao]):
+            if nivel <= nivel_views:
+                break
+            if nivel == nivel_views + 1:
+                diretas.append((modulo, round(tempo, 1)))
+
+        return {
+            'cadastro_views_ms': round(tempo_views, 1),
+            'modulos_pesados': sorted({
+                modulo.split('.')[0] for modulo in nomes
+                if modulo.split('.')[0] in MODULOS_PESADOS
+            }),
+            'maiores_importacoes': dict(sorted(diretas, key=lambda item: item[1], reverse=True)[:10]),
+        }
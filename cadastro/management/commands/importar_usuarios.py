@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cadastro.importacao_usuarios import importar_usuarios
+from cadastro.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria usuários em lote a partir de um CSV (email, nome_completo, unidade, "
+        "tipo_acesso e, opcionalmente, cargo e senha). As senhas são calculadas "
+        "em paralelo e os usuários gravados com bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do CSV.')
+        parser.add_argument('--criado-por', help='E-mail do usuário registrado como criador.')
+        parser.add_argument('--processos', type=int,
+                            help='Processos para o cálculo das senhas (padrão: nº de CPUs).')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas valida o arquivo.')
+
+    def handle(self, *args, **options):
+        criado_por = None
+        if options['criado_por']:
+            try:
+                criado_por = CustomUser.objects.get(email=options['criado_por'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Usuário {options['criado_por']} não encontrado.")
+
+        try:
+            arquivo = open(options['arquivo'], 'rb')
+        except OSError as e:
+            raise CommandError(str(e))
+        with arquivo:
+            resultado = importar_usuarios(
+                arquivo, criado_por=criado_por,
+                processos=options['processos'], dry_run=options['dry_run'],
+            )
+
+        for erro in resultado['erros']:
+            self.stderr.write(f"Linha {erro['linha']} ({erro['email']}): {erro['erro']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['criados']} criado(s), {resultado['validos']} válido(s), "
+            f"{len(resultado['erros'])} com erro em {resultado['segundos']:.1f}s."
+        ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from cadastro.models import ESCALA_COORDENADA, Cliente
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte as colunas latitude/longitude de Cliente de decimal(18,15) para "
+        "inteiros em 1e-7 graus. Execute com a aplicação parada e ANTES de "
+        "makemigrations/migrate; pode ser repetido com segurança se interrompido."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=50000,
+            help='Quantidade de ids convertidos por transação (padrão: 50000).',
+        )
+
+    def handle(self, *args, **options):
+        self.tabela = Cliente._meta.db_table
+        for coluna in ('latitude', 'longitude'):
+            self._converter(coluna, options['lote'])
+
+    def _colunas(self):
+        with connection.cursor() as cursor:
+            descricao = connection.introspection.get_table_description(cursor, self.tabela)
+        return {
+            col.name: connection.introspection.get_field_type(col.type_code, col)
+            for col in descricao
+        }
+
+    def _converter(self, coluna, lote):
+        qn = connection.ops.quote_name
+        tabela, temporaria = qn(self.tabela), qn(f'{coluna}_e7')
+        colunas = self._colunas()
+
+        if colunas.get(coluna) in ('IntegerField', 'BigIntegerField') and f'{coluna}_e7' not in colunas:
+            self.stdout.write(f'{coluna}: já está em inteiros, nada a fazer.')
+            return
+
+        # 1. Coluna inteira temporária (mantida se uma execução anterior parou no meio)
+        if f'{coluna}_e7' not in colunas:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {tabela} ADD COLUMN {temporaria} integer NULL')
+
+        # 2. Preenche em lotes por faixa de id, cada lote na sua transação
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN(id), MAX(id) FROM {tabela}')
+            menor, maior = cursor.fetchone()
+
+        convertidos = 0
+        if menor is not None:
+            for inicio in range(menor, maior + 1, lote):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        f'UPDATE {tabela} SET {temporaria} = ROUND({qn(coluna)} * %s) '
+                        f'WHERE id >= %s AND id < %s AND {temporaria} IS NULL',
+                        [ESCALA_COORDENADA, inicio, inicio + lote],
+                    )
+                    convertidos += cursor.rowcount
+                self.stdout.write(f'{coluna}: {convertidos} registros convertidos...')
+
+        # 3. Troca a coluna decimal pela inteira
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {tabela} DROP COLUMN {qn(coluna)}')
+            cursor.execute(f'ALTER TABLE {tabela} RENAME COLUMN {temporaria} TO {qn(coluna)}')
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ALTER TABLE {tabela} ALTER COLUMN {qn(coluna)} SET NOT NULL')
+
+        self.stdout.write(self.style.SUCCESS(f'{coluna}: convertida para inteiros (1e-7 graus).'))
@@ -0,0 +1,85 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from cadastro.espacial import chave_hilbert
+from cadastro.models import Cliente
+
+INDICE_ESPACIAL = 'cliente_espacial_idx'
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche Cliente.chave_espacial (curva de Hilbert) nas linhas em que "
+        "ela está vazia, em faixas de id e com o cálculo vetorizado. Com "
+        "--cluster, reordena fisicamente a tabela pela chave no PostgreSQL "
+        "(CLUSTER + ANALYZE). O CLUSTER bloqueia a tabela inteira enquanto "
+        "roda: execute fora do horário de trabalho. Cadastros novos não "
+        "entram na ordem física; repita o --cluster periodicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=50000,
+            help='Quantidade de ids atualizados por transação (padrão: 50000).',
+        )
+        parser.add_argument(
+            '--recalcular', action='store_true',
+            help='Recalcula a chave de todas as linhas, não só das vazias.',
+        )
+        parser.add_argument(
+            '--cluster', action='store_true',
+            help=f'Executa CLUSTER ... USING {INDICE_ESPACIAL} ao final (somente PostgreSQL).',
+        )
+
+    def handle(self, *args, **options):
+        clientes = Cliente.objects.all()
+        if not options['recalcular']:
+            clientes = clientes.filter(chave_espacial__isnull=True)
+        atualizados = self._preencher(clientes, max(options['lote'], 1))
+        self.stdout.write(self.style.SUCCESS(f'{atualizados} chaves espaciais gravadas.'))
+
+        if options['cluster']:
+            if connection.vendor != 'postgresql':
+                self.stdout.write(self.style.WARNING(
+                    f'--cluster ignorado: disponível apenas no PostgreSQL (banco atual: {connection.vendor}).'
+                ))
+                return
+            tabela = connection.ops.quote_name(Cliente._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f'CLUSTER {tabela} USING {connection.ops.quote_name(INDICE_ESPACIAL)}')
+                cursor.execute(f'ANALYZE {tabela}')
+            self.stdout.write(self.style.SUCCESS('Tabela de clientes reordenada pela chave espacial.'))
+
+    def _preencher(self, clientes, lote):
+        """
+        Calcula as chaves de cada faixa de ids de uma vez (arrays int64) e as
+        grava com UPDATE direto: não é uma alteração do cliente, então não
+        avança atualizado_em/versao nem dispara sinais.
+        """
+        faixa = clientes.aggregate(menor=Min('id'), maior=Max('id'))
+        if faixa['menor'] is None:
+            return 0
+
+        qn = connection.ops.quote_name
+        sql = (
+            f'UPDATE {qn(Cliente._meta.db_table)} SET {qn("chave_espacial")} = %s '
+            f'WHERE {qn("id")} = %s'
+        )
+        atualizados = 0
+        for inicio in range(faixa['menor'], faixa['maior'] + 1, lote):
+            linhas = list(
+                clientes.filter(id__gte=inicio, id__lt=inicio + lote)
+                .com_coordenadas_inteiras()
+                .values_list('id', 'latitude_e7', 'longitude_e7')
+            )
+            if not linhas:
+                continue
+            ids, latitudes, longitudes = (np.array(coluna, dtype=np.int64) for coluna in zip(*linhas))
+            chaves = chave_hilbert(latitudes, longitudes)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, list(zip(chaves.tolist(), ids.tolist())))
+            atualizados += len(linhas)
+            self.stdout.write(f'{atualizados} clientes processados...')
+        return atualizados
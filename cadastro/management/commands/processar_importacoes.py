@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cadastro import metricas
+from cadastro.importacao import executar_processamento, inicializar_worker
+from cadastro.models import ProcessamentoArquivo
+
+# Segundos entre os sinais de vida dos processamentos em andamento: bem abaixo
+# do --tempo-limite, para que um arquivo lento não volte para a fila
+INTERVALO_PULSO = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker local das importações em segundo plano de novos_clientes: "
+        "converte os arquivos pendentes em um pool de processos, gravando o "
+        "andamento no banco. Rode um por servidor (ex.: como serviço do systemd)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos', type=int,
+            default=getattr(settings, 'CADASTRO_IMPORTACAO_PROCESSOS', None) or os.cpu_count() or 1,
+            help='Arquivos convertidos em paralelo (padrão: CADASTRO_IMPORTACAO_PROCESSOS ou nº de CPUs).',
+        )
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre consultas à fila quando ociosa.')
+        parser.add_argument('--tempo-limite', type=int, default=30,
+                            help='Minutos sem sinal do worker até um processamento voltar para a fila.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Processa o que estiver pendente e encerra.')
+
+    def handle(self, *args, **options):
+        processos = max(options['processos'], 1)
+        # spawn: os filhos abrem as próprias conexões em vez de herdar as do pai
+        contexto = multiprocessing.get_context('spawn')
+        em_andamento = {}
+        ultimo_pulso = time.monotonic()
+        intervalo_pulso = min(INTERVALO_PULSO, options['tempo_limite'] * 60 / 3)
+
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto,
+                                 initializer=inicializar_worker) as executor:
+            while True:
+                self._recuperar_interrompidos(options['tempo_limite'])
+                for processamento_id in self._reservar(processos - len(em_andamento)):
+                    self.stdout.write(f'Processamento {processamento_id}: iniciado.')
+                    em_andamento[executor.submit(executar_processamento, processamento_id)] = processamento_id
+
+                if not em_andamento:
+                    if options['uma_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                concluidos, _ = wait(em_andamento, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    self._finalizar(em_andamento.pop(futuro), futuro)
+
+                if em_andamento and time.monotonic() - ultimo_pulso >= intervalo_pulso:
+                    self._pulsar(em_andamento.values())
+                    ultimo_pulso = time.monotonic()
+
+    def _reservar(self, quantidade):
+        """Marca até `quantidade` pendentes como em processamento (update condicional)."""
+        if quantidade <= 0:
+            return []
+        pendentes = ProcessamentoArquivo.objects.filter(status='pendente').order_by('criado_em')
+        reservados = []
+        for processamento_id in pendentes.values_list('id', flat=True)[:quantidade]:
+            agora = timezone.now()
+            # Outro worker pode ter reservado o mesmo registro entre a consulta e o update
+            if ProcessamentoArquivo.objects.filter(pk=processamento_id, status='pendente').update(
+                    status='processando', iniciado_em=agora, atualizado_em=agora):
+                reservados.append(processamento_id)
+        return reservados
+
+    def _pulsar(self, processamento_ids):
+        """
+        Avança atualizado_em dos processamentos que este worker ainda executa,
+        independente do progresso em linhas: um arquivo grande ou uma etapa
+        lenta (ex.: leitura de um XLSX) não conta como worker interrompido.
+        """
+        ProcessamentoArquivo.objects.filter(
+            pk__in=list(processamento_ids), status='processando',
+        ).update(atualizado_em=timezone.now())
+
+    def _recuperar_interrompidos(self, minutos):
+        # Só volta para a fila o que ficou sem progresso e sem sinal de vida
+        # do worker (ver _pulsar) por `minutos`
+        limite = timezone.now() - timedelta(minutes=minutos)
+        recuperados = ProcessamentoArquivo.objects.filter(
+            status='processando', atualizado_em__lt=limite,
+        ).update(status='pendente', atualizado_em=timezone.now())
+        if recuperados:
+            self.stdout.write(self.style.WARNING(f'{recuperados} processamento(s) sem sinal do worker voltaram para a fila.'))
+
+    def _finalizar(self, processamento_id, futuro):
+        try:
+            estatisticas, segundos = futuro.result()
+        except Exception as e:
+            # O processo filho morreu (ex.: falta de memória) antes de gravar o status
+            ProcessamentoArquivo.objects.filter(pk=processamento_id).update(
+                status='erro', mensagem=str(e) or e.__class__.__name__,
+                concluido_em=timezone.now(), atualizado_em=timezone.now(),
+            )
+            self.stdout.write(self.style.ERROR(f'Processamento {processamento_id}: falhou ({e!r}).'))
+            return
+
+        for chave in ('processadas', 'ignoradas', 'erros'):
+            metricas.incrementar('cadastro_csv_linhas_total', estatisticas[chave], resultado=chave)
+        metricas.observar('cadastro_csv_segundos', segundos)
+        self.stdout.write(
+            f"Processamento {processamento_id}: {estatisticas['processadas']} registros, "
+            f"{estatisticas['ignoradas']} ignorados, {estatisticas['erros']} erros em {segundos:.1f}s."
+        )
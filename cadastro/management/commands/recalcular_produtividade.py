@@ -0,0 +1,84 @@
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+
+from cadastro import metricas
+from cadastro.models import Cliente, ProdutividadeDiaria
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói o rollup ProdutividadeDiaria a partir dos clientes, lendo a "
+        "tabela em faixas de id. Use na primeira carga e para corrigir "
+        "divergências; cadastros feitos durante a execução podem ficar de fora, "
+        "então prefira rodar fora do horário de trabalho."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=50000,
+            help='Quantidade de ids agregados por consulta (padrão: 50000).',
+        )
+        parser.add_argument(
+            '--desde',
+            help='Recalcula apenas os dias a partir desta data (AAAA-MM-DD).',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--desde deve estar no formato AAAA-MM-DD.')
+
+        clientes = Cliente.objects.filter(cadastrado_por__isnull=False)
+        if desde:
+            clientes = clientes.filter(criado_em__date__gte=desde)
+
+        contagens = self._agregar(clientes, max(options['lote'], 1))
+
+        existentes = ProdutividadeDiaria.objects.all()
+        if desde:
+            existentes = existentes.filter(dia__gte=desde)
+        linhas = [
+            ProdutividadeDiaria(operador_id=operador_id, unidade=unidade, dia=dia, quantidade=quantidade)
+            for (operador_id, unidade, dia), quantidade in contagens.items()
+        ]
+        with transaction.atomic():
+            removidas = existentes.delete()[0]
+            ProdutividadeDiaria.objects.bulk_create(linhas, batch_size=1000)
+        if linhas:
+            metricas.observar('cadastro_bulk_insert_lote', len(linhas), modelo='ProdutividadeDiaria')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(contagens.values())} cadastros em {len(linhas)} linhas de produtividade '
+            f'({removidas} linhas antigas substituídas).'
+        ))
+
+    def _agregar(self, clientes, lote):
+        """Soma as contagens por (operador, unidade, dia), uma faixa de ids por consulta."""
+        faixa = clientes.aggregate(menor=Min('id'), maior=Max('id'))
+        contagens = Counter()
+        if faixa['menor'] is None:
+            return contagens
+
+        lidos = 0
+        for inicio in range(faixa['menor'], faixa['maior'] + 1, lote):
+            grupos = (
+                clientes.filter(id__gte=inicio, id__lt=inicio + lote)
+                .annotate(dia_cadastro=TruncDate('criado_em'))
+                .values('cadastrado_por_id', 'unidade', 'dia_cadastro')
+                .annotate(quantidade=Count('id'))
+                .order_by()
+            )
+            for grupo in grupos:
+                chave = (grupo['cadastrado_por_id'], grupo['unidade'], grupo['dia_cadastro'])
+                contagens[chave] += grupo['quantidade']
+                lidos += grupo['quantidade']
+            self.stdout.write(f'{lidos} clientes agregados...')
+        return contagens
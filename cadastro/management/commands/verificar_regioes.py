@@ -0,0 +1,85 @@
+import contextlib
+import csv
+import time
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from cadastro import geografia
+from cadastro.models import ESCALA_COORDENADA, UNIDADE_CHOICES, Cliente, formatar_coordenada
+
+
+class Command(BaseCommand):
+    help = (
+        "Varre os clientes em lotes (keyset no id) e aponta as coordenadas fora "
+        "da região da unidade, com a causa provável (latitude/longitude trocadas, "
+        "sinal invertido ou fora da região). Somente leitura; com --csv grava a "
+        "lista dos clientes apontados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=100000,
+            help='Quantidade de clientes lidos por consulta (padrão: 100000).',
+        )
+        parser.add_argument('--unidade', help='Verifica apenas esta unidade.')
+        parser.add_argument('--csv', help='Caminho do CSV com os clientes apontados.')
+
+    def handle(self, *args, **options):
+        clientes = Cliente.objects.com_coordenadas_inteiras()
+        if options['unidade']:
+            clientes = clientes.filter(unidade=options['unidade'])
+        sem_regiao = sorted({unidade for unidade, _ in UNIDADE_CHOICES} - set(geografia.regioes()))
+        if sem_regiao:
+            self.stdout.write(self.style.WARNING(f'Unidades sem região configurada: {", ".join(sem_regiao)}'))
+
+        inicio = time.perf_counter()
+        contagens = Counter()
+        verificados = 0
+        with contextlib.ExitStack() as pilha:
+            escritor = None
+            if options['csv']:
+                escritor = csv.writer(pilha.enter_context(open(options['csv'], 'w', newline='', encoding='utf-8')))
+                escritor.writerow(['ID', 'Unidade', 'Código Cliente', 'Latitude', 'Longitude', 'Causa'])
+
+            for lote in _lotes(clientes, max(options['lote'], 1)):
+                ids, unidades, codigos, latitudes, longitudes = zip(*lote)
+                resultado = geografia.classificar(
+                    unidades,
+                    np.array(latitudes, dtype=float) / ESCALA_COORDENADA,
+                    np.array(longitudes, dtype=float) / ESCALA_COORDENADA,
+                )
+                apontados = np.flatnonzero(resultado != geografia.OK)
+                contagens.update(zip((unidades[i] for i in apontados), resultado[apontados]))
+                if escritor:
+                    escritor.writerows(
+                        [ids[i], unidades[i], codigos[i], formatar_coordenada(latitudes[i]),
+                         formatar_coordenada(longitudes[i]), resultado[i]]
+                        for i in apontados
+                    )
+                verificados += len(lote)
+                self.stdout.write(f'{verificados} clientes verificados...')
+
+        segundos = time.perf_counter() - inicio
+        for (unidade, causa), quantidade in sorted(contagens.items()):
+            self.stdout.write(f'  {unidade}: {quantidade} {causa}')
+        ritmo = verificados / segundos * 60 if segundos else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(contagens.values())} de {verificados} clientes fora da região '
+            f'({segundos:.1f} s, {ritmo:,.0f} clientes/min).'
+        ))
+
+
+def _lotes(clientes, tamanho):
+    ultimo_id = 0
+    while True:
+        lote = list(
+            clientes.filter(id__gt=ultimo_id).order_by('id')
+            .values_list('id', 'unidade', 'codigo_cliente', 'latitude_e7', 'longitude_e7')[:tamanho]
+        )
+        if not lote:
+            return
+        yield lote
+        ultimo_id = lote[-1][0]
+
@@ -0,0 +1,269 @@
+"""
+Registro de métricas em processo, exposto no formato texto do Prometheus.
+
+Cada processo (worker do gunicorn) acumula contadores e histogramas em memória
+e, no máximo uma vez por CADASTRO_METRICAS_INTERVALO segundos, grava um
+instantâneo em um arquivo JSON próprio dentro de CADASTRO_METRICAS_DIR. A view
+de exposição soma os arquivos de todos os processos, então os números valem
+para a aplicação inteira e não só para o worker que atendeu a requisição.
+
+Os arquivos de processos que já terminaram (worker reciclado, deploy) são
+somados a ARQUIVO_ACUMULADO e removidos na exposição seguinte. Assim os
+contadores não caem quando um worker é substituído e o diretório não cresce
+a cada reinício. Eles só voltam a zero quando CADASTRO_METRICAS_DIR é
+apagado (com a aplicação parada), o que o Prometheus trata como um reset
+comum do contador. O diretório deve ser local a cada servidor: a verificação
+de que um processo terminou usa o pid gravado no nome do arquivo.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # fora do Unix (desenvolvimento) os arquivos não são compactados
+    fcntl = None
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_LOTE = (1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+# Soma dos instantâneos dos processos que já terminaram
+ARQUIVO_ACUMULADO = 'acumulado.json'
+
+# nome: (tipo, ajuda, buckets)
+METRICAS = {
+    'cadastro_requisicoes_total': (
+        'counter', 'Requisições atendidas por view e status HTTP.', None),
+    'cadastro_requisicao_segundos': (
+        'histogram', 'Latência das requisições por view.', BUCKETS_LATENCIA),
+    'cadastro_exportacao_linhas_total': (
+        'counter', 'Linhas exportadas por formato.', None),
+    'cadastro_exportacao_bytes_total': (
+        'counter', 'Bytes exportados por formato.', None),
+    'cadastro_exportacao_cache_total': (
+        'counter', 'Consultas ao cache de exportação por resultado (hit/miss).', None),
+    'cadastro_csv_linhas_total': (
+        'counter', 'Linhas de arquivos do ERP processadas por resultado.', None),
+    'cadastro_csv_segundos': (
+        'histogram', 'Duração do processamento de arquivos do ERP.', BUCKETS_LATENCIA),
+    'cadastro_bulk_insert_lote': (
+        'histogram', 'Tamanho dos lotes gravados com bulk_create por modelo.', BUCKETS_LOTE),
+}
+
+
+def _diretorio():
+    diretorio = Path(getattr(settings, 'CADASTRO_METRICAS_DIR',
+                             Path(tempfile.gettempdir()) / 'cadastro-metricas'))
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _serializar(contadores, histogramas):
+    return {
+        'contadores': [[n, list(r), v] for (n, r), v in contadores.items()],
+        'histogramas': [[n, list(r), s] for (n, r), s in histogramas.items()],
+    }
+
+
+def _gravar_json(diretorio, nome, dados):
+    """Gravação atômica via rename: quem lê nunca vê um arquivo pela metade."""
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(dados, f)
+    os.replace(temporario, diretorio / nome)
+
+
+class _Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reiniciar()
+        atexit.register(self.gravar)
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        # pid + instante de início: um pid reaproveitado não sobrescreve outro processo
+        self._arquivo = f'{self._pid}-{time.time_ns()}.json'
+        self._contadores = {}
+        self._histogramas = {}
+        self._ultima_gravacao = 0.0
+
+    def _verificar_fork(self):
+        # Após um fork (gunicorn --preload) o filho começa com registro vazio
+        if os.getpid() != self._pid:
+            self._reiniciar()
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._verificar_fork()
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+        self._gravar_se_necessario()
+
+    def observar(self, nome, valor, **rotulos):
+        buckets = METRICAS[nome][2]
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._verificar_fork()
+            serie = self._histogramas.setdefault(
+                chave, {'buckets': [0] * len(buckets), 'soma': 0.0, 'contagem': 0})
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    serie['buckets'][i] += 1
+                    break
+            serie['soma'] += valor
+            serie['contagem'] += 1
+        self._gravar_se_necessario()
+
+    def _gravar_se_necessario(self):
+        intervalo = getattr(settings, 'CADASTRO_METRICAS_INTERVALO', 1.0)
+        if time.monotonic() - self._ultima_gravacao >= intervalo:
+            self.gravar()
+
+    def gravar(self):
+        """Grava o instantâneo deste processo (gravação atômica via rename)."""
+        with self._lock:
+            self._verificar_fork()
+            self._ultima_gravacao = time.monotonic()
+            if not self._contadores and not self._histogramas:
+                return
+            _gravar_json(_diretorio(), self._arquivo, _serializar(self._contadores, self._histogramas))
+
+
+_registro = _Registro()
+incrementar = _registro.incrementar
+observar = _registro.observar
+
+
+# =============================================
+# EXPOSIÇÃO (FORMATO TEXTO DO PROMETHEUS)
+# =============================================
+
+def _ler(arquivo):
+    try:
+        return json.loads(arquivo.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _processo_terminou(arquivo):
+    """Se o processo dono do arquivo ({pid}-{início}.json) não existe mais."""
+    try:
+        pid = int(arquivo.stem.split('-')[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _somar(contadores, histogramas, dados):
+    for nome, rotulos, valor in dados['contadores']:
+        chave = (nome, tuple(map(tuple, rotulos)))
+        contadores[chave] = contadores.get(chave, 0) + valor
+    for nome, rotulos, serie in dados['histogramas']:
+        chave = (nome, tuple(map(tuple, rotulos)))
+        total = histogramas.setdefault(
+            chave, {'buckets': [0] * len(serie['buckets']), 'soma': 0.0, 'contagem': 0})
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], serie['buckets'])]
+        total['soma'] += serie['soma']
+        total['contagem'] += serie['contagem']
+
+
+def _compactar(diretorio, acumulado):
+    """
+    Soma ao acumulado os arquivos dos processos que terminaram e os remove.
+    O acumulado guarda os nomes que já incorporou: se a remoção falhar, o
+    arquivo é ignorado (e removido) depois, em vez de ser somado duas vezes.
+    """
+    compactados = set(acumulado.get('compactados', ()))
+    terminados = [
+        arquivo for arquivo in diretorio.glob('*-*.json')
+        if arquivo.name not in compactados and _processo_terminou(arquivo)
+    ]
+    if terminados:
+        contadores, histogramas = {}, {}
+        for dados in [acumulado, *map(_ler, terminados)]:
+            if dados:
+                _somar(contadores, histogramas, dados)
+        acumulado = {
+            **_serializar(contadores, histogramas),
+            'compactados': [arquivo.name for arquivo in terminados],
+        }
+        _gravar_json(diretorio, ARQUIVO_ACUMULADO, acumulado)
+    for nome in compactados:
+        (diretorio / nome).unlink(missing_ok=True)
+    for arquivo in terminados:
+        arquivo.unlink(missing_ok=True)
+    return acumulado
+
+
+def _agregar():
+    """
+    Soma o acumulado e os instantâneos dos processos ativos. A trava impede
+    que uma exposição leia o diretório no meio da compactação de outra.
+    """
+    diretorio = _diretorio()
+    with open(diretorio / '.trava', 'w') as trava:
+        if fcntl:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+        acumulado = _ler(diretorio / ARQUIVO_ACUMULADO) or {'contadores': [], 'histogramas': []}
+        if fcntl:
+            acumulado = _compactar(diretorio, acumulado)
+        compactados = set(acumulado.get('compactados', ()))
+
+        contadores, histogramas = {}, {}
+        _somar(contadores, histogramas, acumulado)
+        for arquivo in diretorio.glob('*-*.json'):
+            dados = _ler(arquivo)
+            if dados and arquivo.name not in compactados:
+                _somar(contadores, histogramas, dados)
+    return contadores, histogramas
+
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    texto = ','.join(
+        '{}="{}"'.format(
+            chave,
+            str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'),
+        )
+        for chave, valor in pares
+    )
+    return '{' + texto + '}'
+
+
+def gerar_texto_prometheus():
+    _registro.gravar()
+    contadores, histogramas = _agregar()
+
+    linhas = []
+    for nome, (tipo, ajuda, buckets) in METRICAS.items():
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'counter':
+            for (n, rotulos), valor in sorted(contadores.items()):
+                if n == nome:
+                    linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+            continue
+        for (n, rotulos), serie in sorted(histogramas.items()):
+            if n != nome:
+                continue
+            acumulado = 0
+            for limite, quantidade in zip(buckets, serie['buckets']):
+                acumulado += quantidade
+                linhas.append(f'{nome}_bucket{_rotulos(rotulos + (("le", limite),))} {acumulado}')
+            linhas.append(f'{nome}_bucket{_rotulos(rotulos + (("le", "+Inf"),))} {serie["contagem"]}')
+            linhas.append(f'{nome}_sum{_rotulos(rotulos)} {serie["soma"]}')
+            linhas.append(f'{nome}_count{_rotulos(rotulos)} {serie["contagem"]}')
+    return '\n'.join(linhas) + '\n'
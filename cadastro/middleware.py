@@ -1,5 +1,22 @@
+import json
+import logging
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connection
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele as respostas usam só gzip
+    brotli = None
+
+from . import auditoria, metricas
+
+logger_performance = logging.getLogger('cadastro.performance')
 
 class AccessControlMiddleware:
     """
@@ -56,3 +73,234 @@ class AccessControlMiddleware:
         # Passa a requisição para a próxima camada (view) se tudo estiver ok.
         response = self.get_response(request)
         return response
+
+
+class AuditoriaMiddleware:
+    """Disponibiliza a requisição atual ao módulo de auditoria (usuário das entradas)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = auditoria.definir_requisicao(request)
+        try:
+            return self.get_response(request)
+        finally:
+            auditoria.limpar_requisicao(token)
+
+
+class _MedidorConsultas:
+    """Wrapper de execução do banco que conta as consultas e soma o tempo gasto nelas."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tempo_ms += (time.perf_counter() - inicio) * 1000
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição: view, tempo total, consultas ao banco (quantidade e
+    tempo) e tamanho da resposta. Os números vão no cabeçalho Server-Timing e
+    em uma linha JSON no logger 'cadastro.performance'; views que estouram o
+    orçamento definido em CADASTRO_ORCAMENTOS geram um WARNING.
+
+    Em respostas streaming a medição continua até o último bloco ser enviado.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medidor = _MedidorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medidor):
+            response = self.get_response(request)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        response['Server-Timing'] = (
+            f'app;dur={duracao_ms:.1f}, '
+            f'db;dur={medidor.tempo_ms:.1f};desc="{medidor.consultas} consultas"'
+        )
+
+        if response.streaming:
+            response.streaming_content = self._medir_streaming(
+                request, response, response.streaming_content, medidor, inicio)
+        else:
+            self._registrar(request, response, medidor, duracao_ms, len(response.content))
+        return response
+
+    def _medir_streaming(self, request, response, conteudo, medidor, inicio):
+        tamanho = 0
+        with connection.execute_wrapper(medidor):
+            for bloco in conteudo:
+                tamanho += len(bloco)
+                yield bloco
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self._registrar(request, response, medidor, duracao_ms, tamanho)
+
+    def _registrar(self, request, response, medidor, duracao_ms, tamanho):
+        view = request.resolver_match.view_name if request.resolver_match else None
+        registro = {
+            'view': view,
+            'metodo': request.method,
+            'caminho': request.path,
+            'status': response.status_code,
+            'duracao_ms': round(duracao_ms, 2),
+            'consultas': medidor.consultas,
+            'tempo_banco_ms': round(medidor.tempo_ms, 2),
+            'bytes': tamanho,
+        }
+        logger_performance.info(json.dumps(registro, ensure_ascii=False))
+
+        if view and view.startswith('cadastro:'):
+            metricas.incrementar('cadastro_requisicoes_total', view=view, status=response.status_code)
+            metricas.observar('cadastro_requisicao_segundos', duracao_ms / 1000, view=view)
+
+        orcamento = getattr(settings, 'CADASTRO_ORCAMENTOS', {}).get(view)
+        if not orcamento:
+            return
+        excedidos = []
+        if medidor.consultas > orcamento.get('consultas', float('inf')):
+            excedidos.append('consultas')
+        if duracao_ms > orcamento.get('duracao_ms', float('inf')):
+            excedidos.append('duracao_ms')
+        if excedidos:
+            logger_performance.warning(json.dumps(
+                {**registro, 'orcamento': orcamento, 'excedido': excedidos},
+                ensure_ascii=False,
+            ))
+
+
+# =============================================
+# COMPRESSÃO DAS RESPOSTAS
+# =============================================
+
+# JSON das APIs e exportações em texto. HTML fica de fora (dados do usuário
+# e tokens na mesma resposta: BREACH); Excel, PDF, Parquet e ZIP já são
+# comprimidos.
+TIPOS_COMPRIMIVEIS = (
+    'application/json',
+    'text/csv',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+)
+
+# Abaixo disso o cabeçalho gzip/brotli não compensa
+TAMANHO_MINIMO_COMPRESSAO = 200
+
+# Níveis para conteúdo dinâmico: perto da taxa máxima por uma fração da CPU
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 5
+
+
+def codificacoes_disponiveis():
+    """Codificações suportadas, da preferida para a menos preferida."""
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def escolher_codificacao(accept_encoding):
+    """Melhor codificação aceita no cabeçalho Accept-Encoding, ou None."""
+    aceitas = {}
+    for item in accept_encoding.split(','):
+        nome, _, parametros = item.partition(';')
+        peso = 1.0
+        for parametro in parametros.split(';'):
+            chave, _, valor = parametro.partition('=')
+            if chave.strip() == 'q':
+                try:
+                    peso = float(valor)
+                except ValueError:
+                    peso = 0.0
+        aceitas[nome.strip().lower()] = peso
+    for codificacao in codificacoes_disponiveis():
+        if aceitas.get(codificacao, aceitas.get('*', 0)) > 0:
+            return codificacao
+    return None
+
+
+class _CompressorGzip:
+    """Mesma interface do brotli.Compressor (process/finish) sobre o zlib."""
+
+    def __init__(self):
+        # wbits=31: fluxo deflate com cabeçalho e rodapé gzip
+        self._zlib = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def process(self, dados):
+        return self._zlib.compress(dados)
+
+    def finish(self):
+        return self._zlib.flush()
+
+
+def comprimir_blocos(blocos, codificacao):
+    """Comprime os blocos à medida que chegam, sem acumular o corpo inteiro."""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=QUALIDADE_BROTLI)
+    else:
+        compressor = _CompressorGzip()
+    for bloco in blocos:
+        saida = compressor.process(bloco)
+        if saida:
+            yield saida
+    saida = compressor.finish()
+    if saida:
+        yield saida
+
+
+class CompressaoMiddleware:
+    """
+    Comprime as respostas de texto (JSON das APIs, CSV/TXT das exportações e
+    conversões) com brotli, se o pacote estiver instalado, ou gzip, conforme o
+    Accept-Encoding. Respostas streaming são comprimidas bloco a bloco.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._comprimivel(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = escolher_codificacao(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                # Só ocorre sob ASGI; a aplicação roda em WSGI (gunicorn)
+                return response
+            response.streaming_content = comprimir_blocos(response.streaming_content, codificacao)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            if len(response.content) < TAMANHO_MINIMO_COMPRESSAO:
+                return response
+            comprimido = b''.join(comprimir_blocos([response.content], codificacao))
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # O corpo mudou: um ETag forte deixa de valer (como no GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacao
+        return response
+
+    def _comprimivel(self, response):
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return False
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return tipo in TIPOS_COMPRIMIVEIS
@@ -1,7 +1,16 @@
-from django.db import models
+from collections import Counter
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connections, models, router, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .espacial import chave_hilbert
+
 # =============================================
 # CONSTANTES GLOBAIS
 # =============================================
@@ -14,6 +23,107 @@ UNIDADE_CHOICES = [
     ('Norte Pioneiro', 'Norte Pioneiro'),
 ]
 
+# Coordenadas são gravadas como inteiros em 1e-7 graus (~1 cm no equador),
+# bem acima da precisão de um GPS e cabendo em um inteiro de 32 bits
+ESCALA_COORDENADA = 10 ** 7
+CASAS_COORDENADA = 7
+
+
+def formatar_coordenada(valor):
+    """Formata uma coordenada inteira (1e-7 graus) como texto decimal, sem criar Decimal."""
+    sinal = '-' if valor < 0 else ''
+    inteiro, fracao = divmod(abs(valor), ESCALA_COORDENADA)
+    return f"{sinal}{inteiro}.{fracao:0{CASAS_COORDENADA}d}"
+
+# =============================================
+# CAMPO DE COORDENADA EM PONTO FIXO
+# =============================================
+
+class CoordenadaField(models.IntegerField):
+    """
+    Coordenada geográfica armazenada como inteiro escalado (1e-7 graus).
+
+    No Python o valor continua sendo um Decimal com 7 casas, então formulários,
+    filtros e serializações seguem usando graus normalmente.
+    """
+    _quantum = Decimal(1).scaleb(-CASAS_COORDENADA)
+
+    def to_python(self, value):
+        if value is None or value == '':
+            return None
+        try:
+            return Decimal(str(value)).quantize(self._quantum, rounding=ROUND_HALF_EVEN)
+        except InvalidOperation:
+            raise ValidationError(
+                self.error_messages['invalid'],
+                code='invalid',
+                params={'value': value},
+            )
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return Decimal(value).scaleb(-CASAS_COORDENADA)
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        if value is None:
+            return None
+        return int(value.scaleb(CASAS_COORDENADA))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': forms.DecimalField, **kwargs})
+
+
+class IndiceCronologico(models.Index):
+    """
+    Índice para colunas que só crescem (carimbos de tabelas append-only):
+    BRIN no PostgreSQL, com poucas páginas e custo quase nulo por INSERT;
+    B-tree comum nos demais bancos.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor == 'postgresql':
+            using = ' USING brin'
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class IndicePrefixo(models.Index):
+    """
+    Índice para buscas por prefixo (LIKE 'abc%'). No PostgreSQL usa a classe
+    de operadores varchar_pattern_ops, que atende ao LIKE em qualquer
+    collation; nos demais bancos é um B-tree comum, percorrido pela reescrita
+    em faixa de ClienteQuerySet.codigo_com_prefixo.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        indice = self
+        if schema_editor.connection.vendor == 'postgresql':
+            indice = self.clone()
+            indice.opclasses = ['varchar_pattern_ops'] * len(self.fields)
+        return super(IndicePrefixo, indice).create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class OrdemPorPadrao(models.OrderBy):
+    """
+    ORDER BY ... USING ~<~ (PostgreSQL): a ordem byte a byte em que um índice
+    varchar_pattern_ops é armazenado, para o banco devolver as primeiras
+    linhas direto do índice em vez de ordenar todas as que casam com o prefixo.
+    """
+    template = '%(expression)s USING ~<~'
+
+
+def _proximo_prefixo(prefixo):
+    """Menor texto maior que todos os que começam com `prefixo` (None se não houver)."""
+    prefixo = prefixo.rstrip(chr(0x10FFFF))
+    if not prefixo:
+        return None
+    proximo = ord(prefixo[-1]) + 1
+    if 0xD800 <= proximo <= 0xDFFF:
+        # Surrogates não existem em UTF-8; o próximo caractere válido é U+E000
+        proximo = 0xE000
+    return prefixo[:-1] + chr(proximo)
+
 # =============================================
 # MODELO DE USUÁRIO PERSONALIZADO
 # =============================================
@@ -41,6 +151,51 @@ class CustomUserManager(BaseUserManager):
             
         return self.create_user(email, password, **extra_fields)
 
+def base_username(email):
+    """Parte local do e-mail, usada como base do username gerado."""
+    return email.split('@')[0].lower()[:140]
+
+
+# Alocações de username tentadas antes de desistir por concorrência
+TENTATIVAS_USERNAME = 3
+
+
+def alocar_usernames(bases):
+    """
+    Reserva um username livre para cada base da lista (na mesma ordem),
+    seguindo o padrão base, base1, base2... Uma única consulta busca os
+    usernames existentes que começam com alguma das bases; a partir do maior
+    sufixo numérico de cada uma, os próximos são atribuídos em memória.
+    """
+    if not bases:
+        return []
+    distintas = set(bases)
+    filtro = models.Q()
+    for base in distintas:
+        filtro |= models.Q(username__startswith=base)
+    ocupados = set(CustomUser.objects.filter(filtro).values_list('username', flat=True))
+    
+    maiores = {}
+    for username in ocupados:
+        for base in distintas:
+            sufixo = username[len(base):]
+            if username.startswith(base) and (sufixo == '' or sufixo.isdigit()):
+                maiores[base] = max(maiores.get(base, 0), int(sufixo or 0))
+    
+    usernames = []
+    for base in bases:
+        sufixo = maiores[base] + 1 if base in maiores else 0
+        candidato = f"{base}{sufixo or ''}"
+        # Bases diferentes podem gerar o mesmo nome (joao7 + 1 e joao71)
+        while candidato in ocupados:
+            sufixo += 1
+            candidato = f"{base}{sufixo}"
+        ocupados.add(candidato)
+        maiores[base] = sufixo
+        usernames.append(candidato)
+    return usernames
+
+
 class CustomUser(AbstractUser):
     TIPO_ACESSO_CHOICES = [
         ('admin', 'Administrador'),
@@ -83,14 +238,25 @@ class CustomUser(AbstractUser):
 
     def save(self, *args, **kwargs):
         # Se username estiver vazio, usa parte do email para preenchimento automático
-        if not self.username and self.email:
-            # Garantimos que seja um username único, adicionando o ID se necessário (embora não seja estritamente necessário no save)
-            base_username = self.email.split('@')[0].lower()
-            self.username = base_username
-            # O AbstractUser já tem uma lógica para garantir a unicidade, 
-            # mas essa linha simples já ajuda a preencher o campo.
-
-        super().save(*args, **kwargs)
+        if self.username or not self.email:
+            return super().save(*args, **kwargs)
+        
+        # Outro cadastro simultâneo pode levar o mesmo nome entre a alocação e
+        # o INSERT: nesse caso aloca de novo (o savepoint preserva a transação).
+        # A causa é confirmada no banco, e não pela mensagem do erro, que muda
+        # conforme o banco e o nome da constraint
+        banco = kwargs.get('using') or router.db_for_write(type(self))
+        for tentativa in range(TENTATIVAS_USERNAME):
+            self.username = alocar_usernames([base_username(self.email)])[0]
+            try:
+                with transaction.atomic(using=banco):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                username_ocupado = type(self)._default_manager.using(banco).filter(
+                    username=self.username).exclude(pk=self.pk).exists()
+                if not username_ocupado or tentativa == TENTATIVAS_USERNAME - 1:
+                    self.username = None
+                    raise
 
     def __str__(self):
         return f"{self.nome_completo} - {self.unidade}"
@@ -107,6 +273,43 @@ class CustomUser(AbstractUser):
 # =============================================
 # MODELO CLIENTE
 # =============================================
+class ClienteQuerySet(models.QuerySet):
+    def com_coordenadas_inteiras(self):
+        """
+        Anota `latitude_e7`/`longitude_e7` com o inteiro bruto da coluna, sem a
+        conversão para Decimal. Usado nos laços de exportação e listagem.
+        """
+        return self.annotate(
+            latitude_e7=models.ExpressionWrapper(models.F('latitude'), output_field=models.IntegerField()),
+            longitude_e7=models.ExpressionWrapper(models.F('longitude'), output_field=models.IntegerField()),
+        )
+    
+    def codigo_com_prefixo(self, prefixo):
+        """
+        Clientes cujo codigo_cliente começa com `prefixo`. No SQLite o LIKE não
+        diferencia maiúsculas e por isso não usa índice; lá a busca vira a
+        faixa prefixo <= codigo_cliente < próximo prefixo, que usa o índice.
+        Nos demais bancos fica LIKE 'prefixo%' (varchar_pattern_ops no PostgreSQL).
+        """
+        if not prefixo or connections[self.db].vendor != 'sqlite':
+            return self.filter(codigo_cliente__startswith=prefixo)
+        clientes = self.filter(codigo_cliente__gte=prefixo)
+        fim = _proximo_prefixo(prefixo)
+        return clientes.filter(codigo_cliente__lt=fim) if fim else clientes
+    
+    def ordem_espacial(self):
+        """Ordena pela chave de Hilbert: clientes vizinhos no mapa ficam juntos."""
+        return self.order_by('chave_espacial', 'id')
+    
+    def ordenados_por_codigo(self):
+        """Ordena por codigo_cliente na ordem em que o índice de prefixo já está."""
+        if connections[self.db].vendor == 'postgresql':
+            return self.order_by(OrdemPorPadrao(models.F('codigo_cliente')), 'id')
+        return self.order_by('codigo_cliente', 'id')
+
+# Campos registrados (antes/depois) pela auditoria de Cliente
+CAMPOS_AUDITADOS = ('unidade', 'data_cadastro', 'codigo_cliente', 'latitude', 'longitude')
+
 class Cliente(models.Model):
     
     # Unidade usa a constante global UNIDADE_CHOICES
@@ -114,10 +317,72 @@ class Cliente(models.Model):
     data_cadastro = models.DateField()
     codigo_cliente = models.CharField(max_length=50)
     
-    # ✅ Padronização: 18 dígitos no total, 15 casas decimais é uma precisão comum e segura
-    # (Por exemplo, um DecimalField(max_digits=20, decimal_places=15) já é mais que o suficiente)
-    latitude = models.DecimalField(max_digits=18, decimal_places=15)
-    longitude = models.DecimalField(max_digits=18, decimal_places=15)
+    # Inteiros em 1e-7 graus (ver CoordenadaField). Bases antigas, com colunas
+    # decimal(18,15), são convertidas pelo comando `migrar_coordenadas`.
+    latitude = CoordenadaField('Latitude')
+    longitude = CoordenadaField('Longitude')
+    
+    # Controle de alterações para a exportação incremental (delta)
+    criado_em = models.DateTimeField('Criado em', default=timezone.now, editable=False)
+    atualizado_em = models.DateTimeField('Atualizado em', default=timezone.now, editable=False)
+    
+    # Controle de concorrência otimista: editar_cliente só grava se a versão
+    # enviada pelo cliente ainda for a do banco
+    versao = models.PositiveIntegerField('Versão', default=1, editable=False)
+    
+    # Operador que registrou o cliente; alimenta o rollup ProdutividadeDiaria
+    cadastrado_por = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='clientes_cadastrados',
+        verbose_name='Cadastrado por',
+    )
+    
+    # Posição na curva de Hilbert de (latitude, longitude), recalculada a cada
+    # gravação (ver espacial.py); nula só em linhas anteriores ao campo, que o
+    # comando `ordenar_espacial` preenche
+    chave_espacial = models.BigIntegerField('Chave espacial', null=True, blank=True, editable=False)
+    
+    objects = ClienteQuerySet.as_manager()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda a unidade carregada do banco para invalidar também o escopo
+        # antigo quando o cliente muda de unidade
+        instance._unidade_original = instance.__dict__.get('unidade')
+        # Valores carregados, comparados pela auditoria ao salvar
+        instance._valores_auditados = {
+            campo: instance.__dict__[campo] for campo in CAMPOS_AUDITADOS if campo in instance.__dict__
+        }
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Toda gravação avança o carimbo usado pela exportação incremental
+        # e, em alterações, a versão usada no controle de concorrência
+        self.atualizado_em = timezone.now()
+        if not self._state.adding:
+            self.versao += 1
+        self.calcular_chave_espacial()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'atualizado_em', 'versao'}
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('chave_espacial')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    def calcular_chave_espacial(self):
+        """Atualiza chave_espacial; chamado pelo save() e antes de bulk_create."""
+        latitude = self._meta.get_field('latitude').get_prep_value(self.latitude)
+        longitude = self._meta.get_field('longitude').get_prep_value(self.longitude)
+        if latitude is None or longitude is None:
+            self.chave_espacial = None
+        else:
+            self.chave_espacial = chave_hilbert(latitude, longitude)
     
     def __str__(self):
         return f"{self.codigo_cliente} - {self.unidade}"
@@ -125,7 +390,247 @@ class Cliente(models.Model):
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        indexes = [
+            # Paginação por keyset da exportação incremental: (atualizado_em, id)
+            models.Index(fields=['atualizado_em', 'id'], name='cliente_atualizado_idx'),
+            # Busca por prefixo do código (parâmetro q de lista_clientes)
+            IndicePrefixo(fields=['codigo_cliente'], name='cliente_codigo_prefixo_idx'),
+            # Ordem espacial (ordem=espacial na exportação e CLUSTER no PostgreSQL)
+            models.Index(fields=['chave_espacial', 'id'], name='cliente_espacial_idx'),
+        ]
         # Adiciona um índice composto para consultas rápidas
         # constraints = [
         #     models.UniqueConstraint(fields=['codigo_cliente', 'unidade', 'data_cadastro'], name='unique_cliente_unidade_data')
-        # ]
\ No newline at end of file
+        # ]
+
+
+# =============================================
+# MODELO CLIENTE EXCLUÍDO (TOMBSTONE)
+# =============================================
+class ClienteExcluido(models.Model):
+    """Registro de exclusão de um Cliente, consumido pela exportação incremental."""
+    
+    cliente_id = models.BigIntegerField()
+    unidade = models.CharField(max_length=100, choices=UNIDADE_CHOICES)
+    codigo_cliente = models.CharField(max_length=50)
+    excluido_em = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.codigo_cliente} - {self.unidade} (excluído)"
+    
+    class Meta:
+        verbose_name = "Cliente Excluído"
+        verbose_name_plural = "Clientes Excluídos"
+        indexes = [
+            models.Index(fields=['excluido_em', 'id'], name='cliente_excluido_idx'),
+        ]
+
+
+# =============================================
+# MODELO SINCRONIZAÇÃO (FILA OFFLINE DO CADASTRO)
+# =============================================
+class SincronizacaoCliente(models.Model):
+    """
+    Chave de idempotência de cada registro recebido da fila offline de
+    cadastro.html. Um lote reenviado depois de uma falha de rede encontra as
+    chaves já gravadas e recebe de volta os clientes criados na primeira vez,
+    em vez de duplicá-los.
+    """
+    
+    chave = models.UUIDField('Chave de idempotência', unique=True)
+    cliente_id = models.BigIntegerField()
+    usuario = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sincronizacoes',
+    )
+    recebido_em = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.chave} -> cliente {self.cliente_id}"
+    
+    class Meta:
+        verbose_name = "Sincronização de Cliente"
+        verbose_name_plural = "Sincronizações de Clientes"
+
+
+# =============================================
+# MODELO AUDITORIA DE CLIENTE (APPEND-ONLY)
+# =============================================
+class AuditoriaCliente(models.Model):
+    """
+    Histórico de criações, alterações e exclusões de Cliente, com os valores
+    antes/depois de cada campo alterado. Gravado em lotes pelo módulo
+    `auditoria`, nunca atualizado. Sem chaves estrangeiras: as entradas
+    sobrevivem à exclusão do cliente e do usuário, e os INSERTs não validam
+    referências.
+    """
+    
+    ACAO_CHOICES = [
+        ('criacao', 'Criação'),
+        ('alteracao', 'Alteração'),
+        ('exclusao', 'Exclusão'),
+    ]
+    
+    cliente_id = models.BigIntegerField()
+    codigo_cliente = models.CharField(max_length=50)
+    unidade = models.CharField(max_length=100, choices=UNIDADE_CHOICES)
+    acao = models.CharField(max_length=10, choices=ACAO_CHOICES)
+    # {campo: [antes, depois]}; None no lado que não existe (criação/exclusão)
+    alteracoes = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    usuario_id = models.BigIntegerField(null=True, blank=True)
+    usuario_email = models.CharField(max_length=254, blank=True)
+    registrado_em = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.codigo_cliente} - {self.get_acao_display()} em {self.registrado_em:%d/%m/%Y %H:%M}"
+    
+    class Meta:
+        verbose_name = "Auditoria de Cliente"
+        verbose_name_plural = "Auditoria de Clientes"
+        indexes = [
+            # Histórico de um cliente, do mais recente para o mais antigo
+            models.Index(fields=['codigo_cliente', 'registrado_em'], name='auditoria_codigo_idx'),
+            models.Index(fields=['cliente_id', 'registrado_em'], name='auditoria_cliente_idx'),
+            # Consultas e expurgo por período
+            IndiceCronologico(fields=['registrado_em'], name='auditoria_registrado_idx'),
+        ]
+
+
+# =============================================
+# MODELO PRODUTIVIDADE DIÁRIA (ROLLUP)
+# =============================================
+class ProdutividadeDiaria(models.Model):
+    """
+    Quantidade de clientes cadastrados por operador, unidade e dia (data local
+    de criado_em). Mantida de forma incremental pelos sinais de Cliente e pelas
+    operações em lote, e reconstruída pelo comando `recalcular_produtividade`.
+    O relatório de produtividade lê apenas esta tabela.
+    """
+    
+    operador = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='produtividade',
+    )
+    unidade = models.CharField(max_length=100, choices=UNIDADE_CHOICES)
+    dia = models.DateField()
+    quantidade = models.IntegerField(default=0)
+    
+    @staticmethod
+    def agrupar(linhas):
+        """
+        Conta linhas (operador_id, unidade, criado_em) por chave do rollup.
+        Clientes sem operador (anteriores ao campo) não entram na contagem.
+        """
+        return Counter(
+            (operador_id, unidade, timezone.localdate(criado_em))
+            for operador_id, unidade, criado_em in linhas
+            if operador_id is not None
+        )
+    
+    @classmethod
+    def somar(cls, contagens):
+        """
+        Aplica as diferenças de `contagens` ({(operador_id, unidade, dia): n},
+        n pode ser negativo) com UPDATE ... quantidade = quantidade + n, criando
+        a linha quando ainda não existe.
+        """
+        for (operador_id, unidade, dia), quantidade in contagens.items():
+            if not quantidade:
+                continue
+            linha = cls.objects.filter(operador_id=operador_id, unidade=unidade, dia=dia)
+            if linha.update(quantidade=models.F('quantidade') + quantidade):
+                continue
+            try:
+                with transaction.atomic(using=router.db_for_write(cls)):
+                    cls.objects.create(operador_id=operador_id, unidade=unidade, dia=dia, quantidade=quantidade)
+            except IntegrityError:
+                # Outra requisição criou a linha entre o UPDATE e o INSERT
+                linha.update(quantidade=models.F('quantidade') + quantidade)
+    
+    def __str__(self):
+        return f"{self.operador} - {self.unidade} - {self.dia:%d/%m/%Y}: {self.quantidade}"
+    
+    class Meta:
+        verbose_name = "Produtividade Diária"
+        verbose_name_plural = "Produtividade Diária"
+        constraints = [
+            models.UniqueConstraint(fields=['operador', 'unidade', 'dia'], name='produtividade_unica'),
+        ]
+        indexes = [
+            # Relatório: período, opcionalmente filtrado por unidade
+            models.Index(fields=['dia', 'unidade'], name='produtividade_dia_idx'),
+        ]
+
+
+# =============================================
+# MODELO PROCESSAMENTO DE ARQUIVO (IMPORTAÇÃO EM SEGUNDO PLANO)
+# =============================================
+class ProcessamentoArquivo(models.Model):
+    """
+    Arquivo do ERP enviado em novos_clientes para conversão em segundo plano.
+    Consumido pelo comando `processar_importacoes`, que atualiza as contagens
+    conforme avança; a página de upload acompanha o andamento por polling.
+    """
+    
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    ]
+    
+    usuario = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='processamentos',
+    )
+    arquivo = models.FileField('Arquivo enviado', upload_to='importacoes/entrada/%Y/%m/', blank=True)
+    nome_original = models.CharField('Nome do arquivo', max_length=255)
+    tamanho = models.BigIntegerField('Tamanho (bytes)', default=0)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pendente')
+    
+    linhas_lidas = models.PositiveIntegerField(default=0)
+    linhas_processadas = models.PositiveIntegerField(default=0)
+    linhas_ignoradas = models.PositiveIntegerField(default=0)
+    linhas_erros = models.PositiveIntegerField(default=0)
+    bytes_lidos = models.BigIntegerField(default=0)
+    
+    resultado = models.FileField('TXT gerado', upload_to='importacoes/saida/%Y/%m/', blank=True)
+    nome_resultado = models.CharField(max_length=255, blank=True)
+    mensagem = models.TextField(blank=True)
+    
+    criado_em = models.DateTimeField('Criado em', default=timezone.now)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    # Avançado a cada atualização de progresso e pelo sinal de vida do worker
+    # (processar_importacoes): detecta workers interrompidos
+    atualizado_em = models.DateTimeField(default=timezone.now)
+    
+    @property
+    def finalizado(self):
+        return self.status in ('concluido', 'erro')
+    
+    @property
+    def percentual(self):
+        if self.status == 'concluido':
+            return 100
+        if self.status == 'erro' or not self.tamanho or not self.bytes_lidos:
+            return None
+        return min(99, int(self.bytes_lidos * 100 / self.tamanho))
+    
+    def __str__(self):
+        return f"{self.nome_original} ({self.get_status_display()})"
+    
+    class Meta:
+        verbose_name = "Processamento de Arquivo"
+        verbose_name_plural = "Processamentos de Arquivos"
+        indexes = [
+            # Fila do worker: próximos pendentes por ordem de chegada
+            models.Index(fields=['status', 'criado_em'], name='processamento_fila_idx'),
+        ]
@@ -0,0 +1,128 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import auditoria, cache_exportacao
+from .models import Cliente, ClienteExcluido, ProdutividadeDiaria
+
+_estado = threading.local()
+
+
+@contextmanager
+def sinais_suspensos():
+    """
+    Desliga os receivers abaixo na thread atual. Usado pelas operações em
+    lote, que criam os tombstones e as entradas de auditoria, ajustam a
+    produtividade e invalidam o cache uma única vez em vez de uma vez por
+    cliente.
+    """
+    anterior = getattr(_estado, 'suspenso', False)
+    _estado.suspenso = True
+    try:
+        yield
+    finally:
+        _estado.suspenso = anterior
+
+
+def _suspenso():
+    return getattr(_estado, 'suspenso', False)
+
+
+# =============================================
+# PRODUTIVIDADE POR OPERADOR/UNIDADE/DIA
+# =============================================
+
+# Conectado antes de cliente_salvo, que sobrescreve _unidade_original
+@receiver(post_save, sender=Cliente)
+def produtividade_cliente_salvo(sender, instance, created, raw=False, **kwargs):
+    if _suspenso() or raw or instance.cadastrado_por_id is None:
+        return
+    chave = (instance.cadastrado_por_id, instance.unidade, timezone.localdate(instance.criado_em))
+    if created:
+        ProdutividadeDiaria.somar({chave: 1})
+        return
+    # Mudança de unidade: o cadastro passa a contar na unidade nova
+    anterior = getattr(instance, '_unidade_original', None)
+    if anterior and anterior != instance.unidade:
+        ProdutividadeDiaria.somar({(chave[0], anterior, chave[2]): -1, chave: 1})
+
+
+@receiver(post_delete, sender=Cliente)
+def produtividade_cliente_excluido(sender, instance, **kwargs):
+    if _suspenso() or instance.cadastrado_por_id is None:
+        return
+    ProdutividadeDiaria.somar({
+        (instance.cadastrado_por_id, instance.unidade, timezone.localdate(instance.criado_em)): -1,
+    })
+
+
+# =============================================
+# INVALIDAÇÃO DO CACHE DE EXPORTAÇÃO
+# =============================================
+
+@receiver(post_save, sender=Cliente)
+def cliente_salvo(sender, instance, **kwargs):
+    if _suspenso():
+        return
+    # Invalida a unidade atual e, se o cliente mudou de unidade, a anterior
+    cache_exportacao.invalidar(instance.unidade, getattr(instance, '_unidade_original', None))
+    instance._unidade_original = instance.unidade
+
+
+@receiver(post_delete, sender=Cliente)
+def cliente_excluido(sender, instance, **kwargs):
+    if _suspenso():
+        return
+    cache_exportacao.invalidar(instance.unidade)
+
+
+# =============================================
+# TOMBSTONES PARA A EXPORTAÇÃO INCREMENTAL
+# =============================================
+
+@receiver(post_delete, sender=Cliente)
+def registrar_exclusao(sender, instance, **kwargs):
+    if _suspenso():
+        return
+    ClienteExcluido.objects.create(
+        cliente_id=instance.pk,
+        unidade=instance.unidade,
+        codigo_cliente=instance.codigo_cliente,
+    )
+
+
+# =============================================
+# AUDITORIA (GRAVADA EM LOTE APÓS A RESPOSTA)
+# =============================================
+
+@receiver(post_save, sender=Cliente)
+def auditar_cliente_salvo(sender, instance, created, raw=False, **kwargs):
+    if _suspenso() or raw:
+        return
+    if created:
+        anteriores, atuais = {}, auditoria.valores(instance)
+    else:
+        # Sem os valores carregados do banco (objeto montado à mão) não há o que comparar
+        anteriores = getattr(instance, '_valores_auditados', {})
+        atuais = auditoria.valores(instance, anteriores)
+    alteracoes = auditoria.diferencas(anteriores, atuais)
+    # Um segundo save() do mesmo objeto compara com o estado já gravado
+    instance._valores_auditados = {**anteriores, **atuais}
+    if alteracoes:
+        auditoria.registrar(auditoria.nova_entrada(
+            'criacao' if created else 'alteracao',
+            instance.pk, instance.codigo_cliente, instance.unidade, alteracoes,
+        ))
+
+
+@receiver(post_delete, sender=Cliente)
+def auditar_cliente_excluido(sender, instance, **kwargs):
+    if _suspenso():
+        return
+    auditoria.registrar(auditoria.nova_entrada(
+        'exclusao', instance.pk, instance.codigo_cliente, instance.unidade,
+        auditoria.diferencas(auditoria.valores(instance), {}),
+    ))
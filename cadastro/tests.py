@@ -1,3 +1,405 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import cache_exportacao, models
+from .benchmarks import COORDENADAS_UNIDADES
+from .forms import ClienteForm
+from .importacao_usuarios import importar_usuarios
+from .models import Cliente, ClienteExcluido, CustomUser, SincronizacaoCliente
+
+_METRICAS_DIR = tempfile.mkdtemp(prefix='cadastro-testes-metricas-')
+
+
+def criar_cliente(codigo, unidade='Maringá', **campos):
+    latitude, longitude = COORDENADAS_UNIDADES[unidade]
+    return Cliente.objects.create(
+        unidade=unidade, codigo_cliente=codigo, latitude=latitude, longitude=longitude,
+        data_cadastro='2026-01-05', **campos,
+    )
+
+
+# Sem o redirecionamento para HTTPS de DEBUG=False e com as métricas fora do projeto
+@override_settings(SECURE_SSL_REDIRECT=False, CADASTRO_METRICAS_DIR=_METRICAS_DIR)
+class CadastroTestCase(TestCase):
+    tipo_acesso = 'admin'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user(
+            email='responsavel@exemplo.com', password='senha', nome_completo='Responsável',
+            unidade='Maringá', tipo_acesso=cls.tipo_acesso,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(_METRICAS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def enviar_json(self, metodo, url, dados):
+        return self.client.generic(metodo, url, json.dumps(dados), content_type='application/json')
+
+
+# =============================================
+# EDIÇÃO COM CONTROLE DE VERSÃO
+# =============================================
+
+class EditarClienteTests(CadastroTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = criar_cliente('124')
+        self.url = f'/cadastro/api/clientes/{self.cliente.id}/editar/'
+
+    def test_patch_grava_e_avanca_versao(self):
+        resposta = self.enviar_json('PATCH', self.url, {'codigo_cliente': '125', 'versao': self.cliente.versao})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['alterados'], ['codigo_cliente'])
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.codigo_cliente, '125')
+        self.assertEqual(resposta.json()['cliente']['versao'], self.cliente.versao)
+
+    def test_versao_desatualizada_devolve_cliente_gravado(self):
+        versao_antiga = self.cliente.versao
+        self.enviar_json('PATCH', self.url, {'codigo_cliente': '126', 'versao': versao_antiga})
+
+        resposta = self.enviar_json('PATCH', self.url, {'codigo_cliente': '125', 'versao': versao_antiga})
+
+        self.assertEqual(resposta.status_code, 409)
+        gravado = Cliente.objects.get(pk=self.cliente.pk)
+        self.assertEqual(gravado.codigo_cliente, '126')
+        self.assertEqual(resposta.json()['cliente'], {
+            'id': gravado.id,
+            'unidade': gravado.unidade,
+            'codigo_cliente': gravado.codigo_cliente,
+            'latitude': str(gravado.latitude),
+            'longitude': str(gravado.longitude),
+            'data_cadastro': gravado.data_cadastro.strftime('%Y-%m-%d'),
+            'versao': gravado.versao,
+        })
+
+    def test_patch_exige_versao_inteira(self):
+        for corpo in ({'codigo_cliente': '125'}, {'codigo_cliente': '125', 'versao': 'abc'},
+                      {'codigo_cliente': '125', 'versao': [1]}):
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self.enviar_json('PATCH', self.url, corpo).status_code, 400)
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.codigo_cliente, '124')
+
+    def test_corpo_que_nao_e_objeto(self):
+        for corpo in ([], 'x', 1):
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self.enviar_json('PATCH', self.url, corpo).status_code, 400)
+
+
+# =============================================
+# SINCRONIZAÇÃO DA FILA OFFLINE
+# =============================================
+
+class SincronizarClientesTests(CadastroTestCase):
+    url = '/cadastro/api/clientes/sincronizar/'
+
+    def registro(self, codigo, chave=None, **campos):
+        latitude, longitude = COORDENADAS_UNIDADES['Maringá']
+        return {
+            'chave': str(chave or uuid.uuid4()), 'unidade': 'Maringá', 'data_cadastro': '2026-01-05',
+            'codigo_cliente': codigo, 'latitude': latitude, 'longitude': longitude, **campos,
+        }
+
+    def sincronizar(self, registros):
+        resposta = self.enviar_json('POST', self.url, {'registros': registros})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_reenvio_do_lote_nao_duplica(self):
+        registros = [self.registro('1'), self.registro('2')]
+        primeira = self.sincronizar(registros)
+        segunda = self.sincronizar(registros)
+
+        self.assertEqual([r['status'] for r in primeira['resultados']], ['criado', 'criado'])
+        self.assertEqual([r['status'] for r in segunda['resultados']], ['duplicado', 'duplicado'])
+        self.assertEqual([r['id'] for r in segunda['resultados']], [r['id'] for r in primeira['resultados']])
+        self.assertEqual(Cliente.objects.count(), 2)
+        self.assertEqual(SincronizacaoCliente.objects.count(), 2)
+
+    def test_reenvio_simultaneo_devolve_o_cliente_ja_gravado(self):
+        registro = self.registro('1')
+        anterior = self.sincronizar([registro])['resultados'][0]['id']
+
+        # A consulta das chaves não vê a gravação do outro reenvio, como se
+        # ele tivesse feito o commit entre a consulta e o INSERT
+        filtrar, consultas = SincronizacaoCliente.objects.filter, []
+
+        def filtrar_atrasado(*args, **kwargs):
+            consultas.append(kwargs)
+            queryset = filtrar(*args, **kwargs)
+            return queryset.none() if len(consultas) == 1 else queryset
+
+        with mock.patch.object(SincronizacaoCliente.objects, 'filter', side_effect=filtrar_atrasado):
+            resultado = self.sincronizar([registro])['resultados'][0]
+
+        self.assertEqual(len(consultas), 2)
+        self.assertEqual((resultado['status'], resultado['id']), ('duplicado', anterior))
+        self.assertEqual(Cliente.objects.count(), 1)
+
+    def test_chave_repetida_no_mesmo_lote(self):
+        registro = self.registro('1')
+        resposta = self.sincronizar([registro, registro])
+        self.assertEqual([r['status'] for r in resposta['resultados']], ['criado', 'duplicado'])
+        self.assertEqual(resposta['resultados'][0]['id'], resposta['resultados'][1]['id'])
+        self.assertEqual(Cliente.objects.count(), 1)
+
+    def test_registro_invalido_nao_impede_os_demais(self):
+        resposta = self.sincronizar([
+            self.registro('abc'), self.registro('2'), self.registro('3', chave='nao-e-uuid'),
+        ])
+        self.assertEqual([r['status'] for r in resposta['resultados']], ['erro', 'criado', 'erro'])
+        self.assertEqual((resposta['criados'], resposta['erros']), (1, 2))
+        self.assertEqual(list(Cliente.objects.values_list('codigo_cliente', flat=True)), ['2'])
+
+    def test_corpo_invalido(self):
+        for corpo in ([], {'registros': 'x'}, {}):
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self.enviar_json('POST', self.url, corpo).status_code, 400)
+
+
+# =============================================
+# EDIÇÃO E EXCLUSÃO EM LOTE
+# =============================================
+
+class OperacoesEmLoteTests(CadastroTestCase):
+    url_editar = '/cadastro/api/clientes/lote/editar/'
+    url_excluir = '/cadastro/api/clientes/lote/excluir/'
+
+    def setUp(self):
+        super().setUp()
+        self.clientes = [criar_cliente(str(codigo)) for codigo in range(1, 5)]
+        self.outra_unidade = criar_cliente('1', unidade='Guarapuava')
+
+    def editar(self, dados):
+        return self.enviar_json('POST', self.url_editar, {'valores': {'data_cadastro': '2026-03-01'}, **dados})
+
+    def editados(self):
+        return set(Cliente.objects.filter(data_cadastro='2026-03-01').values_list('id', flat=True))
+
+    def test_selecao_por_ids(self):
+        ids = [self.clientes[0].id, self.clientes[2].id]
+        resposta = self.editar({'ids': ids})
+        self.assertEqual(resposta.json()['afetados'], 2)
+        self.assertEqual(self.editados(), set(ids))
+
+    def test_selecao_por_filtro(self):
+        resposta = self.editar({'filtro': {'unidade': 'Maringá', 'codigos': ['1', 2]}})
+        self.assertEqual(resposta.json()['afetados'], 2)
+        self.assertEqual(self.editados(), {self.clientes[0].id, self.clientes[1].id})
+
+    def test_dry_run_nao_grava(self):
+        resposta = self.editar({'filtro': {'codigos': ['1']}, 'dry_run': True})
+        self.assertEqual(resposta.json()['afetados'], 2)
+        self.assertEqual(self.editados(), set())
+
+    def test_selecao_invalida(self):
+        casos = [
+            [1],
+            {},
+            {'ids': '12'},
+            {'ids': [1, 'a']},
+            {'ids': [True]},
+            {'filtro': [1]},
+            {'filtro': {'codigos': '12'}},
+            {'filtro': {'codigos': 12}},
+            {'filtro': {'codigos': [['1']]}},
+            {'filtro': {'data_inicio': '01/03/2026'}},
+        ]
+        for dados in casos:
+            with self.subTest(dados=dados):
+                for url in (self.url_editar, self.url_excluir):
+                    self.assertEqual(self.enviar_json('POST', url, dados).status_code, 400)
+        self.assertEqual(self.editados(), set())
+        self.assertEqual(Cliente.objects.count(), 5)
+
+    def test_valores_invalidos(self):
+        for valores in ([1], {'codigo_cliente': '9'}, {}):
+            with self.subTest(valores=valores):
+                resposta = self.enviar_json('POST', self.url_editar, {'ids': [self.clientes[0].id], 'valores': valores})
+                self.assertEqual(resposta.status_code, 400)
+
+    def test_exclusao_conta_clientes_e_grava_tombstones(self):
+        ids = [cliente.id for cliente in self.clientes[:3]]
+        resposta = self.enviar_json('POST', self.url_excluir, {'ids': ids})
+        self.assertEqual(resposta.json()['afetados'], 3)
+        self.assertFalse(Cliente.objects.filter(id__in=ids).exists())
+        self.assertEqual(
+            set(ClienteExcluido.objects.values_list('cliente_id', flat=True)), set(ids),
+        )
+
+
+# =============================================
+# VALIDAÇÃO POR REGIÃO DA UNIDADE
+# =============================================
+
+class ValidacaoRegiaoTests(CadastroTestCase):
+    # Coordenada de Maringá, fora da região de Guarapuava
+    dados = {
+        'unidade': 'Guarapuava', 'data_cadastro': '2026-01-05', 'codigo_cliente': '10',
+        'latitude': COORDENADAS_UNIDADES['Maringá'][0], 'longitude': COORDENADAS_UNIDADES['Maringá'][1],
+    }
+
+    def test_desligada_por_padrao(self):
+        self.assertTrue(ClienteForm(self.dados).is_valid())
+
+    @override_settings(CADASTRO_REGIOES_VALIDAR=True)
+    def test_ligada_recusa_ponto_fora_da_regiao(self):
+        form = ClienteForm(self.dados)
+        self.assertFalse(form.is_valid())
+        self.assertIn('latitude', form.errors)
+
+    def mover_para_guarapuava(self):
+        ids = [criar_cliente('1').id, criar_cliente('2', unidade='Guarapuava').id]
+        resposta = self.enviar_json('POST', '/cadastro/api/clientes/lote/editar/', {
+            'ids': ids, 'valores': {'unidade': 'Guarapuava'},
+        })
+        return ids, resposta.json()
+
+    def test_lote_sem_validacao_move_todos(self):
+        _, resposta = self.mover_para_guarapuava()
+        self.assertEqual(resposta['afetados'], 2)
+        self.assertNotIn('clientes_recusados', resposta)
+
+    @override_settings(CADASTRO_REGIOES_VALIDAR=True)
+    def test_lote_com_validacao_devolve_recusados(self):
+        (maringa, guarapuava), resposta = self.mover_para_guarapuava()
+        self.assertEqual(resposta['afetados'], 1)
+        self.assertEqual([r['id'] for r in resposta['clientes_recusados']], [maringa])
+        self.assertEqual(Cliente.objects.get(pk=maringa).unidade, 'Maringá')
+
+
+# =============================================
+# CACHE DA EXPORTAÇÃO
+# =============================================
+
+class CacheExportacaoTests(CadastroTestCase):
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.mkdtemp(prefix='cadastro-testes-cache-')
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = override_settings(EXPORT_CACHE_ENABLED=True, EXPORT_CACHE_DIR=diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        criar_cliente('1')
+
+    def exportar(self, dia):
+        agora = datetime(2026, 3, dia, 12, tzinfo=dt_timezone.utc)
+        # Só o nome do arquivo vê o outro dia: a sessão dura uma hora
+        with mock.patch('cadastro.exportacao.timezone', mock.Mock(now=mock.Mock(return_value=agora))):
+            resposta = self.client.get('/cadastro/exportar-dados/', {'formato': 'excel', 'unidade': 'Maringá'})
+        self.assertEqual(resposta.status_code, 200, resposta.get('Location'))
+        return resposta
+
+    def test_acerto_do_cache_usa_a_data_do_download(self):
+        gerada = self.exportar(1)
+        servida = self.exportar(2)
+
+        self.assertNotIsInstance(gerada, type(servida))
+        self.assertEqual(gerada['Content-Disposition'], 'attachment; filename="geolocalizacao-maringá-01-03-2026.xlsx"')
+        self.assertEqual(servida['Content-Disposition'], 'attachment; filename="geolocalizacao-maringá-02-03-2026.xlsx"')
+        self.assertEqual(b''.join(servida.streaming_content), gerada.content)
+
+
+
+class VersaoCacheExportacaoTests(SimpleTestCase):
+    def test_invalidacoes_simultaneas_nao_se_perdem(self):
+        diretorio = tempfile.mkdtemp(prefix='cadastro-testes-cache-')
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+
+        def invalidar():
+            for _ in range(25):
+                cache_exportacao.invalidar('Maringá')
+
+        # Cada invalidação executa na hora, como após o commit de cada worker
+        with override_settings(EXPORT_CACHE_DIR=diretorio), \
+                mock.patch('django.db.transaction.on_commit', side_effect=lambda funcao: funcao()):
+            threads = [threading.Thread(target=invalidar) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(cache_exportacao._versoes('Maringá'), [200])
+
+
+# =============================================
+# USERNAMES GERADOS (COLISÃO ENTRE CADASTROS SIMULTÂNEOS)
+# =============================================
+
+def alocacao_com_colisao(ocupado):
+    """
+    alocar_usernames que, na primeira chamada, devolve `ocupado` para o
+    primeiro e-mail, como se outro cadastro o tivesse levado logo depois da
+    consulta. As chamadas seguintes alocam normalmente.
+    """
+    chamadas = []
+    original = models.alocar_usernames
+
+    def alocar(bases):
+        chamadas.append(bases)
+        usernames = original(bases)
+        if len(chamadas) == 1:
+            usernames[0] = ocupado
+        return usernames
+
+    return alocar, chamadas
+
+
+class UsernameTests(TestCase):
+    def setUp(self):
+        self.existente = CustomUser.objects.create_user(
+            email='ana@exemplo.com', password='senha', nome_completo='Ana', unidade='Maringá',
+        )
+
+    def criar(self, email):
+        return CustomUser.objects.create_user(
+            email=email, password='senha', nome_completo='Outra Ana', unidade='Maringá',
+        )
+
+    def test_username_base_e_sufixo(self):
+        self.assertEqual(self.existente.username, 'ana')
+        self.assertEqual(self.criar('ana@outro.com').username, 'ana1')
+
+    def test_save_realoca_quando_username_foi_levado(self):
+        alocar, chamadas = alocacao_com_colisao('ana')
+        with mock.patch.object(models, 'alocar_usernames', alocar):
+            usuario = self.criar('ana@outro.com')
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(usuario.username, 'ana1')
+
+    def test_save_nao_repete_outras_violacoes(self):
+        alocar, chamadas = alocacao_com_colisao('ana1')
+        with mock.patch.object(models, 'alocar_usernames', alocar):
+            with self.assertRaises(IntegrityError):
+                self.criar('ana@exemplo.com')
+        self.assertEqual(len(chamadas), 1)
+
+    def test_importacao_realoca_quando_username_foi_levado(self):
+        arquivo = io.BytesIO(
+            'email;nome_completo;unidade;tipo_acesso\n'
+            'ana@outro.com;Outra Ana;Maringá;operador\n'
+            'bruno@exemplo.com;Bruno;Guarapuava;operador\n'.encode('utf-8')
+        )
+        alocar, chamadas = alocacao_com_colisao('ana')
+        with mock.patch('cadastro.importacao_usuarios.alocar_usernames', alocar):
+            resultado = importar_usuarios(arquivo, processos=1)
+        self.assertEqual(resultado['criados'], 2, resultado['erros'])
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(
+            set(CustomUser.objects.values_list('username', flat=True)), {'ana', 'ana1', 'bruno'},
+        )
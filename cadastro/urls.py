@@ -21,12 +21,16 @@ urlpatterns = [
     # URLs Principais do Sistema (Clientes e Exportação)
     path('cadastrar-cliente/', views.cadastrar_cliente, name='cadastrar_cliente'),
     path('exportar-dados/', views.exportar_dados, name='exportar_dados'),
+    path('produtividade/', views.relatorio_produtividade, name='relatorio_produtividade'),
     path('novos-clientes/', views.novos_clientes, name='novos_clientes'),
+    path('novos-clientes/<int:processamento_id>/download/', views.download_processamento, name='download_processamento'),
+    path('novos-clientes/comparacoes/<uuid:chave>/download/', views.download_comparacao, name='download_comparacao'),
     
     # URLs de Gerenciamento de Usuários (Páginas)
     path('gerenciar-usuarios/', views.gerenciar_usuarios, name='gerenciar_usuarios'),
     path('listar-usuarios/', views.listar_usuarios, name='listar_usuarios'),
     path('criar-usuario/', views.criar_usuario, name='criar_usuario'),
+    path('importar-usuarios/', views.importar_usuarios, name='importar_usuarios'),
     path('editar-usuario/<int:usuario_id>/', views.editar_usuario, name='editar_usuario'),
     path('redefinir-senha/<int:usuario_id>/', views.redefinir_senha, name='redefinir_senha'),
     # Rota para o perfil do usuário logado (que está dando erro de template)
@@ -36,11 +40,23 @@ urlpatterns = [
     path('usuarios/<int:usuario_id>/ativar-desativar/', views.ativar_desativar_usuario, name='ativar_desativar_usuario'),
     path('usuarios/<int:usuario_id>/alterar-tipo/', views.alterar_tipo_acesso, name='alterar_tipo_acesso'),
     path('usuarios/<int:usuario_id>/excluir/', views.excluir_usuario, name='excluir_usuario'),
+    path('usuarios/acoes-em-lote/', views.acoes_usuarios_lote, name='acoes_usuarios_lote'),
     
     # APIs para AJAX/Fetch (Clientes)
     path('api/clientes/', views.lista_clientes, name='lista_clientes'),
+    path('api/clientes/delta/', views.delta_clientes, name='delta_clientes'),
+    path('api/clientes/sincronizar/', views.sincronizar_clientes, name='sincronizar_clientes'),
+    path('api/clientes/lote/editar/', views.editar_clientes_lote, name='editar_clientes_lote'),
+    path('api/clientes/lote/excluir/', views.excluir_clientes_lote, name='excluir_clientes_lote'),
     path('api/clientes/<int:cliente_id>/', views.detalhe_cliente, name='detalhe_cliente'),
     path('api/clientes/<int:cliente_id>/editar/', views.editar_cliente, name='editar_cliente'),
     path('api/clientes/<int:cliente_id>/excluir/', views.excluir_cliente, name='excluir_cliente'),
     path('api/validar-cliente/', views.validar_cliente, name='validar_cliente'),
+    path('api/auditoria/', views.auditoria_clientes, name='auditoria_clientes'),
+    
+    # Andamento das importações em segundo plano (polling de novos_clientes)
+    path('api/processamentos/<int:processamento_id>/', views.progresso_processamento, name='progresso_processamento'),
+    
+    # Métricas no formato Prometheus (somente administradores)
+    path('metricas/', views.metricas_prometheus, name='metricas'),
 ]
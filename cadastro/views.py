@@ -1,45 +1,32 @@
 import csv
 import json
-import pandas as pd
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-import re
-import os
-import tempfile
-import chardet
+import uuid
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse, FileResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, update_session_auth_hash, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.views import LoginView
-from django.db import models
+from django import forms
+from django.db import IntegrityError, models, router, transaction
+from django.db.models.signals import post_save
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.utils import timezone
-from datetime import datetime
-from .models import Cliente, CustomUser
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timedelta
+from .models import CAMPOS_AUDITADOS, UNIDADE_CHOICES, AuditoriaCliente, Cliente, ClienteExcluido, CustomUser, ProcessamentoArquivo, ProdutividadeDiaria, SincronizacaoCliente, formatar_coordenada
+from . import auditoria, cache_exportacao, metricas, signals
 from .forms import ClienteForm, CustomUserCreationForm, CustomUserEditForm, PasswordResetForm, CustomUserProfileForm, CustomPasswordChangeForm
-from io import BytesIO
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import logout
 from django.views.decorators.http import require_POST
 
-# Importa módulos necessários para PDF (se reportlab estiver instalado)
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import inch
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib import colors
-except ImportError:
-    # Se ReportLab não estiver instalado, essas variáveis não existirão.
-    # As funções de exportação tratarão a exceção.
-    pass
-
-
 # =============================================
 # DECORATORS PARA CONTROLE DE ACESSO
 # =============================================
@@ -185,6 +172,31 @@ def criar_usuario(request):
     }
     return render(request, 'cadastro/criar_usuario.html', context)
 
+@login_required
+@admin_required
+def importar_usuarios(request):
+    """Criação de usuários em lote a partir de um CSV"""
+    context = {}
+    
+    if request.method == 'POST' and request.FILES.get('arquivo'):
+        # Carregado sob demanda, como o motor de importação de clientes
+        from .importacao_usuarios import importar_usuarios as importar
+        
+        resultado = importar(
+            request.FILES['arquivo'],
+            criado_por=request.user,
+            dry_run=bool(request.POST.get('dry_run')),
+        )
+        context['resultado'] = resultado
+        if resultado['criados']:
+            messages.success(request, f'{resultado["criados"]} usuário(s) criado(s) em {resultado["segundos"]:.1f}s.')
+        elif not resultado['erros']:
+            messages.info(request, f'{resultado["validos"]} usuário(s) válido(s); nada foi gravado.')
+        if resultado['erros']:
+            messages.error(request, f'{len(resultado["erros"])} linha(s) com erro não foram importadas.')
+    
+    return render(request, 'cadastro/importar_usuarios.html', context)
+
 @login_required
 def editar_usuario(request, usuario_id):
     # NOTA: Verifique se o decorator admin_required ou responsavel_ou_admin_required deve ser aplicado aqui
@@ -260,6 +272,54 @@ def excluir_usuario(request, usuario_id):
     
     return redirect('cadastro:gerenciar_usuarios')
 
+# Usuários excluídos por transação nas ações em lote
+TAMANHO_LOTE_USUARIOS = 500
+
+ACOES_LOTE_USUARIOS = {
+    'ativar': ({'is_active': True}, 'ativado(s)'),
+    'desativar': ({'is_active': False}, 'desativado(s)'),
+    'tipo_admin': ({'tipo_acesso': 'admin'}, 'alterado(s) para Admin'),
+    'tipo_responsavel': ({'tipo_acesso': 'responsavel'}, 'alterado(s) para Responsável'),
+    'tipo_operador': ({'tipo_acesso': 'operador'}, 'alterado(s) para Operador'),
+}
+
+@login_required
+@admin_required
+@require_POST
+def acoes_usuarios_lote(request):
+    """Ativa, desativa, altera o tipo de acesso ou exclui vários usuários de uma vez"""
+    acao = request.POST.get('acao')
+    ids = {int(i) for i in request.POST.getlist('usuarios') if i.isdigit()}
+    
+    # Mesma proteção das ações individuais: a própria conta nunca entra no lote
+    if request.user.id in ids:
+        ids.discard(request.user.id)
+        messages.warning(request, 'Sua própria conta foi ignorada na ação em lote.')
+    
+    if not ids:
+        messages.error(request, 'Selecione ao menos um usuário.')
+        return redirect('cadastro:gerenciar_usuarios')
+    
+    usuarios = CustomUser.objects.filter(id__in=ids)
+    
+    if acao == 'excluir':
+        excluidos = 0
+        ordenados = sorted(ids)
+        for inicio in range(0, len(ordenados), TAMANHO_LOTE_USUARIOS):
+            with transaction.atomic():
+                excluidos += usuarios.filter(
+                    id__in=ordenados[inicio:inicio + TAMANHO_LOTE_USUARIOS]
+                ).delete()[1].get(CustomUser._meta.label, 0)
+        messages.success(request, f'{excluidos} usuário(s) excluído(s) com sucesso!')
+    elif acao in ACOES_LOTE_USUARIOS:
+        valores, descricao = ACOES_LOTE_USUARIOS[acao]
+        alterados = usuarios.update(**valores)
+        messages.success(request, f'{alterados} usuário(s) {descricao} com sucesso!')
+    else:
+        messages.error(request, 'Ação em lote inválida.')
+    
+    return redirect('cadastro:gerenciar_usuarios')
+
 @login_required
 def redefinir_senha(request, usuario_id):
     # NOTA: Verifique se o decorator admin_required ou responsavel_ou_admin_required deve ser aplicado aqui
@@ -352,7 +412,9 @@ def cadastrar_cliente(request):
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             form = ClienteForm(request.POST)
             if form.is_valid():
-                cliente = form.save()
+                cliente = form.save(commit=False)
+                cliente.cadastrado_por = request.user
+                cliente.save()
                 return JsonResponse({
                     'success': True,
                     'message': f'Cliente {cliente.codigo_cliente} cadastrado com sucesso!'
@@ -365,7 +427,9 @@ def cadastrar_cliente(request):
         
         form = ClienteForm(request.POST)
         if form.is_valid():
-            cliente = form.save()
+            cliente = form.save(commit=False)
+            cliente.cadastrado_por = request.user
+            cliente.save()
             messages.success(request, f'Cliente {cliente.codigo_cliente} cadastrado com sucesso!')
             
             unidade_atual = cliente.unidade
@@ -391,25 +455,173 @@ def cadastrar_cliente(request):
         'clientes_hoje': clientes_hoje
     })
 
+# Registros aceitos por requisição da fila offline (sincronizar_clientes)
+TAMANHO_LOTE_SINCRONIZACAO = 500
+
+# Reenvios simultâneos do mesmo lote: tentativas antes de desistir
+TENTATIVAS_SINCRONIZACAO = 3
+
+@login_required
+@operador_required
+@require_POST
+def sincronizar_clientes(request):
+    """
+    Recebe um lote da fila offline de cadastro.html:
+    {"registros": [{"chave": uuid, "unidade", "data_cadastro", "codigo_cliente",
+    "latitude", "longitude"}, ...]}. Cada registro volta com status "criado",
+    "duplicado" (chave já recebida antes; devolve o cliente daquela vez) ou
+    "erro". Os novos são gravados com bulk_create, em uma transação junto com
+    as chaves, então reenviar um lote nunca duplica clientes.
+    """
+    try:
+        registros = json.loads(request.body)['registros']
+        if not isinstance(registros, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Envie {"registros": [...]}.'}, status=400)
+    if len(registros) > TAMANHO_LOTE_SINCRONIZACAO:
+        return JsonResponse({
+            'success': False,
+            'error': f'Envie no máximo {TAMANHO_LOTE_SINCRONIZACAO} registros por lote.',
+        }, status=400)
+    
+    resultados = []
+    # chave -> resultados com essa chave (um registro repetido no lote conta uma vez)
+    por_chave, clientes = {}, {}
+    for registro in registros:
+        registro = registro if isinstance(registro, dict) else {}
+        resultado = {'chave': registro.get('chave')}
+        resultados.append(resultado)
+        try:
+            chave = uuid.UUID(str(registro.get('chave')))
+        except ValueError:
+            resultado.update(status='erro', erros={'chave': ['Chave de idempotência inválida.']})
+            continue
+        if chave in por_chave:
+            por_chave[chave].append(resultado)
+            continue
+        por_chave[chave] = [resultado]
+        form = ClienteForm(registro, validar_regiao=False)
+        if not form.is_valid():
+            resultado.update(status='erro', erros=form.errors)
+            continue
+        cliente = form.save(commit=False)
+        cliente.cadastrado_por = request.user
+        # bulk_create não passa pelo save()
+        cliente.calcular_chave_espacial()
+        clientes[chave] = cliente
+    
+    if clientes and getattr(settings, 'CADASTRO_REGIOES_VALIDAR', False):
+        # Região de todo o lote em uma chamada vetorizada (NumPy, sob demanda)
+        from .geografia import verificar
+        erros = verificar(
+            [cliente.unidade for cliente in clientes.values()],
+            [float(cliente.latitude) for cliente in clientes.values()],
+            [float(cliente.longitude) for cliente in clientes.values()],
+        )
+        for chave, erro in zip(list(clientes), erros):
+            if erro:
+                por_chave[chave][0].update(status='erro', erros={'latitude': [erro]})
+                del clientes[chave]
+    
+    for tentativa in range(TENTATIVAS_SINCRONIZACAO):
+        existentes = dict(
+            SincronizacaoCliente.objects.filter(chave__in=clientes).values_list('chave', 'cliente_id')
+        )
+        novos = {chave: cliente for chave, cliente in clientes.items() if chave not in existentes}
+        try:
+            # Os sinais de Cliente não disparam no bulk_create: produtividade,
+            # auditoria e cache são atualizados aqui, uma vez por lote
+            with transaction.atomic():
+                Cliente.objects.bulk_create(novos.values())
+                SincronizacaoCliente.objects.bulk_create([
+                    SincronizacaoCliente(chave=chave, cliente_id=cliente.pk, usuario=request.user)
+                    for chave, cliente in novos.items()
+                ])
+                ProdutividadeDiaria.somar(ProdutividadeDiaria.agrupar(
+                    (request.user.pk, cliente.unidade, cliente.criado_em) for cliente in novos.values()))
+                auditoria.registrar(*(
+                    auditoria.nova_entrada('criacao', cliente.pk, cliente.codigo_cliente, cliente.unidade,
+                                           auditoria.diferencas({}, auditoria.valores(cliente)))
+                    for cliente in novos.values()
+                ))
+            break
+        except IntegrityError:
+            # Um reenvio simultâneo gravou alguma das chaves entre a consulta e o INSERT
+            if tentativa == TENTATIVAS_SINCRONIZACAO - 1:
+                raise
+            for cliente in novos.values():
+                cliente.pk = None
+                cliente._state.adding = True
+    
+    if novos:
+        metricas.observar('cadastro_bulk_insert_lote', len(novos), modelo='Cliente')
+        cache_exportacao.invalidar(*{cliente.unidade for cliente in novos.values()})
+    
+    for chave, cliente in clientes.items():
+        if chave in existentes:
+            status, cliente_id = 'duplicado', existentes[chave]
+        else:
+            status, cliente_id = 'criado', cliente.pk
+        primeiro, *repetidos = por_chave[chave]
+        primeiro.update(status=status, id=cliente_id)
+        for resultado in repetidos:
+            resultado.update(status='duplicado', id=cliente_id)
+    for primeiro, *repetidos in por_chave.values():
+        # Repetições de um registro inválido herdam o erro do primeiro
+        if primeiro['status'] == 'erro':
+            for resultado in repetidos:
+                resultado.update(status='erro', erros=primeiro['erros'])
+    
+    contagem = {status: sum(r['status'] == status for r in resultados) for status in ('criado', 'duplicado', 'erro')}
+    return JsonResponse({
+        'success': True,
+        'criados': contagem['criado'],
+        'duplicados': contagem['duplicado'],
+        'erros': contagem['erro'],
+        'resultados': resultados,
+    })
+
 @login_required
 @responsavel_ou_admin_required
 def novos_clientes(request):
-    context = {}
+    context = {
+        'processamentos': ProcessamentoArquivo.objects.filter(usuario=request.user).order_by('-criado_em')[:10],
+    }
     
     if request.method == 'POST' and request.FILES.get('arquivo_csv'):
-        arquivo_csv = request.FILES['arquivo_csv']
+        arquivos = request.FILES.getlist('arquivo_csv')
+        arquivo_csv = arquivos[0]
+        
+        if request.POST.get('dry_run'):
+            return _comparar_com_banco(request, arquivos, context)
+        
+        if request.POST.get('segundo_plano'):
+            return _enfileirar_processamentos(request, arquivos)
+        
+        # Carregado sob demanda: o motor de importação depende de chardet
+        from .importacao import processar_clientes_csv, processar_varios_arquivos
         
         try:
+            if len(arquivos) > 1 or arquivo_csv.name.lower().endswith('.zip'):
+                # Um TXT por filial, convertidos em paralelo e devolvidos em um ZIP
+                resultado = processar_varios_arquivos(arquivos)
+                if resultado:
+                    response = HttpResponse(resultado['conteudo'], content_type='application/zip')
+                    response['Content-Disposition'] = f'attachment; filename="{resultado["nome_arquivo"]}"'
+                    messages.success(request, f'Arquivos processados com sucesso! {resultado["estatisticas"]["processadas"]} registros.')
+                    return response
+                messages.error(request, 'Nenhum registro válido encontrado nos arquivos enviados.')
+                return render(request, 'cadastro/novos_clientes.html', context)
+            
             resultado = processar_clientes_csv(arquivo_csv)
             
             if resultado:
-                with open(resultado['caminho_arquivo'], 'rb') as f:
-                    response = HttpResponse(f.read(), content_type='text/plain')
-                    response['Content-Disposition'] = f'attachment; filename="{resultado["nome_arquivo"]}"'
+                # O TXT é gerado enquanto é enviado, direto do upload
+                response = StreamingHttpResponse(resultado['conteudo'], content_type='text/plain')
+                response['Content-Disposition'] = f'attachment; filename="{resultado["nome_arquivo"]}"'
                 
-                messages.success(request, f'Arquivo processado com sucesso! {resultado["registros_processados"]} registros.')
-                
-                os.remove(resultado['caminho_arquivo'])
+                messages.success(request, 'Arquivo processado com sucesso!')
                 
                 return response
             else:
@@ -420,6 +632,120 @@ def novos_clientes(request):
     
     return render(request, 'cadastro/novos_clientes.html', context)
 
+def _caminho_comparacao(usuario, chave=''):
+    return f'importacoes/comparacoes/{usuario.id}/{chave}'
+
+
+def _comparar_com_banco(request, arquivos, context):
+    """
+    Dry-run: compara os arquivos com os clientes cadastrados sem gravar
+    clientes. O resumo vai para a página e o detalhamento fica em um CSV para
+    download; cada usuário guarda só a comparação mais recente.
+    """
+    # Carregado sob demanda: a comparação depende do pandas
+    from .comparacao import comparar_arquivos
+    
+    try:
+        resultado = comparar_arquivos(arquivos)
+    except Exception as e:
+        messages.error(request, f'Erro: {str(e)}')
+        return render(request, 'cadastro/novos_clientes.html', context)
+    if resultado is None:
+        messages.error(request, 'Nenhum registro válido encontrado nos arquivos enviados.')
+        return render(request, 'cadastro/novos_clientes.html', context)
+    
+    diretorio = _caminho_comparacao(request.user)
+    if default_storage.exists(diretorio):
+        for anterior in default_storage.listdir(diretorio)[1]:
+            default_storage.delete(diretorio + anterior)
+    chave = uuid.uuid4()
+    default_storage.save(_caminho_comparacao(request.user, f'{chave}.csv'), ContentFile(resultado['detalhe']))
+    
+    context['comparacao'] = {
+        **resultado['resumo'],
+        'url_download': reverse('cadastro:download_comparacao', args=[chave]),
+    }
+    return render(request, 'cadastro/novos_clientes.html', context)
+
+
+@login_required
+@responsavel_ou_admin_required
+def download_comparacao(request, chave):
+    """Detalhamento CSV da última comparação (dry-run) do próprio usuário."""
+    caminho = _caminho_comparacao(request.user, f'{chave}.csv')
+    if not default_storage.exists(caminho):
+        raise Http404
+    return FileResponse(
+        default_storage.open(caminho, 'rb'),
+        as_attachment=True,
+        filename=f"comparacao-{timezone.now().strftime('%d-%m-%Y')}.csv",
+        content_type='text/csv',
+    )
+
+
+def _enfileirar_processamentos(request, arquivos):
+    """Grava cada arquivo como ProcessamentoArquivo pendente para o worker."""
+    from .importacao import EXTENSOES_IMPORTACAO
+    
+    invalidos = [a.name for a in arquivos if not a.name.lower().endswith(EXTENSOES_IMPORTACAO)]
+    if invalidos:
+        messages.error(request, f'Em segundo plano, envie apenas arquivos CSV ou XLSX: {", ".join(invalidos)}')
+        return redirect('cadastro:novos_clientes')
+    
+    for arquivo in arquivos:
+        ProcessamentoArquivo.objects.create(
+            usuario=request.user,
+            arquivo=arquivo,
+            nome_original=arquivo.name,
+            tamanho=arquivo.size,
+        )
+    messages.success(request, f'{len(arquivos)} arquivo(s) enviado(s) para processamento. Acompanhe o andamento abaixo.')
+    return redirect('cadastro:novos_clientes')
+
+
+def _processamento_do_usuario(request, processamento_id):
+    processamento = get_object_or_404(ProcessamentoArquivo, id=processamento_id)
+    if processamento.usuario_id != request.user.id and request.user.tipo_acesso != 'admin':
+        raise Http404
+    return processamento
+
+
+@login_required
+@responsavel_ou_admin_required
+def progresso_processamento(request, processamento_id):
+    """Andamento de um processamento em segundo plano (consultado por polling)."""
+    processamento = _processamento_do_usuario(request, processamento_id)
+    dados = {
+        'id': processamento.id,
+        'status': processamento.status,
+        'status_display': processamento.get_status_display(),
+        'finalizado': processamento.finalizado,
+        'percentual': processamento.percentual,
+        'linhas_lidas': processamento.linhas_lidas,
+        'linhas_processadas': processamento.linhas_processadas,
+        'linhas_ignoradas': processamento.linhas_ignoradas,
+        'linhas_erros': processamento.linhas_erros,
+        'mensagem': processamento.mensagem,
+        'url_download': None,
+    }
+    if processamento.status == 'concluido' and processamento.resultado:
+        dados['url_download'] = reverse('cadastro:download_processamento', args=[processamento.id])
+    return JsonResponse(dados)
+
+
+@login_required
+@responsavel_ou_admin_required
+def download_processamento(request, processamento_id):
+    processamento = _processamento_do_usuario(request, processamento_id)
+    if processamento.status != 'concluido' or not processamento.resultado:
+        raise Http404
+    return FileResponse(
+        processamento.resultado.open('rb'),
+        as_attachment=True,
+        filename=processamento.nome_resultado,
+        content_type='text/plain',
+    )
+
 @login_required
 @responsavel_ou_admin_required
 def exportar_dados(request):
@@ -427,8 +753,15 @@ def exportar_dados(request):
     data_inicio = request.GET.get('data_inicio', '')
     data_fim = request.GET.get('data_fim', '')
     formato = request.GET.get('formato', '')
+    ordem = request.GET.get('ordem', '')
     
     clientes = Cliente.objects.all().order_by('-data_cadastro')
+    if ordem == 'espacial':
+        # Vizinhos no mapa em sequência (roteirização); ver espacial.py
+        clientes = clientes.ordem_espacial()
+    else:
+        ordem = ''
+    data_inicio_obj = data_fim_obj = None
     
     if unidade_filtro:
         clientes = clientes.filter(unidade=unidade_filtro)
@@ -438,32 +771,46 @@ def exportar_dados(request):
             data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
             clientes = clientes.filter(data_cadastro__gte=data_inicio_obj)
         except ValueError:
-            pass
+            data_inicio_obj = None
     
     if data_fim:
         try:
             data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
             clientes = clientes.filter(data_cadastro__lte=data_fim_obj)
         except ValueError:
-            pass
+            data_fim_obj = None
     
     if formato:
-        if formato == 'excel':
-            return exportar_excel(clientes, unidade_filtro)
-        elif formato == 'csv':
-            return exportar_csv(clientes, unidade_filtro)
-        elif formato == 'pdf':
-            return exportar_pdf(clientes, unidade_filtro)
-        elif formato == 'txt':
-            # Chama a função exportar_txt, que estava faltando
-            return exportar_txt(clientes, unidade_filtro)
-        else:
-            return HttpResponseBadRequest(f"Formato de exportação '{formato}' não suportado.")
+        # Carregado sob demanda: o motor de exportação depende de openpyxl/ReportLab/pyarrow
+        from .exportacao import gerar_exportacao, nome_arquivo
+        
+        # Excel e PDF são caros de gerar: serve do cache em disco quando possível.
+        # A chave é calculada antes de a consulta ser executada.
+        chave_cache = None
+        if cache_exportacao.cache_habilitado(formato):
+            chave_cache = cache_exportacao.chave(
+                unidade_filtro,
+                data_inicio_obj.isoformat() if data_inicio_obj else '',
+                data_fim_obj.isoformat() if data_fim_obj else '',
+                formato,
+                ordem,
+            )
+            response = cache_exportacao.obter(chave_cache, nome_arquivo(unidade_filtro, formato))
+            metricas.incrementar('cadastro_exportacao_cache_total',
+                                 resultado='hit' if response is not None else 'miss')
+            if response is not None:
+                return _contabilizar_bytes_exportados(response, formato)
+        
+        response = gerar_exportacao(clientes, unidade_filtro, formato)
+        if chave_cache:
+            cache_exportacao.armazenar(chave_cache, response)
+        return _contabilizar_bytes_exportados(response, formato)
     
     context = {
         'unidade_selecionada': unidade_filtro,
         'data_inicio_selecionada': data_inicio,
         'data_fim_selecionada': data_fim,
+        'ordem_selecionada': ordem,
         'clientes_filtrados': clientes,
         'total_registros': clientes.count(),
         'unidades': ['Maringá', 'Guarapuava', 'Ponta Grossa', 'Norte Pioneiro']
@@ -471,15 +818,77 @@ def exportar_dados(request):
     
     return render(request, 'cadastro/exportar.html', context)
 
+@login_required
+@responsavel_ou_admin_required
+def relatorio_produtividade(request):
+    """
+    Clientes cadastrados por operador e por dia no período (padrão: últimos
+    30 dias). Lê apenas o rollup ProdutividadeDiaria, nunca a tabela de clientes.
+    """
+    hoje = timezone.localdate()
+    try:
+        data_fim = datetime.strptime(request.GET.get('data_fim', ''), '%Y-%m-%d').date()
+    except ValueError:
+        data_fim = hoje
+    try:
+        data_inicio = datetime.strptime(request.GET.get('data_inicio', ''), '%Y-%m-%d').date()
+    except ValueError:
+        data_inicio = data_fim - timedelta(days=29)
+    unidade_filtro = request.GET.get('unidade', '')
+    
+    linhas = ProdutividadeDiaria.objects.filter(dia__range=(data_inicio, data_fim))
+    if unidade_filtro:
+        linhas = linhas.filter(unidade=unidade_filtro)
+    
+    por_operador = list(
+        linhas.values('operador_id', 'operador__nome_completo', 'operador__email')
+        .annotate(
+            total=models.Sum('quantidade'),
+            dias=models.Count('dia', distinct=True, filter=models.Q(quantidade__gt=0)),
+        )
+        .filter(total__gt=0)
+        .order_by('-total')
+    )
+    for linha in por_operador:
+        linha['media_diaria'] = linha['total'] / linha['dias'] if linha['dias'] else 0
+    
+    por_dia = list(
+        linhas.values('dia').annotate(total=models.Sum('quantidade')).filter(total__gt=0).order_by('-dia')
+    )
+    por_unidade = list(
+        linhas.values('unidade').annotate(total=models.Sum('quantidade')).filter(total__gt=0).order_by('unidade')
+    )
+    
+    return render(request, 'cadastro/produtividade.html', {
+        'por_operador': por_operador,
+        'por_dia': por_dia,
+        'por_unidade': por_unidade,
+        'total_periodo': sum(linha['total'] for linha in por_dia),
+        'unidade_selecionada': unidade_filtro,
+        'data_inicio_selecionada': data_inicio.isoformat(),
+        'data_fim_selecionada': data_fim.isoformat(),
+        'unidades': [valor for valor, _ in UNIDADE_CHOICES],
+    })
+
 # =============================================
 # APIs (PROTEGIDAS)
 # =============================================
 
+# Sugestões do modo autocompletar de lista_clientes (padrão e máximo)
+LIMITE_AUTOCOMPLETAR = 10
+MAXIMO_AUTOCOMPLETAR = 50
+
 @login_required
 @require_http_methods(["GET"])
 def lista_clientes(request):
+    """
+    Clientes filtrados por unidade, data e/ou prefixo do código (`q`). Com
+    `autocompletar=1` devolve só as `limite` primeiras sugestões em ordem de
+    código, lidas direto do índice de prefixo.
+    """
     unidade_filtro = request.GET.get('unidade', '')
     data_filtro = request.GET.get('data', '')
+    prefixo = request.GET.get('q', '').strip()
     
     clientes = Cliente.objects.all().order_by('-id')
     
@@ -493,15 +902,34 @@ def lista_clientes(request):
         except ValueError:
             pass
     
+    if prefixo:
+        clientes = clientes.codigo_com_prefixo(prefixo)
+    
+    if request.GET.get('autocompletar'):
+        try:
+            limite = max(1, min(int(request.GET.get('limite', LIMITE_AUTOCOMPLETAR)), MAXIMO_AUTOCOMPLETAR))
+        except ValueError:
+            limite = LIMITE_AUTOCOMPLETAR
+        sugestoes = clientes.ordenados_por_codigo().values_list('id', 'codigo_cliente', 'unidade')[:limite]
+        return JsonResponse({'clientes': [
+            {'id': id_cliente, 'codigo_cliente': codigo_cliente, 'unidade': unidade}
+            for id_cliente, codigo_cliente, unidade in sugestoes
+        ]})
+    
+    # Lê as coordenadas como inteiros brutos para não criar um Decimal por linha
+    linhas = clientes.com_coordenadas_inteiras().values_list(
+        'id', 'unidade', 'codigo_cliente', 'latitude_e7', 'longitude_e7', 'data_cadastro'
+    )
+    
     data = []
-    for cliente in clientes:
+    for id_cliente, unidade, codigo_cliente, latitude, longitude, data_cadastro in linhas:
         data.append({
-            'id': cliente.id,
-            'unidade': cliente.unidade,
-            'codigo_cliente': cliente.codigo_cliente,
-            'latitude': str(cliente.latitude),
-            'longitude': str(cliente.longitude),
-            'data_cadastro': cliente.data_cadastro.strftime('%Y-%m-%d'),
+            'id': id_cliente,
+            'unidade': unidade,
+            'codigo_cliente': codigo_cliente,
+            'latitude': formatar_coordenada(latitude),
+            'longitude': formatar_coordenada(longitude),
+            'data_cadastro': data_cadastro.strftime('%Y-%m-%d'),
         })
     
     return JsonResponse({'clientes': data})
@@ -510,54 +938,273 @@ def lista_clientes(request):
 @require_http_methods(["GET"])
 def detalhe_cliente(request, cliente_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
+    return JsonResponse(_cliente_json(cliente))
+
+# Máximo de entradas devolvidas por consulta ao histórico de auditoria
+LIMITE_AUDITORIA = 200
+
+@login_required
+@responsavel_ou_admin_required
+@require_http_methods(["GET"])
+def auditoria_clientes(request):
+    """
+    Histórico de alterações de um código de cliente (opcionalmente de uma
+    unidade), do mais recente para o mais antigo.
+    """
+    codigo_cliente = request.GET.get('codigo_cliente', '').strip()
+    if not codigo_cliente:
+        return JsonResponse({'success': False, 'error': 'Informe o "codigo_cliente".'}, status=400)
+    try:
+        limite = max(1, min(int(request.GET.get('limite', LIMITE_AUDITORIA)), LIMITE_AUDITORIA))
+    except ValueError:
+        limite = LIMITE_AUDITORIA
+    
+    # Inclui as entradas que este processo ainda não gravou
+    auditoria.descarregar()
+    
+    entradas = AuditoriaCliente.objects.filter(codigo_cliente=codigo_cliente)
+    if request.GET.get('unidade'):
+        entradas = entradas.filter(unidade=request.GET['unidade'])
+    
+    return JsonResponse({
+        'codigo_cliente': codigo_cliente,
+        'entradas': [
+            {
+                'cliente_id': entrada.cliente_id,
+                'unidade': entrada.unidade,
+                'acao': entrada.acao,
+                'alteracoes': entrada.alteracoes,
+                'usuario': entrada.usuario_email,
+                'registrado_em': timezone.localtime(entrada.registrado_em).isoformat(),
+            }
+            for entrada in entradas.order_by('-registrado_em', '-id')[:limite]
+        ],
+    })
+
+TAMANHO_PAGINA_DELTA = 1000
+
+@login_required
+@require_http_methods(["GET"])
+def delta_clientes(request):
+    """
+    Exportação incremental: clientes incluídos, alterados e excluídos depois da
+    marca d'água `desde`, em páginas por keyset. Enquanto houver `proximo_cursor`,
+    basta repeti-lo na próxima chamada; a `marca_dagua` devolvida deve ser usada
+    como `desde` na sincronização seguinte.
+    
+    A marca d'água fica CADASTRO_DELTA_ATRASO segundos antes do início da
+    sincronização: atualizado_em/excluido_em são definidos antes do commit, e
+    uma transação ainda aberta poderia gravar depois uma linha com data já
+    coberta pela janela, que nenhuma sincronização leria.
+    """
+    try:
+        limite = max(1, min(int(request.GET.get('limite', TAMANHO_PAGINA_DELTA)), TAMANHO_PAGINA_DELTA))
+    except ValueError:
+        limite = TAMANHO_PAGINA_DELTA
     
-    data = {
+    token = request.GET.get('cursor', '')
+    if token:
+        try:
+            cursor = signing.loads(token, salt='cadastro.delta_clientes')
+        except signing.BadSignature:
+            return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+    else:
+        desde = request.GET.get('desde', '')
+        if desde:
+            desde_obj = parse_datetime(desde)
+            if desde_obj is None:
+                return JsonResponse({'error': "Parâmetro 'desde' deve estar no formato ISO 8601."}, status=400)
+            if timezone.is_naive(desde_obj):
+                desde_obj = timezone.make_aware(desde_obj)
+            desde = desde_obj.isoformat()
+        # A janela é fechada no início da sincronização, com folga para os
+        # commits atrasados: (desde, ate]
+        ate = timezone.now() - timedelta(seconds=getattr(settings, 'CADASTRO_DELTA_ATRASO', 5.0))
+        if desde and ate < desde_obj:
+            # Chamada logo após a anterior: a marca d'água não volta
+            ate = desde_obj
+        cursor = {'fase': 'alteracoes', 'desde': desde, 'ate': ate.isoformat(), 'ultimo': None}
+    
+    desde = parse_datetime(cursor['desde']) if cursor['desde'] else None
+    ate = parse_datetime(cursor['ate'])
+    
+    inseridos, atualizados, excluidos = [], [], []
+    restante = limite
+    
+    while restante > 0 and cursor['fase']:
+        if cursor['fase'] == 'alteracoes':
+            modelo, campo_data = Cliente, 'atualizado_em'
+            campos = ['id', 'unidade', 'codigo_cliente', 'latitude_e7', 'longitude_e7',
+                      'data_cadastro', 'criado_em', 'atualizado_em']
+            proxima_fase = 'exclusoes'
+        else:
+            modelo, campo_data = ClienteExcluido, 'excluido_em'
+            campos = ['id', 'cliente_id', 'unidade', 'codigo_cliente', 'excluido_em']
+            proxima_fase = None
+        
+        linhas = modelo.objects.filter(**{f'{campo_data}__lte': ate})
+        if modelo is Cliente:
+            linhas = linhas.com_coordenadas_inteiras()
+        if desde:
+            linhas = linhas.filter(**{f'{campo_data}__gt': desde})
+        if cursor['ultimo']:
+            ultima_data, ultimo_id = parse_datetime(cursor['ultimo'][0]), cursor['ultimo'][1]
+            linhas = linhas.filter(
+                models.Q(**{f'{campo_data}__gt': ultima_data}) |
+                models.Q(**{campo_data: ultima_data, 'id__gt': ultimo_id})
+            )
+        linhas = list(linhas.order_by(campo_data, 'id').values(*campos)[:restante])
+        
+        for linha in linhas:
+            if cursor['fase'] == 'exclusoes':
+                excluidos.append({
+                    'id': linha['cliente_id'],
+                    'unidade': linha['unidade'],
+                    'codigo_cliente': linha['codigo_cliente'],
+                    'excluido_em': linha['excluido_em'].isoformat(),
+                })
+                continue
+            item = {
+                'id': linha['id'],
+                'unidade': linha['unidade'],
+                'codigo_cliente': linha['codigo_cliente'],
+                'latitude': formatar_coordenada(linha['latitude_e7']),
+                'longitude': formatar_coordenada(linha['longitude_e7']),
+                'data_cadastro': linha['data_cadastro'].strftime('%Y-%m-%d'),
+                'atualizado_em': linha['atualizado_em'].isoformat(),
+            }
+            if desde is None or linha['criado_em'] > desde:
+                inseridos.append(item)
+            else:
+                atualizados.append(item)
+        
+        restante -= len(linhas)
+        if restante == 0 and linhas:
+            ultima = linhas[-1]
+            cursor['ultimo'] = [ultima[campo_data].isoformat(), ultima['id']]
+        else:
+            cursor = {**cursor, 'fase': proxima_fase, 'ultimo': None}
+    
+    return JsonResponse({
+        'inseridos': inseridos,
+        'atualizados': atualizados,
+        'excluidos': excluidos,
+        'proximo_cursor': signing.dumps(cursor, salt='cadastro.delta_clientes') if cursor['fase'] else None,
+        'marca_dagua': cursor['ate'],
+    })
+
+def _cliente_json(cliente):
+    return {
         'id': cliente.id,
         'unidade': cliente.unidade,
         'codigo_cliente': cliente.codigo_cliente,
         'latitude': str(cliente.latitude),
         'longitude': str(cliente.longitude),
         'data_cadastro': cliente.data_cadastro.strftime('%Y-%m-%d'),
+        'versao': cliente.versao,
     }
-    
-    return JsonResponse(data)
 
 @csrf_exempt
 @login_required
-@require_http_methods(["POST"])
+@require_http_methods(["POST", "PATCH"])
 def editar_cliente(request, cliente_id):
+    """
+    Atualização parcial: só os campos enviados são validados (junto com os
+    valores atuais) e gravados. Com `versao`, obrigatória no PATCH, a gravação
+    é um UPDATE condicional à versão; se outro usuário alterou o cliente
+    antes, responde 409 com os dados atuais em vez de sobrescrevê-los.
+    """
     cliente = get_object_or_404(Cliente, id=cliente_id)
     
     try:
         data = json.loads(request.body)
-        form = ClienteForm(data, instance=cliente)
-        
-        if form.is_valid():
-            cliente = form.save()
+        if not isinstance(data, dict):
             return JsonResponse({
-                'success': True,
-                'message': f'Cliente {cliente.codigo_cliente} atualizado com sucesso!',
-                'cliente': {
-                    'id': cliente.id,
-                    'unidade': cliente.unidade,
-                    'codigo_cliente': cliente.codigo_cliente,
-                    'latitude': str(cliente.latitude),
-                    'longitude': str(cliente.longitude),
-                    'data_cadastro': cliente.data_cadastro.strftime('%Y-%m-%d'),
-                }
-            })
-        else:
+                'success': False,
+                'error': 'O corpo da requisição deve ser um objeto JSON.'
+            }, status=400)
+        versao = data.pop('versao', None)
+        if versao is None and request.method == 'PATCH':
+            return JsonResponse({
+                'success': False,
+                'error': 'Informe a "versao" do cliente que está sendo editado.'
+            }, status=400)
+        if versao is not None:
+            try:
+                versao = int(versao)
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'O campo "versao" deve ser um número inteiro.'
+                }, status=400)
+            # Antes do form: is_valid() copia os valores enviados para `cliente`,
+            # e o 409 deve devolver o cliente como está gravado
+            if versao != cliente.versao:
+                return _conflito_edicao(cliente)
+        
+        form = ClienteForm(instance=cliente)
+        enviados = [campo for campo in form.fields if campo in data]
+        valores = {campo: form.initial[campo] for campo in form.fields}
+        valores.update({campo: data[campo] for campo in enviados})
+        form = ClienteForm(valores, instance=cliente)
+        
+        if not form.is_valid():
             return JsonResponse({
                 'success': False,
                 'errors': form.errors
             }, status=400)
-            
+        
+        alterados = [campo for campo in form.changed_data if campo in enviados]
+        
+        if alterados:
+            filtro = {'pk': cliente.pk}
+            if versao is not None:
+                filtro['versao'] = versao
+            # form.instance já recebeu os valores limpos em is_valid()
+            cliente = form.instance
+            cliente.atualizado_em = timezone.now()
+            gravar = list(alterados)
+            if {'latitude', 'longitude'} & set(alterados):
+                cliente.calcular_chave_espacial()
+                gravar.append('chave_espacial')
+            gravados = Cliente.objects.filter(**filtro).update(
+                versao=models.F('versao') + 1,
+                atualizado_em=cliente.atualizado_em,
+                **{campo: getattr(cliente, campo) for campo in gravar},
+            )
+            if not gravados:
+                return _conflito_edicao(Cliente.objects.get(pk=cliente.pk))
+            cliente.versao += 1
+            # update() não dispara sinais; os receivers (cache da exportação)
+            # recebem o mesmo post_save que um save(update_fields=...) enviaria
+            post_save.send(
+                sender=Cliente, instance=cliente, created=False,
+                update_fields=frozenset([*gravar, 'atualizado_em', 'versao']),
+                raw=False, using=router.db_for_write(Cliente),
+            )
+        
+        return JsonResponse({
+            'success': True,
+            'message': f'Cliente {cliente.codigo_cliente} atualizado com sucesso!',
+            'alterados': alterados,
+            'cliente': _cliente_json(cliente),
+        })
+    
+    except Cliente.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Cliente excluído por outro usuário.'}, status=404)
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
+def _conflito_edicao(cliente):
+    return JsonResponse({
+        'success': False,
+        'error': 'O cliente foi alterado por outro usuário. Recarregue os dados e tente novamente.',
+        'cliente': _cliente_json(cliente),
+    }, status=409)
+
 @csrf_exempt
 @login_required
 @require_http_methods(["DELETE"])
@@ -579,6 +1226,240 @@ def excluir_cliente(request, cliente_id):
             'error': str(e)
         }, status=500)
 
+# =============================================
+# OPERAÇÕES EM LOTE (EDIÇÃO E EXCLUSÃO)
+# =============================================
+
+# Clientes alterados por transação nas operações em lote
+TAMANHO_LOTE_CLIENTES = 1000
+
+# Campos que podem ser alterados em lote (ex.: unidade atribuída errada)
+CAMPOS_EDICAO_LOTE = ('unidade', 'data_cadastro')
+
+# Clientes recusados pela região listados na resposta de editar_clientes_lote
+# (a contagem é sempre completa)
+MAX_RECUSADOS_LISTADOS = 1000
+
+
+def _clientes_do_lote(dados):
+    """
+    Seleciona os clientes de uma operação em lote: `ids` ou `filtro` com
+    unidade, data_inicio/data_fim (data_cadastro) e/ou codigos. Exige ao menos
+    um critério, para que um corpo vazio não atinja a base inteira.
+    """
+    if not isinstance(dados, dict):
+        raise ValueError('O corpo da requisição deve ser um objeto JSON.')
+    ids = dados.get('ids')
+    filtro = dados.get('filtro') or {}
+    if not isinstance(filtro, dict):
+        raise ValueError('"filtro" deve ser um objeto JSON.')
+    if not ids and not any(filtro.get(c) for c in ('unidade', 'data_inicio', 'data_fim', 'codigos')):
+        raise ValueError('Informe "ids" ou ao menos um critério em "filtro".')
+    
+    clientes = Cliente.objects.all()
+    if ids:
+        # Uma string seria percorrida caractere por caractere ("12" -> 1 e 2)
+        if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+            raise ValueError('"ids" deve ser uma lista de números inteiros.')
+        clientes = clientes.filter(id__in=ids)
+    if filtro.get('unidade'):
+        clientes = clientes.filter(unidade=filtro['unidade'])
+    for campo, lookup in (('data_inicio', 'gte'), ('data_fim', 'lte')):
+        if filtro.get(campo):
+            try:
+                data = datetime.strptime(str(filtro[campo]), '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'"{campo}" deve estar no formato AAAA-MM-DD.')
+            clientes = clientes.filter(**{f'data_cadastro__{lookup}': data})
+    if filtro.get('codigos'):
+        codigos = filtro['codigos']
+        if not isinstance(codigos, list) or not all(type(c) in (str, int) for c in codigos):
+            raise ValueError('"codigos" deve ser uma lista de códigos de cliente.')
+        clientes = clientes.filter(codigo_cliente__in=[str(c) for c in codigos])
+    return clientes
+
+
+def _lotes_de_clientes(clientes, tamanho=TAMANHO_LOTE_CLIENTES):
+    """
+    Percorre os clientes por keyset no id, em lotes de dicionários com id,
+    cadastrado_por_id, criado_em e os campos auditados.
+    """
+    ultimo_id = 0
+    while True:
+        lote = list(
+            clientes.filter(id__gt=ultimo_id).order_by('id')
+            .values('id', 'cadastrado_por_id', 'criado_em', *CAMPOS_AUDITADOS)[:tamanho]
+        )
+        if not lote:
+            return
+        yield lote
+        ultimo_id = lote[-1]['id']
+
+
+def _recusados_pela_regiao(lote, unidade):
+    """
+    Clientes do lote cuja coordenada fica fora da região de `unidade` (ver
+    geografia.py), como {id, codigo_cliente, erro}. Uma chamada vetorizada
+    por lote, como em sincronizar_clientes.
+    """
+    from .geografia import verificar
+    erros = verificar(
+        [unidade] * len(lote),
+        [float(c['latitude']) for c in lote],
+        [float(c['longitude']) for c in lote],
+    )
+    return [
+        {'id': c['id'], 'codigo_cliente': c['codigo_cliente'], 'erro': erro}
+        for c, erro in zip(lote, erros) if erro
+    ]
+
+
+@csrf_exempt
+@login_required
+@responsavel_ou_admin_required
+@require_http_methods(["POST"])
+def editar_clientes_lote(request):
+    """
+    Aplica `valores` (unidade e/ou data_cadastro) aos clientes selecionados,
+    com queryset.update() em transações de TAMANHO_LOTE_CLIENTES. Ao mudar a
+    unidade com CADASTRO_REGIOES_VALIDAR ligado, os clientes com coordenada
+    fora da região da unidade nova ficam como estão e voltam em
+    `clientes_recusados`. Com "dry_run": true apenas conta os clientes que
+    seriam alterados (e os recusados).
+    """
+    try:
+        dados = json.loads(request.body)
+        clientes = _clientes_do_lote(dados)
+        
+        valores = dados.get('valores') or {}
+        if not isinstance(valores, dict):
+            raise ValueError('"valores" deve ser um objeto JSON.')
+        invalidos = set(valores) - set(CAMPOS_EDICAO_LOTE)
+        if not valores or invalidos:
+            raise ValueError(f'"valores" aceita apenas: {", ".join(CAMPOS_EDICAO_LOTE)}.')
+        campos = ClienteForm().fields
+        valores = {campo: campos[campo].clean(valor) for campo, valor in valores.items()}
+    except forms.ValidationError as e:
+        return JsonResponse({'success': False, 'error': ' '.join(e.messages)}, status=400)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    dry_run = bool(dados.get('dry_run'))
+    verificar_regiao = 'unidade' in valores and getattr(settings, 'CADASTRO_REGIOES_VALIDAR', False)
+    if dry_run and not verificar_regiao:
+        return JsonResponse({'success': True, 'dry_run': True, 'afetados': clientes.count()})
+    
+    afetados, unidades, recusados = 0, set(), []
+    for lote in _lotes_de_clientes(clientes):
+        if verificar_regiao:
+            recusados_lote = _recusados_pela_regiao(lote, valores['unidade'])
+            if recusados_lote:
+                ids_recusados = {r['id'] for r in recusados_lote}
+                lote = [c for c in lote if c['id'] not in ids_recusados]
+                recusados.extend(recusados_lote)
+        if dry_run:
+            afetados += len(lote)
+            continue
+        if not lote:
+            continue
+        # update() não chama save(): o carimbo da exportação incremental vai explícito
+        with transaction.atomic():
+            afetados += Cliente.objects.filter(id__in=[c['id'] for c in lote]).update(
+                atualizado_em=timezone.now(), versao=models.F('versao') + 1, **valores,
+            )
+            if 'unidade' in valores:
+                # Move as contagens de produtividade para a unidade nova
+                diferenca = ProdutividadeDiaria.agrupar(
+                    (c['cadastrado_por_id'], valores['unidade'], c['criado_em']) for c in lote)
+                diferenca.subtract(ProdutividadeDiaria.agrupar(
+                    (c['cadastrado_por_id'], c['unidade'], c['criado_em']) for c in lote))
+                ProdutividadeDiaria.somar(diferenca)
+            entradas = []
+            for c in lote:
+                alteracoes = auditoria.diferencas({campo: c[campo] for campo in valores}, valores)
+                if alteracoes:
+                    entradas.append(auditoria.nova_entrada(
+                        'alteracao', c['id'], c['codigo_cliente'],
+                        valores.get('unidade', c['unidade']), alteracoes,
+                    ))
+            auditoria.registrar(*entradas)
+        unidades.update(c['unidade'] for c in lote)
+    
+    if afetados:
+        if 'unidade' in valores:
+            unidades.add(valores['unidade'])
+        cache_exportacao.invalidar(*unidades)
+    
+    resposta = {'success': True, 'dry_run': dry_run, 'afetados': afetados}
+    if verificar_regiao:
+        resposta.update(
+            recusados=len(recusados),
+            clientes_recusados=recusados[:MAX_RECUSADOS_LISTADOS],
+        )
+    if not dry_run:
+        resposta['message'] = f'{afetados} cliente(s) atualizado(s) com sucesso!'
+        if recusados:
+            resposta['message'] += f' {len(recusados)} recusado(s) por estarem fora da região de {valores["unidade"]}.'
+    return JsonResponse(resposta)
+
+
+@csrf_exempt
+@login_required
+@responsavel_ou_admin_required
+@require_http_methods(["POST"])
+def excluir_clientes_lote(request):
+    """
+    Exclui os clientes selecionados em transações de TAMANHO_LOTE_CLIENTES,
+    gravando os tombstones de cada lote com bulk_create. Com "dry_run": true
+    apenas conta os clientes que seriam excluídos.
+    """
+    try:
+        dados = json.loads(request.body)
+        clientes = _clientes_do_lote(dados)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if dados.get('dry_run'):
+        return JsonResponse({'success': True, 'dry_run': True, 'afetados': clientes.count()})
+    
+    afetados, unidades = 0, set()
+    # Tombstones, auditoria, produtividade e invalidação do cache são feitos
+    # aqui, uma vez por lote/operação
+    with signals.sinais_suspensos():
+        for lote in _lotes_de_clientes(clientes):
+            agora = timezone.now()
+            with transaction.atomic():
+                ClienteExcluido.objects.bulk_create([
+                    ClienteExcluido(cliente_id=c['id'], unidade=c['unidade'],
+                                    codigo_cliente=c['codigo_cliente'], excluido_em=agora)
+                    for c in lote
+                ])
+                # delete() também conta as linhas removidas em cascata; só os clientes interessam
+                excluidos = Cliente.objects.filter(id__in=[c['id'] for c in lote]).delete()[1]
+                afetados += excluidos.get(Cliente._meta.label, 0)
+                contagens = ProdutividadeDiaria.agrupar(
+                    (c['cadastrado_por_id'], c['unidade'], c['criado_em']) for c in lote)
+                ProdutividadeDiaria.somar({chave: -n for chave, n in contagens.items()})
+                auditoria.registrar(*(
+                    auditoria.nova_entrada(
+                        'exclusao', c['id'], c['codigo_cliente'], c['unidade'],
+                        auditoria.diferencas({campo: c[campo] for campo in CAMPOS_AUDITADOS}, {}),
+                    )
+                    for c in lote
+                ))
+            metricas.observar('cadastro_bulk_insert_lote', len(lote), modelo='ClienteExcluido')
+            unidades.update(c['unidade'] for c in lote)
+    
+    if afetados:
+        cache_exportacao.invalidar(*unidades)
+    
+    return JsonResponse({
+        'success': True,
+        'dry_run': False,
+        'afetados': afetados,
+        'message': f'{afetados} cliente(s) excluído(s) com sucesso!',
+    })
+
 @csrf_exempt
 @login_required
 @require_http_methods(["POST"])
@@ -604,6 +1485,15 @@ def validar_cliente(request):
             'error': str(e)
         }, status=500)
 
+@login_required
+@admin_required
+def metricas_prometheus(request):
+    """Métricas agregadas de todos os workers no formato texto do Prometheus."""
+    return HttpResponse(
+        metricas.gerar_texto_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
 @require_POST
 def logout_view(request):
     """
@@ -616,362 +1506,24 @@ def logout_view(request):
     
     return redirect(reverse('cadastro:login'))
 
-# =============================================
-# FUNÇÕES AUXILIARES
-# =============================================
-
-def processar_clientes_csv(arquivo_csv):
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-            for chunk in arquivo_csv.chunks():
-                temp_file.write(chunk)
-            temp_path = temp_file.name
-        
-        with open(temp_path, 'rb') as f:
-            raw_data = f.read()
-            encoding_result = chardet.detect(raw_data)
-            file_encoding = encoding_result['encoding'] or 'latin1'
-        
-        print(f"Encoding detectado: {file_encoding}")
-        
-        encodings_to_try = [file_encoding, 'latin1', 'iso-8859-1', 'cp1252', 'utf-8']
-        
-        geo = None
-        for encoding in encodings_to_try:
-            try:
-                print(f"Tentando ler com encoding: {encoding}")
-                geo = pd.read_csv(temp_path, sep=';', encoding=encoding)
-                print(f"Sucesso com encoding: {encoding}")
-                break
-            except UnicodeDecodeError as e:
-                print(f"Falha com {encoding}: {e}")
-                continue
-            except Exception as e:
-                print(f"Erro com {encoding}: {e}")
-                continue
-        
-        os.unlink(temp_path)
-        
-        if geo is None:
-            print("Nao foi possível ler o arquivo com nenhum encoding")
-            return None
-        
-        print(f"Colunas encontradas: {list(geo.columns)}")
-        if not geo.empty:
-            print(f"Primeira linha - Filial: {geo.iloc[0]['Filial']}, Cliente: {geo.iloc[0]['Cliente']}, Coordenadas: {geo.iloc[0]['Coordenadas']}")
-        
-        filial_mapping = {
-            '0001': 'Maringá',
-            '0002': 'Guarapuava', 
-            '0003': 'Ponta_Grossa',
-            '0004': 'Norte_Pioneiro',
-            '1': 'Maringá',
-            '2': 'Guarapuava',
-            '3': 'Ponta_Grossa',
-            '4': 'Norte_Pioneiro'
-        }
-        
-        geo['Filial'] = geo['Filial'].astype(str).str.strip()
-        geo['Filial_Nome'] = geo['Filial'].map(filial_mapping)
-        
-        geo['Cliente_Codigo'] = geo['Cliente'].astype(str).str.strip()
-        
-        resultados = []
-        
-        for index, row in geo.iterrows():
-            try:
-                coordenadas = str(row['Coordenadas']).strip()
-                cliente_codigo = row['Cliente_Codigo']
-                filial_nome = row['Filial_Nome']
-                
-                data_col = None
-                for col in geo.columns:
-                    if 'data' in col.lower() or 'inclus' in col.lower():
-                        data_col = col
-                        break
-                
-                data_inclusao = row[data_col] if data_col else 'Data não encontrada'
-                
-                if (not coordenadas or coordenadas == 'nan' or 
-                    '000,000000' in coordenadas or coordenadas == '0' or
-                    pd.isna(filial_nome) or pd.isna(cliente_codigo)):
-                    continue
-                
-                coord_sem_espacos = coordenadas.replace(' ', '')
-                
-                partes = coord_sem_espacos.split(',')
-                
-                if len(partes) >= 4:
-                    lat_parte1 = partes[0]
-                    lat_parte2 = partes[1]
-                    
-                    lon_parte1 = partes[2]
-                    lon_parte2 = partes[3]
-                    
-                    latitude = re.sub(r'^(-)0+', r'\1', lat_parte1) + '.' + lat_parte2
-                    
-                    longitude = re.sub(r'^(-)0+', r'\1', lon_parte1) + '.' + lon_parte2
-                    
-                    resultados.append({
-                        'cliente': cliente_codigo,
-                        'latitude': latitude,
-                        'longitude': longitude,
-                        'filial': filial_nome,
-                        'data_inclusao': data_inclusao
-                    })
-                    print(f"Processado: {cliente_codigo} -> {latitude}, {longitude}")
-                    
-            except Exception as e:
-                print(f"Erro na linha {index}: {e}")
-                continue
-        
-        if not resultados:
-            print("Nenhum registro válido encontrado")
-            return None
-        
-        print(f"Total de registros processados: {len(resultados)}")
-        
-        filial = resultados[0]['filial']
-        data_inclusao = resultados[0]['data_inclusao']
-        
-        try:
-            data_obj = datetime.strptime(data_inclusao, '%d/%m/%Y')
-            data_formatada = data_obj.strftime('%d-%m-%Y')
-        except Exception as e:
-            print(f"Erro ao converter data '{data_inclusao}': {e}")
-            data_formatada = datetime.now().strftime('%d-%m-%Y')
-        
-        nome_arquivo = f"{filial}-{data_formatada}.txt"
-        
-        temp_dir = tempfile.gettempdir()
-        caminho_arquivo = os.path.join(temp_dir, nome_arquivo)
-        
-        with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-            for resultado in resultados:
-                linha = f"{resultado['cliente']};{resultado['latitude']};{resultado['longitude']}\n"
-                f.write(linha)
-        
-        print(f"Arquivo gerado: {nome_arquivo} com {len(resultados)} registros")
-        
-        return {
-            'caminho_arquivo': caminho_arquivo,
-            'nome_arquivo': nome_arquivo,
-            'registros_processados': len(resultados)
-        }
-        
-    except Exception as e:
-        print(f"Erro geral no processamento: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
 # =============================================
 # FUNÇÕES DE EXPORTAÇÃO
 # =============================================
 
-def exportar_excel(clientes, unidade_filtro):
-    if unidade_filtro:
-        filename = f"geolocalizacao-{unidade_filtro.lower()}-{timezone.now().strftime('%d-%m-%Y')}.xlsx"
-    else:
-        filename = f"geolocalizacao-todas-unidades-{timezone.now().strftime('%d-%m-%Y')}.xlsx"
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Clientes Geolocalização"
-    
-    headers = ['ID', 'Unidade', 'Código Cliente', 'Latitude', 'Longitude', 'Data Cadastro']
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center")
-    
-    for row_num, cliente in enumerate(clientes, 2):
-        ws.cell(row=row_num, column=1, value=cliente.id)
-        ws.cell(row=row_num, column=2, value=cliente.unidade)
-        ws.cell(row=row_num, column=3, value=cliente.codigo_cliente)
-        ws.cell(row=row_num, column=4, value=str(cliente.latitude))
-        ws.cell(row=row_num, column=5, value=str(cliente.longitude))
-        ws.cell(row=row_num, column=6, value=cliente.data_cadastro.strftime('%d/%m/%Y'))
-    
-    column_widths = {
-        'A': 8,
-        'B': 15,
-        'C': 18,
-        'D': 20,
-        'E': 20,
-        'F': 12
-    }
-    
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
-    
-    ws.freeze_panes = 'A2'
-    
-    if len(clientes) > 0:
-        ws.auto_filter.ref = f"A1:F{len(clientes) + 1}"
-    
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    
-    return response
-
-def exportar_csv(clientes, unidade_filtro):
-    if unidade_filtro:
-        filename = f"{unidade_filtro.lower()}-{timezone.now().strftime('%d-%m-%Y')}.csv"
-    else:
-        filename = f"todas-unidades-{timezone.now().strftime('%d-%m-%Y')}.csv"
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    response.write('ID,Unidade,Código Cliente,Latitude,Longitude,Data Cadastro\n')
+def _contabilizar_bytes_exportados(response, formato):
+    """Soma os bytes exportados; em respostas streaming, conforme os blocos saem."""
+    if response.status_code != 200:
+        return response
+    if not response.streaming:
+        metricas.incrementar('cadastro_exportacao_bytes_total', len(response.content), formato=formato)
+        return response
     
-    for cliente in clientes:
-        linha = f"{cliente.id},{cliente.unidade},{cliente.codigo_cliente},{cliente.latitude},{cliente.longitude},{cliente.data_cadastro.strftime('%d/%m/%Y')}\n"
-        response.write(linha)
+    conteudo = response.streaming_content
     
-    return response
-
-def exportar_pdf(clientes, unidade_filtro):
-    try:
-        if unidade_filtro:
-            filename = f"geolocalizacao-{unidade_filtro.lower()}-{timezone.now().strftime('%d-%m-%Y')}.pdf"
-        else:
-            filename = f"geolocalizacao-todas-unidades-{timezone.now().strftime('%d-%m-%Y')}.pdf"
-        
-        buffer = BytesIO()
-        
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=A4, 
-            topMargin=0.5*inch,
-            bottomMargin=0.5*inch,
-            leftMargin=0.5*inch,
-            rightMargin=0.5*inch
-        )
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=20,
-            alignment=1,
-            textColor=colors.HexColor('#366092')
-        )
-        
-        if unidade_filtro:
-            title_text = f"Relatório de Geolocalização - {unidade_filtro}"
-        else:
-            title_text = "Relatório de Geolocalização - Todas as Unidades"
-            
-        title = Paragraph(title_text, title_style)
-        elements.append(title)
-        
-        date_style = ParagraphStyle(
-            'CustomDate',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=20,
-            alignment=1,
-        )
-        date_text = f"Emitido em: {timezone.now().strftime('%d/%m/%Y às %H:%M')}"
-        date_para = Paragraph(date_text, date_style)
-        elements.append(date_para)
-        
-        elements.append(Spacer(1, 0.2*inch))
-        
-        data = [['Código Cliente', 'Latitude', 'Longitude', 'Unidade', 'Data Cadastro']]
-        
-        for cliente in clientes:
-            data.append([
-                str(cliente.codigo_cliente),
-                f"{cliente.latitude:.10f}" if cliente.latitude else "N/A",
-                f"{cliente.longitude:.10f}" if cliente.longitude else "N/A",
-                cliente.unidade,
-                cliente.data_cadastro.strftime('%d/%m/%Y')
-            ])
-        
-        # O problema estava aqui, a lista de estilos estava incompleta
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
-            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
-            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), # Adicionado para completar o estilo
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F5F5F5'), colors.white]) # Estilo zebrado
-        ]))
-        
-        # Adicionar a tabela aos elementos e construir o PDF
-        elements.append(table)
-        
-        def footer(canvas, doc):
-            canvas.saveState()
-            canvas.setFont('Helvetica', 9)
-            canvas.drawString(inch, 0.5 * inch, "Página %d" % doc.page)
-            canvas.restoreState()
-
-        doc.build(elements, onFirstPage=footer, onLaterPages=footer)
-        
-        # Resposta HTTP
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        buffer.close()
-        return response
-        
-    except ImportError:
-        # Se ReportLab não estiver instalado
-        return HttpResponseBadRequest("Biblioteca ReportLab não instalada. Instale com 'pip install reportlab' para exportar em PDF.")
-    except Exception as e:
-        # Erro genérico
-        return HttpResponseBadRequest(f"Erro ao gerar PDF: {str(e)}")
-
-
-def exportar_txt(clientes, unidade_filtro):
-    """
-    Exporta dados de clientes no formato TXT (delimitado por ';').
-    Inclui APENAS Código Cliente, Latitude e Longitude, SEM cabeçalho.
-    """
-    import csv # Garante que o módulo csv está disponível
-    from django.utils import timezone # Garante que timezone está disponível
-    from django.http import HttpResponse # Garante que HttpResponse está disponível
-
-    # Define o nome do arquivo de forma consistente
-    if unidade_filtro:
-        # Usa o nome da unidade no filename
-        filename = f"geolocalizacao-{unidade_filtro.lower()}-{timezone.now().strftime('%d-%m-%Y')}.txt"
-    else:
-        # Usa "todas-unidades" no filename
-        filename = f"geolocalizacao-todas-unidades-{timezone.now().strftime('%d-%m-%Y')}.txt"
-    
-    # 1. Cria a resposta HTTP com o Content-Type correto para texto
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # 2. Cria um objeto escritor CSV, usando ';' como delimitador e '\n' como quebra de linha
-    writer = csv.writer(response, delimiter=';', lineterminator='\n')
-    
-    # 3. Itera sobre o QuerySet e escreve APENAS os 3 campos necessários
-    # Não há cabeçalho, conforme solicitado.
-    for cliente in clientes:
-        writer.writerow([
-            cliente.codigo_cliente, 
-            # Garante que Latitude e Longitude sejam strings para evitar erros de formatação
-            str(cliente.latitude), 
-            str(cliente.longitude)
-        ])
+    def _contar():
+        for bloco in conteudo:
+            metricas.incrementar('cadastro_exportacao_bytes_total', len(bloco), formato=formato)
+            yield bloco
     
+    response.streaming_content = _contar()
     return response
@@ -65,12 +65,18 @@ AUTH_USER_MODEL = 'cadastro.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip/brotli das APIs JSON e exportações em texto (inclusive streaming)
+    'cadastro.middleware.CompressaoMiddleware',
+    # Mede tempo, consultas e tamanho de cada requisição (Server-Timing + log JSON)
+    'cadastro.middleware.InstrumentacaoMiddleware',
     # WhiteNoise é crucial para servir arquivos estáticos em produção
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Disponibiliza o usuário da requisição às entradas de auditoria
+    'cadastro.middleware.AuditoriaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'cadastro.middleware.AccessControlMiddleware', # Manter comentado se não estiver em uso
@@ -194,16 +200,71 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
     X_FRAME_OPTIONS = 'DENY'
 
+# ----------------------------------------------------------------------
+# 10. CONFIGURAÇÕES DO APP CADASTRO
+# ----------------------------------------------------------------------
+
+# Cache em disco das exportações (Excel/PDF) de exportar_dados
+EXPORT_CACHE_ENABLED = os.getenv('EXPORT_CACHE_ENABLED', 'True').lower() == 'true'
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', str(BASE_DIR / 'export_cache'))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+EXPORT_CACHE_FORMATOS = ('excel', 'pdf')
+
+# Orçamentos por view da InstrumentacaoMiddleware: acima disso, loga WARNING
+CADASTRO_ORCAMENTOS = {
+    # Sessão, usuário e gravação da sessão já somam ~4 consultas por requisição
+    'cadastro:exportar_dados': {'consultas': 10, 'duracao_ms': 5000},
+    'cadastro:lista_clientes': {'consultas': 8, 'duracao_ms': 500},
+    'cadastro:cadastrar_cliente': {'consultas': 10, 'duracao_ms': 300},
+}
+
+# Importação de vários arquivos/ZIP em novos_clientes: processos paralelos
+# (padrão: número de CPUs) e limite do conteúdo descompactado dos ZIPs
+CADASTRO_IMPORTACAO_PROCESSOS = int(os.getenv('CADASTRO_IMPORTACAO_PROCESSOS', 0)) or None
+CADASTRO_IMPORTACAO_MAX_BYTES = int(os.getenv('CADASTRO_IMPORTACAO_MAX_BYTES', 512 * 1024 * 1024))
+
+# Auditoria de Cliente: entradas acumuladas por processo e gravadas ao fim da
+# requisição ou ao atingir este tamanho/idade (segundos)
+CADASTRO_AUDITORIA_LOTE = int(os.getenv('CADASTRO_AUDITORIA_LOTE', 500))
+CADASTRO_AUDITORIA_INTERVALO = float(os.getenv('CADASTRO_AUDITORIA_INTERVALO', 5.0))
+
+# Regiões atendidas por unidade (um GeoJSON por unidade, ver cadastro/geografia.py)
+# e tolerância, em km, para pontos logo além da borda. Os polígonos incluídos são
+# aproximados: cadastros fora da região só são recusados com
+# CADASTRO_REGIOES_VALIDAR=True (a comparação dry-run e verificar_regioes sempre apontam)
+CADASTRO_REGIOES_VALIDAR = os.getenv('CADASTRO_REGIOES_VALIDAR', 'False').lower() == 'true'
+CADASTRO_REGIOES_DIR = os.getenv('CADASTRO_REGIOES_DIR', str(BASE_DIR / 'cadastro' / 'regioes'))
+CADASTRO_REGIOES_MARGEM_KM = float(os.getenv('CADASTRO_REGIOES_MARGEM_KM', 10.0))
+
+# Exportação incremental (delta_clientes): a janela termina este número de
+# segundos antes da chamada, para não perder linhas de transações ainda abertas
+CADASTRO_DELTA_ATRASO = float(os.getenv('CADASTRO_DELTA_ATRASO', 5.0))
+
+# Métricas agregadas entre os workers do gunicorn (um arquivo por processo)
+CADASTRO_METRICAS_DIR = os.getenv('CADASTRO_METRICAS_DIR', str(BASE_DIR / 'metricas'))
+CADASTRO_METRICAS_INTERVALO = float(os.getenv('CADASTRO_METRICAS_INTERVALO', 1.0))
+
 # Configuração de LOGGING para erros
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        # As métricas de performance já são uma linha JSON por requisição
+        'json': {
+            'format': '%(message)s',
+        },
+    },
     'handlers': {
         'file': {
             'level': 'ERROR',
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'django_errors.log',
         },
+        'performance': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
     },
     'loggers': {
         'django': {
@@ -211,5 +272,10 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'cadastro.performance': {
+            'handlers': ['performance'],
+            'level': os.getenv('CADASTRO_PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }